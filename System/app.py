@@ -1,7 +1,7 @@
 import streamlit as st
 from ui.sidebar import render_sidebar
 from ui.sidebar import render_sidebar, render_refresh_button
-from modules.data_loader import load_supplier_data  # 你需要创建这个模块
+from modules.data_loader import load_supplier_data, get_data_status  # 你需要创建这个模块
 from modules.analyser_cycle_et_prévoir_paiements import analyser_cycle_et_prévoir_paiements
 from modules.analyse_des_impayes import analyse_des_impayes
 from modules.analyse_des_payments import analyse_des_payments
@@ -32,8 +32,8 @@ st.markdown("""
 refresh_triggered = render_refresh_button(load_supplier_data)
 
 
-# 左侧导航
-selected = render_sidebar()
+# 左侧导航（显示真实的数据快照时间）
+selected = render_sidebar(get_data_status())
 
 # 根据选项运行对应功能
 #if selected == "应付未付账单查询(管理版)":
@@ -5,6 +5,11 @@ import numpy as np
 import plotly.express as px
 from modules.data_loader import load_supplier_data
 from modules.data_loader import get_ordered_departments
+from modules.aggregate_cube import cube_rollup, cube_slice
+from modules.company_index import company_names
+from modules.ledger_stages import load_company_index, load_ledger_cube
+from modules.calendar_keys import current_month_key, month_keys, month_label, with_month_label, with_week_labels
+from modules.hover_text import format_amount, format_ratio, hover_text, month_title
 import plotly.express as px
 
 # 采购数据分析 
@@ -18,10 +23,13 @@ def achat_des_produits():
     # 示例结构：df = pd.read_csv("purchase_data.csv")
 
     # 数据预处理
-    # 确保日期字段为 datetime 格式，删除发票金额为空的行
-    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
+    # 发票日期在加载时已统一为 datetime 格式，这里只删除发票金额或发票日期为空的行
     df = df.dropna(subset=['发票金额', '发票日期'])
-    df['月份'] = df['发票日期'].dt.to_period('M').astype(str)
+    # 发票月键 / 发票周键 在加载时已生成（见 calendar_keys.py），分组使用整数键，月份、周范围文本只在汇总结果上查表生成
+
+    # 部门 / 公司 × 月 × 周 的采购汇总立方体（每个数据版本只计算一次，见 aggregate_cube.py）
+    # 月度、周度图表都在立方体上切片、上卷；立方体会跳过发票金额为空的格子，与上面的 dropna 一致
+    cube = load_ledger_cube('发票', exclude_card_suppliers=False, drop_void=False)
 
     
     st.info("**采购金额**：根据已有发票金额进行统计分析。")
@@ -35,8 +43,9 @@ def achat_des_produits():
     )
 
     if chart_type == '📆 部门月度采购':
-        purchase_summary = df.groupby(['部门', '月份'])['发票金额'].sum().reset_index()
-        monthly_totals = df.groupby('月份')['发票金额'].sum().reset_index()
+        purchase_summary = cube_rollup(cube, ['部门', '发票月键'], '发票金额')
+        purchase_summary = with_month_label(purchase_summary, '发票月键')
+        monthly_totals = with_month_label(cube_rollup(cube, '发票月键', '发票金额'), '发票月键')
         monthly_totals_dict = monthly_totals.set_index('月份')['发票金额'].to_dict()
 
         unique_departments = sorted(purchase_summary['部门'].unique())
@@ -44,13 +53,13 @@ def achat_des_produits():
         color_map = {dept: colors[i % len(colors)] for i, dept in enumerate(unique_departments)}
 
         purchase_summary['总采购金额'] = purchase_summary['月份'].map(monthly_totals_dict)
-        purchase_summary['提示信息'] = purchase_summary.apply(
-            lambda row: f"🔹 {row['月份'][:4]}年{row['月份'][5:]}月 <br>"
-                        f"总采购金额：{row['总采购金额']:,.0f}<br><br>"
-                        f"部门：{row['部门']}<br>"
-                        f"采购金额：{row['发票金额']:,.0f}<br>"
-                        f"占比：{row['发票金额'] / row['总采购金额']:.1%}",
-            axis=1
+        purchase_summary['提示信息'] = hover_text(
+            "🔹 " + month_title(purchase_summary['月份']) + " ",
+            "总采购金额：" + format_amount(purchase_summary['总采购金额']),
+            "",
+            "部门：" + purchase_summary['部门'].astype(str),
+            "采购金额：" + format_amount(purchase_summary['发票金额']),
+            "占比：" + format_ratio(purchase_summary['发票金额'], purchase_summary['总采购金额']),
         )
 
         fig_month = px.line(
@@ -73,26 +82,23 @@ def achat_des_produits():
         st.plotly_chart(fig_month, key="monthly_purchase_chart")
 
     elif chart_type == '📅 部门周度采购':
-        df['周开始'] = df['发票日期'] - pd.to_timedelta(df['发票日期'].dt.weekday, unit='D')
-        df['周结束'] = df['周开始'] + timedelta(days=6)
-        df['周范围'] = df['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + df['周结束'].dt.strftime('%Y-%m-%d')
-
-        valid_months = sorted(df['月份'].unique())
-        current_month_str = datetime.now().strftime("%Y-%m")
-        default_index = valid_months.index(current_month_str) if current_month_str in valid_months else len(valid_months)-1
-        selected_month = st.selectbox("📅 选择月份", valid_months, index=default_index)
-
-        weekly_summary = df[df['月份'] == selected_month].groupby(
-            ['部门', '周范围', '周开始', '周结束']
-        )['发票金额'].sum().reset_index().sort_values('周开始')
-
-        weekly_totals = weekly_summary.groupby('周范围')['发票金额'].sum().to_dict()
-        weekly_summary['提示信息'] = weekly_summary.apply(
-            lambda row: f"周总采购金额：{weekly_totals[row['周范围']]:,.0f}<br>"
-                        f"部门：{row['部门']}<br>"
-                        f"采购金额：{row['发票金额']:,.0f}<br>"
-                        f"占比：{row['发票金额'] / weekly_totals.get(row['周范围'], 1):.1%}",
-            axis=1
+        valid_months = month_keys(df['发票月键'])
+        current_month = current_month_key()
+        default_index = valid_months.index(current_month) if current_month in valid_months else len(valid_months)-1
+        selected_month_key = st.selectbox("📅 选择月份", valid_months, index=default_index, format_func=month_label)
+        selected_month = month_label(selected_month_key)
+
+        weekly_summary = cube_rollup(
+            cube_slice(cube, {'发票月键': selected_month_key}), ['部门', '发票周键'], '发票金额'
+        ).sort_values('发票周键')
+        weekly_summary = with_week_labels(weekly_summary, '发票周键')
+
+        weekly_totals = weekly_summary.groupby('发票周键')['发票金额'].transform('sum')
+        weekly_summary['提示信息'] = hover_text(
+            "周总采购金额：" + format_amount(weekly_totals),
+            "部门：" + weekly_summary['部门'].astype(str),
+            "采购金额：" + format_amount(weekly_summary['发票金额']),
+            "占比：" + format_ratio(weekly_summary['发票金额'], weekly_totals),
         )
 
         fig_week = px.line(
@@ -116,32 +122,29 @@ def achat_des_produits():
     elif chart_type == '🏢 公司周度采购':
         st.markdown("### 🏢 选择月份和部门，查看公司周度采购趋势")
 
-        valid_months = sorted(df['月份'].unique())
-        current_month_str = datetime.now().strftime("%Y-%m")
-        default_index = valid_months.index("2025-06") if "2025-06" in valid_months else len(valid_months)-1
-        selected_month = st.selectbox("📅 选择月份", valid_months, index=default_index)
+        valid_months = month_keys(df['发票月键'])
+        default_index = valid_months.index(202506) if 202506 in valid_months else len(valid_months)-1
+        selected_month_key = st.selectbox("📅 选择月份", valid_months, index=default_index, format_func=month_label)
+        selected_month = month_label(selected_month_key)
 
         # ✅ 定义你希望优先显示的部门顺序
         # 定义的部门顺序函数 位于 data_loader.py， 函数名：get_ordered_departments，可前往查看详细版本
         departments, default_dept_index = get_ordered_departments(df)
         selected_dept = st.selectbox("🏷️ 选择部门", departments, index=default_dept_index, key="dept_select")
 
-        df_filtered = df[(df['月份'] == selected_month) & (df['部门'] == selected_dept)].copy()
-        df_filtered['周开始'] = df_filtered['发票日期'] - pd.to_timedelta(df_filtered['发票日期'].dt.weekday, unit='D')
-        df_filtered['周结束'] = df_filtered['周开始'] + timedelta(days=6)
-        df_filtered['周范围'] = df_filtered['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + df_filtered['周结束'].dt.strftime('%Y-%m-%d')
-
-        company_week_summary = df_filtered.groupby(
-            ['公司名称', '周范围', '周开始', '周结束']
-        )['发票金额'].sum().reset_index().sort_values('周开始')
-
-        weekly_totals = company_week_summary.groupby('周范围')['发票金额'].sum().to_dict()
-        company_week_summary['提示信息'] = company_week_summary.apply(
-            lambda row: f"周总采购金额：{weekly_totals[row['周范围']]:,.0f}<br>"
-                        f"公司名称：{row['公司名称']}<br>"
-                        f"采购金额：{row['发票金额']:,.0f}<br>"
-                        f"占比：{row['发票金额'] / weekly_totals.get(row['周范围'], 1):.1%}",
-            axis=1
+        cube_filtered = cube_slice(cube, {'发票月键': selected_month_key, '部门': selected_dept})
+
+        company_week_summary = cube_rollup(
+            cube_filtered, ['公司名称', '发票周键'], '发票金额'
+        ).sort_values('发票周键')
+        company_week_summary = with_week_labels(company_week_summary, '发票周键')
+
+        weekly_totals = company_week_summary.groupby('发票周键')['发票金额'].transform('sum')
+        company_week_summary['提示信息'] = hover_text(
+            "周总采购金额：" + format_amount(weekly_totals),
+            "公司名称：" + company_week_summary['公司名称'].astype(str),
+            "采购金额：" + format_amount(company_week_summary['发票金额']),
+            "占比：" + format_ratio(company_week_summary['发票金额'], weekly_totals),
         )
 
         fig_company_week = px.line(
@@ -166,17 +169,6 @@ def achat_des_produits():
     
     elif chart_type == '📊 公司采购时间间隔与金额分布':
 
-
-        df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
-        df = df.dropna(subset=['发票金额', '发票日期'])
-        df['月份'] = df['发票日期'].dt.to_period('M').astype(str)
-        
-        
-        df['周开始'] = df['发票日期'] - pd.to_timedelta(df['发票日期'].dt.weekday, unit='D')
-        df['周结束'] = df['周开始'] + timedelta(days=6)
-        df['周范围'] = df['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + df['周结束'].dt.strftime('%Y-%m-%d')
-
-
         # 2. 交互组件
 
         # ✅ 定义你希望优先显示的部门顺序
@@ -185,7 +177,8 @@ def achat_des_produits():
         selected_dept = st.selectbox("🏷️ 选择部门", departments, index=default_dept_index, key="dept_select")
 
 
-        company_list = sorted(df[df['部门'] == selected_dept]['公司名称'].unique())
+        # 该部门出现过的公司（查公司名称索引，见 company_index.py）
+        company_list = sorted(company_names(load_company_index(), selected_dept))
         company_list = ['全部'] + company_list  # 添加“全部”选项至顶部
 
         company_mode = st.selectbox("公司选择模式", ["全部公司", "手动选择公司"])
@@ -211,10 +204,11 @@ def achat_des_produits():
 
         # 分组聚合后用于绘图的数据
         scatter_df = (
-            filtered_df.groupby(['公司名称', '周范围', '周开始'])['发票金额']
+            filtered_df.groupby(['公司名称', '发票周键'], observed=True)['发票金额']
             .sum()
             .reset_index()
         )
+        scatter_df = with_week_labels(scatter_df, '发票周键')
 
         scatter_df['发票金额'] = scatter_df['发票金额'].round(2)
 
@@ -231,7 +225,7 @@ def achat_des_produits():
         else:
             # 仅保留采购金额前20的公司
             companies_to_show = (
-                scatter_df.groupby('公司名称')['发票金额'].sum()
+                scatter_df.groupby('公司名称', observed=True)['发票金额'].sum()
                 .sort_values(ascending=False)
                 .head(20)
                 .index.tolist()
@@ -242,7 +236,7 @@ def achat_des_produits():
 
         # ✅ 手动计算公司总采购金额排序
         company_order = (
-            scatter_df.groupby("公司名称")["发票金额"]
+            scatter_df.groupby("公司名称", observed=True)["发票金额"]
             .sum()
             .sort_values(ascending=True)
             .index.tolist()
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 汇总立方体（部门 × 公司名称 × 月 × 周）
+# 每个数据版本只按 部门 / 公司名称 / 月键 / 周键 分组求和一次，
+# 页面上的月度、周度、公司明细图表都在这张小得多的汇总表上切片、上卷，不再每次对明细行重新 groupby
+# ============================================================================
+
+# 立方体中汇总的金额列
+CUBE_MEASURES = ['发票金额', '实际支付金额', '应付未付']
+
+# 立方体的非时间维度
+CUBE_DIMENSIONS = ['部门', '公司名称']
+
+
+def cube_time_keys(axis):
+    """
+    时间轴对应的 月键 / 周键 列名，如 axis='发票' → ['发票月键', '发票周键']，axis='支票' → ['支票月键', '支票周键']。
+    """
+    return [f'{axis}月键', f'{axis}周键']
+
+
+def build_cube(df, axis):
+    """
+    将明细数据汇总为立方体：每个 (部门, 公司名称, 月键, 周键) 组合一行，金额列为合计。
+
+    参数：
+    - df: 明细数据（须包含 部门、公司名称、{axis}月键、{axis}周键，见 calendar_keys.py）
+    - axis: 时间轴，'发票'（按发票日期统计）或 '支票'（按开支票日期统计）
+
+    返回：
+    - cube: 汇总表；维度为空的明细（如没有日期）也保留为单独的格子，保证上卷后的合计与明细一致。
+      除金额合计外，每个格子还记录 {金额列}笔数（该列非空的行数）和 行数：
+      笔数为 0 的格子在切片 / 上卷时会被跳过，与先 dropna 再 groupby 的结果相同；
+      增量更新（apply_cube_delta）时也靠它们判断格子是否已经没有数据
+    """
+    keys = CUBE_DIMENSIONS + cube_time_keys(axis)
+    measures = [col for col in CUBE_MEASURES if col in df.columns]
+
+    grouped = df.groupby(keys, observed=True, dropna=False)
+    cube = pd.concat([
+        grouped[measures].sum(),
+        grouped[measures].count().add_suffix('笔数'),
+        grouped.size().rename('行数'),
+    ], axis=1)
+    return cube.reset_index()
+
+
+def cube_value_columns(cube):
+    """
+    立方体中可以相加的列：金额合计、笔数、行数。
+    """
+    return [col for col in cube.columns if col in CUBE_MEASURES or col.endswith('笔数') or col == '行数']
+
+
+def _align_categories(frames, columns):
+    """
+    将多个 DataFrame 中同名的分类列统一为相同的类别（类别取并集），拼接后仍为分类列。
+    """
+    for col in columns:
+        if not all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            continue
+        categories = frames[0][col].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[col].cat.categories)
+        for frame in frames:
+            frame[col] = frame[col].cat.set_categories(categories)
+    return frames
+
+
+def apply_cube_delta(cube, removed, added):
+    """
+    增量更新立方体：cube - removed + added，只修改受影响的格子。
+
+    参数：
+    - cube: 上一个数据版本的立方体（不会被修改）
+    - removed: 被修改的旧明细行汇总出的立方体（build_cube 的结果，与 cube 同一时间轴）
+    - added: 被修改后的新明细行 + 新增明细行汇总出的立方体
+
+    返回：
+    - cube: 更新后的立方体；已经没有明细行的格子被删除，新出现的格子追加在末尾
+    """
+    keys = [col for col in cube.columns if col not in cube_value_columns(cube)]
+    value_cols = cube_value_columns(cube)
+
+    # 1️⃣ 合并出每个受影响格子的变化量（减去的部分取负数）
+    removed = removed.copy()
+    removed[value_cols] = -removed[value_cols]
+    delta_parts = _align_categories([removed, added.copy()], keys)
+    delta = pd.concat(delta_parts, ignore_index=True).groupby(keys, observed=True, dropna=False)[value_cols].sum()
+
+    # 2️⃣ 已有的格子：按维度定位后直接累加
+    # 维度中有空值（<NA> / NaN），用 groupby(dropna=False) 对两边的维度统一编号来定位，空值与空值视为同一格子
+    delta = delta.reset_index()
+    cube = cube.copy()
+    cube_keys, delta_keys = _align_categories([cube[keys].copy(), delta[keys].copy()], keys)
+    codes = (
+        pd.concat([cube_keys, delta_keys], ignore_index=True)
+        .groupby(keys, observed=True, dropna=False, sort=False)
+        .ngroup()
+        .to_numpy()
+    )
+    position_of_code = np.full(codes.max() + 1, -1)
+    position_of_code[codes[:len(cube)]] = np.arange(len(cube))
+    positions = position_of_code[codes[len(cube):]]
+    hit = positions >= 0
+    for col in value_cols:
+        values = cube[col].to_numpy(copy=True)
+        values[positions[hit]] += delta[col].to_numpy()[hit].astype(values.dtype)
+        cube[col] = values
+
+    # 3️⃣ 新出现的格子：追加到末尾
+    new_cells = delta[~hit]
+    if not new_cells.empty:
+        cube, new_cells = _align_categories([cube, new_cells], keys)
+        cube = pd.concat([cube, new_cells[cube.columns]], ignore_index=True)
+
+    return cube[cube['行数'] > 0].reset_index(drop=True)
+
+
+def cube_slice(cube, filters):
+    """
+    按维度取值筛选立方体的格子。
+
+    参数：
+    - cube: build_cube 的结果（或其切片）
+    - filters: {列名: 取值}，取值为单个值或列表（列表时为“属于其中之一”），
+      如 {'发票月键': 202506, '部门': '杂货'}
+
+    返回：
+    - cube: 筛选后的立方体
+    """
+    mask = pd.Series(True, index=cube.index)
+    for col, value in filters.items():
+        if isinstance(value, (list, tuple, set, pd.Index, pd.Series)):
+            mask &= cube[col].isin(list(value))
+        else:
+            mask &= cube[col] == value
+    return cube[mask.fillna(False).astype(bool)]
+
+
+def cube_rollup(cube, by, measure):
+    """
+    将立方体上卷到 by 维度，对 measure 求和（与对明细行 groupby(by)[measure].sum() 的结果相同）。
+
+    参数：
+    - cube: build_cube 的结果（或其切片）
+    - by: 保留的维度列（字符串或列表），如 ['部门', '发票周键']；空值维度不参与分组
+    - measure: 金额列，如 '发票金额'
+
+    返回：
+    - summary: by 各列 + measure 列的 DataFrame，按 by 排序（分类列按类别顺序）
+    """
+    cells = cube[cube[f'{measure}笔数'] > 0] if f'{measure}笔数' in cube.columns else cube
+    return cells.groupby(by, observed=True)[measure].sum().reset_index()
+
+
+def cube_top_n(cube, by, measure, n):
+    """
+    按 measure 合计从大到小取前 n 个 by 值。
+
+    返回：
+    - values: 前 n 个 by 的取值列表（by 为单列时）
+    """
+    ranked = cube_rollup(cube, by, measure).sort_values(by=measure, ascending=False).head(n)
+    return ranked[by].tolist()
@@ -5,8 +5,13 @@ from datetime import datetime, timedelta
 
 import plotly.express as px
 
-from modules.data_loader import load_supplier_data
+from modules.ledger_stages import load_company_index, load_gestion_unpaid, load_ledger_cube
+from modules.aggregate_cube import cube_rollup, cube_slice
+from modules.company_index import company_names
 from modules.data_loader import get_ordered_departments
+from modules.calendar_keys import current_month_key, month_keys, month_label, with_month_label, with_week_labels
+from modules.hover_text import format_amount, format_ratio, hover_text, month_title
+from modules.cheque_keys import CHEQUE_KIND_PAPER
 
 # 实际付款金额
 def analyse_des_payments():
@@ -23,21 +28,17 @@ def analyse_des_payments():
     6. 提供说明信息。
 
     使用依赖：
-    - 函数 `load_supplier_data()`：从本地或外部源加载付款数据。
+    - 函数 `load_gestion_unpaid()`（ledger_stages.py）：按数据版本缓存的付款数据。
     - Streamlit、Pandas、Plotly。
     """
 
-    # 1️⃣ 加载原始数据
-    df = load_supplier_data()
+    # 1️⃣ 加载 df_gestion_unpaid（对公司名称结尾为 * 的自动扣款公司，已模拟“发票后10天自动付款”，并计算应付未付）
+    # 构建逻辑与 未付款分析 / 付款周期分析 共用，见 ledger_stages.py；每个数据版本只计算一次，这里只读使用
+    # 付款分析保留信用卡供应商和作废记录，因此行与原始数据一一对应，可直接作为 df 使用
+    df_gestion_unpaid = load_gestion_unpaid(exclude_card_suppliers=False, drop_void=False)
+    df = df_gestion_unpaid
 
-    # 2️⃣ 转换日期字段为 pandas datetime 类型
-    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
-    df['开支票日期'] = pd.to_datetime(df['开支票日期'], errors='coerce')
-
-    # 3️⃣ 获取当前日期（用于计算“发票后+10天”的截止逻辑）
-    current_date = pd.to_datetime(datetime.today().date())
-
-    # 4️⃣ 构建部门颜色映射字典（用于后续图表显示）
+    # 2️⃣ 构建部门颜色映射字典（用于后续图表显示）
     unique_departments_paid = sorted(df['部门'].dropna().unique())
     colors_paid = px.colors.qualitative.Dark24  # Plotly内置高对比色板（24色）
 
@@ -46,50 +47,15 @@ def analyse_des_payments():
         for i, dept in enumerate(unique_departments_paid)
     }
 
-    # 5️⃣ 复制原始数据用于模拟付款逻辑
-    df_gestion_unpaid = df.copy()
-
-    # 6️⃣ 识别【公司名称结尾为 *】且尚未付款（无开支票日期）的行
-    mask_star_company = df_gestion_unpaid['公司名称'].astype(str).str.endswith("*")
-    mask_no_cheque_date = df_gestion_unpaid['开支票日期'].isna()
-    mask_star_and_pending = mask_star_company & mask_no_cheque_date
-
-    # 7️⃣ 找出逾期未付款：发票日期 + 10天 < 当前日期
-    condition_overdue = (
-        mask_star_and_pending &
-        (df_gestion_unpaid['发票日期'] + pd.Timedelta(days=10) < current_date)
-    )
-
-    # 8️⃣ 对逾期行设置模拟“自动付款”
-    df_gestion_unpaid.loc[condition_overdue, '开支票日期'] = \
-        df_gestion_unpaid.loc[condition_overdue, '发票日期'] + pd.Timedelta(days=10)
-
-    df_gestion_unpaid.loc[condition_overdue, '实际支付金额'] = \
-        df_gestion_unpaid.loc[condition_overdue, '发票金额']
-
-    df_gestion_unpaid.loc[condition_overdue, '付款支票总金额'] = \
-        df_gestion_unpaid.loc[condition_overdue, '发票金额']
-
-    # 9️⃣ 计算“应付未付金额”列
-
-    amount_cols = ['发票金额', '实际支付金额']
-    df_gestion_unpaid[amount_cols] = df_gestion_unpaid[amount_cols].apply(pd.to_numeric, errors='coerce')
-
-    
-    df_gestion_unpaid['应付未付'] = (
-        df_gestion_unpaid['发票金额'].fillna(0) - df_gestion_unpaid['实际支付金额'].fillna(0)
-    )
-
-    # 🔟 创建付款分析专用副本（仅包含有效付款数据）
-    df_paid = df_gestion_unpaid.copy()
-
     # 🔄 清理数据：仅保留已付款记录（有开支票日期与实际支付金额）
-    df_paid_cheques = df_paid.dropna(subset=['开支票日期', '实际支付金额'])
-    paid_df = df_paid_cheques[df_paid_cheques['实际支付金额'].notna()]
+    df_paid_cheques = df_gestion_unpaid.dropna(subset=['开支票日期', '实际支付金额'])
+    paid_df = df_paid_cheques[df_paid_cheques['实际支付金额'].notna()].copy()
 
-    # 🗓️ 添加付款月份字段（用于图表按月聚合分析）
-    paid_df['开支票日期'] = pd.to_datetime(paid_df['开支票日期'])  # 保底确保为时间格式
-    paid_df['月份'] = paid_df['开支票日期'].dt.to_period('M').astype(str)
+    # 🗓️ 付款月份 / 周：直接使用加载时生成的 支票月键 / 支票周键（见 calendar_keys.py），显示文本只对汇总结果生成
+
+    # 部门 / 公司 × 付款月 × 付款周 的汇总立方体（每个数据版本只计算一次，见 aggregate_cube.py）
+    # 立方体按 支票月键 / 支票周键 汇总，并跳过实际支付金额为空的格子，切片、上卷结果与对 paid_df 分组相同
+    paid_cube = load_ledger_cube('支票', exclude_card_suppliers=False, drop_void=False)
 
     # ✅ 展示说明文字
     st.info("📌 **付款金额说明：** 以上数据基于实际付款记录进行分析。")
@@ -109,22 +75,24 @@ def analyse_des_payments():
     # 图1：周度付款图（仅当用户选择周度时生成）
     if chart_type == '📆 部门月度付款趋势':
         # 月度汇总
-        # 第1步：按“部门”和“月份”进行分组，汇总每组的“实际支付金额”总和
-        # groupby(['部门', '月份'])：以“部门”和“月份”这两个字段作为分组键
+        # 第1步：按“部门”和“支票月键”进行分组，汇总每组的“实际支付金额”总和
+        # groupby(['部门', '支票月键'])：以“部门”和月份（整数键，如 202506）这两个字段作为分组键
         # ['实际支付金额']：指定我们只对“实际支付金额”这一列进行操作
         # .sum()：对每个分组计算“实际支付金额”的总和
         # .reset_index()：将分组后的索引还原为普通列（否则结果会是层级索引 MultiIndex）
-        paid_summary = paid_df.groupby(['部门', '月份'])['实际支付金额'].sum().reset_index()
+        # with_month_label：按月键添加“月份”文本列（如 '2025-06'），用作 X 轴
+        paid_summary = cube_rollup(paid_cube, ['部门', '支票月键'], '实际支付金额')
+        paid_summary = with_month_label(paid_summary.sort_values('支票月键'), '支票月键')
 
-        # 第2步：只按“月份”进行分组，计算每个月的总支付金额（不区分部门）
+        # 第2步：只按“支票月键”进行分组，计算每个月的总支付金额（不区分部门）
         # 这用于后续计算每个部门在当月付款中的占比
-        monthly_totals = paid_df.groupby('月份')['实际支付金额'].sum().reset_index()
+        monthly_totals = cube_rollup(paid_cube, '支票月键', '实际支付金额')
 
         # 第3步：将 monthly_totals 转为字典，以便快速查找某个月份的总金额
-        # .set_index('月份')：把“月份”列设置为索引，以便后续按月份快速查值
+        # .set_index('支票月键')：把“支票月键”列设置为索引，以便后续按月份快速查值
         # ['实际支付金额']：取出“实际支付金额”这一列作为值
-        # .to_dict()：将 Series 转换为字典，格式为 {月份字符串: 实际支付金额总和}
-        monthly_totals_dict = monthly_totals.set_index('月份')['实际支付金额'].to_dict()
+        # .to_dict()：将 Series 转换为字典，格式为 {月键: 实际支付金额总和}
+        monthly_totals_dict = monthly_totals.set_index('支票月键')['实际支付金额'].to_dict()
 
 
         # 配色
@@ -140,19 +108,19 @@ def analyse_des_payments():
         # 为每一行添加两列：一列是总支付金额（该月所有部门合计），一列是图表用的悬浮提示信息（HTML格式）
 
         # 第1步：根据“月份”映射出当月的总支付金额，生成“总支付金额”列
-        # map(monthly_totals_dict)：根据月份查找 monthly_totals_dict 中的值，例如 '2025-06' → 182000
+        # map(monthly_totals_dict)：根据月键查找 monthly_totals_dict 中的值，例如 202506 → 182000
         # 最终每一行都有自己对应月份的总支付金额，用于后续计算占比
-        paid_summary['总支付金额'] = paid_summary['月份'].map(monthly_totals_dict)
+        paid_summary['总支付金额'] = paid_summary['支票月键'].map(monthly_totals_dict)
 
         # 第2步：构建悬浮提示信息（hover tooltip），用于 Plotly 图表中展示每行数据的详细内容
-        # apply(..., axis=1)：对 DataFrame 的每一行执行 lambda 函数，拼接格式化的 HTML 字符串
-        paid_summary['提示信息'] = paid_summary.apply(
-            lambda row: f"🔹 {row['月份'][:4]}年{row['月份'][5:]}月 <br>"                  # 提示标题，例如 "2025年06月"
-                        f"支付总金额：{monthly_totals_dict[row['月份']]:,.0f}<br><br>"    # 显示该月所有部门的总支付金额，千位加逗号
-                        f"部门：{row['部门']}<br>"                                        # 当前行对应的部门名
-                        f"付款金额：{row['实际支付金额']:,.0f}<br>"                        # 当前部门该月的付款金额
-                        f"占比：{row['实际支付金额'] / monthly_totals_dict.get(row['月份'], 1):.1%}",  # 当前部门占该月总付款的百分比（例如 12.5%）
-            axis=1
+        # hover_text(...)：每一行提示文本都是整列运算得到的字符串 Series，再用 <br> 连接成 HTML（见 hover_text.py）
+        paid_summary['提示信息'] = hover_text(
+            "🔹 " + month_title(paid_summary['月份']) + " ",                       # 提示标题，例如 "2025年06月"
+            "支付总金额：" + format_amount(paid_summary['总支付金额']),            # 显示该月所有部门的总支付金额，千位加逗号
+            "",
+            "部门：" + paid_summary['部门'].astype(str),                           # 当前行对应的部门名
+            "付款金额：" + format_amount(paid_summary['实际支付金额']),            # 当前部门该月的付款金额
+            "占比：" + format_ratio(paid_summary['实际支付金额'], paid_summary['总支付金额']),  # 当前部门占该月总付款的百分比（例如 12.5%）
         )
 
 
@@ -192,23 +160,20 @@ def analyse_des_payments():
 
 
 
-        # 1️⃣ 加载原始数据
-        df_count_num_check = load_supplier_data()
+        # 1️⃣ 使用上面已加载的数据（付款支票号未被自动扣款模拟修改，与原始数据一致）
+        df_count_num_check = df
 
         # 假设 df 已经存在，包含“付款支票号”和“开支票日期”
 
-        # 1. 筛选付款支票号为数值（比如 int 或 float）
-        df_numeric = df_count_num_check[pd.to_numeric(df["付款支票号"], errors="coerce").notna()].copy()
+        # 1. 筛选纸质支票（付款支票号为纯数字，支票类型在加载时已解析，见 cheque_keys.py）
+        df_numeric = df_count_num_check[df_count_num_check["支票类型"] == CHEQUE_KIND_PAPER]
 
         # 2. 去重（同一个支票号只计算一次）
         df_unique = df_numeric.drop_duplicates(subset=["付款支票号"])
 
-        # 3. 转换开支票日期为 datetime，并提取月份
-        df_unique["开支票日期"] = pd.to_datetime(df_unique["开支票日期"], errors="coerce")
-        df_unique["月份"] = df_unique["开支票日期"].dt.to_period("M")
-
-        # 4. 按月份统计支票数量
-        result = df_unique.groupby("月份")["付款支票号"].count().reset_index(name="支票数量")
+        # 3. 按 支票月键 统计支票数量，再查表生成“月份”文本
+        result = df_unique.groupby("支票月键")["付款支票号"].count().reset_index(name="支票数量")
+        result = with_month_label(result, "支票月键")[["月份", "支票数量"]]
 
         st.info("部门每月的付款支票数量")
         st.dataframe(result)
@@ -217,70 +182,40 @@ def analyse_des_payments():
 
     # 图2：周度付款图（仅当用户选择周度时生成）
     if chart_type == '📅 部门周度付款趋势':
-        valid_months = sorted(paid_df['月份'].unique())
-        current_month_str = datetime.now().strftime("%Y-%m")
-        default_index = valid_months.index(current_month_str) if current_month_str in valid_months else len(valid_months) - 1
-        selected_month = st.selectbox("🔎 选择查看具体周数据的月份", valid_months, index=default_index)
-
-        # 周计算
-
-        # 第1步：计算“周开始”列（即每笔付款所在周的星期一日期）
-        # .dt.weekday：返回开支票日期是星期几（0 = 周一，6 = 周日）
-        # pd.to_timedelta(..., unit='D')：将 weekday 转换为天数的时间差
-        # 用 开支票日期 - weekday天 → 得到该日期所在周的星期一
-        paid_df['周开始'] = paid_df['开支票日期'] - pd.to_timedelta(paid_df['开支票日期'].dt.weekday, unit='D')
-
-        # 第2步：计算“周结束”列（即该周的星期日日期）
-        # “周开始” + 6天，即为同一周的星期日
-        paid_df['周结束'] = paid_df['周开始'] + timedelta(days=6)
-
-        # 第3步：生成“周范围”列（字符串格式），用于图表的 X 轴标签或分组显示
-        # 形式为 "2025-06-03 ~ 2025-06-09"
-        paid_df['周范围'] = (
-            paid_df['周开始'].dt.strftime('%Y-%m-%d') +
-            ' ~ ' +
-            paid_df['周结束'].dt.strftime('%Y-%m-%d')
+        valid_months = month_keys(paid_df['支票月键'])
+        this_month = current_month_key()
+        default_index = valid_months.index(this_month) if this_month in valid_months else len(valid_months) - 1
+        selected_month_key = st.selectbox(
+            "🔎 选择查看具体周数据的月份", valid_months, index=default_index, format_func=month_label
         )
+        selected_month = month_label(selected_month_key)
 
-
-        # 筛选所选月份
-        
+        # 周计算
+        # 支票周键 = 每笔付款所在周的星期一（yyyymmdd 整数），加载数据时已生成
+        # 周开始 / 周结束 / 周范围（如 "2025-06-03 ~ 2025-06-09"）只对汇总后的少量周键查表生成
 
 
-        # 第1步：从已清洗好的付款数据中筛选出用户选择的月份（例如 '2025-06'）对应的所有记录
-        # paid_df['月份'] == selected_month：布尔过滤条件，保留只有当前选中月份的数据
+        # 第1步：从付款汇总立方体中切出用户选择的月份（例如 202506）对应的格子
+        # cube_slice(..., {'支票月键': selected_month_key})：只保留当前选中月份的格子
         # 目的是只对某一月的数据进行周度分析
-        weekly_summary_filtered = paid_df[paid_df['月份'] == selected_month].groupby(
-                
-                # 第2步：按4个字段分组（每一组将合并为一条记录，求和“实际支付金额”）
-                ['部门',       # 部门名（如：财务部、采购部等）
-                '周范围',     # 字符串格式的周区间，如 '2025-06-17 ~ 2025-06-23'
-                '周开始',     # datetime 类型的本周周一日期，后面用于排序
-                '周结束'      # datetime 类型的本周周日日期，仅用于展示完整周范围
-                ]
-            )['实际支付金额'].sum().reset_index()     # 指定只对“实际支付金额”列进行聚合
-
-            # 第3步：将 groupby 的分组汇总结果转为常规 DataFrame（非层级索引）
-            # sum()：对每组计算实际支付金额的总和
-            # reset_index()：重建 DataFrame 索引，便于后续使用和绘图
-            
-
-
-        weekly_summary_filtered['周开始'] = pd.to_datetime(weekly_summary_filtered['周开始'])
-        weekly_summary_filtered = weekly_summary_filtered.sort_values(by='周开始').reset_index(drop=True)
-        weekly_summary_filtered['周范围'] = weekly_summary_filtered['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + weekly_summary_filtered['周结束'].dt.strftime('%Y-%m-%d')
+        # 第2步：上卷到 部门 + 支票周键，对“实际支付金额”求和；整数周键的大小顺序就是时间顺序
+        weekly_summary_filtered = cube_rollup(
+            cube_slice(paid_cube, {'支票月键': selected_month_key}), ['部门', '支票周键'], '实际支付金额'
+        )
+
+        # 第3步：按周键排序，并查表添加 周开始 / 周结束 / 周范围
+        weekly_summary_filtered = weekly_summary_filtered.sort_values(by='支票周键').reset_index(drop=True)
+        weekly_summary_filtered = with_week_labels(weekly_summary_filtered, '支票周键')
 
         #st.dataframe(paid_df)
 
-        weekly_totals = weekly_summary_filtered.groupby('周范围')['实际支付金额'].sum().reset_index()
-        weekly_totals_dict = weekly_totals.set_index('周范围')['实际支付金额'].to_dict()
+        weekly_totals = weekly_summary_filtered.groupby('支票周键')['实际支付金额'].transform('sum')
 
-        weekly_summary_filtered['提示信息'] = weekly_summary_filtered.apply(
-            lambda row: f"所选周总支付金额：{weekly_totals_dict[row['周范围']]:,.0f}<br>"
-                        f"部门：{row['部门']}<br>"
-                        f"实际付款金额：{row['实际支付金额']:,.0f}<br>"
-                        f"占比：{row['实际支付金额'] / weekly_totals_dict.get(row['周范围'], 1):.1%}",
-            axis=1
+        weekly_summary_filtered['提示信息'] = hover_text(
+            "所选周总支付金额：" + format_amount(weekly_totals),
+            "部门：" + weekly_summary_filtered['部门'].astype(str),
+            "实际付款金额：" + format_amount(weekly_summary_filtered['实际支付金额']),
+            "占比：" + format_ratio(weekly_summary_filtered['实际支付金额'], weekly_totals),
         )
 
         fig_paid_week = px.line(
@@ -310,51 +245,38 @@ def analyse_des_payments():
         st.markdown("### 🏢 选择月份和部门，查看公司付款趋势")
 
         # 月份选择
-        valid_months = sorted(paid_df['月份'].unique())
-        current_month_str = datetime.now().strftime("%Y-%m")
-        default_index = valid_months.index(current_month_str) if current_month_str in valid_months else len(valid_months) - 1
-        selected_month = st.selectbox("📅 选择月份", valid_months, index=default_index)
+        valid_months = month_keys(paid_df['支票月键'])
+        this_month = current_month_key()
+        default_index = valid_months.index(this_month) if this_month in valid_months else len(valid_months) - 1
+        selected_month_key = st.selectbox("📅 选择月份", valid_months, index=default_index, format_func=month_label)
+        selected_month = month_label(selected_month_key)
 
         # 部门选择
         # 此处引用 data_loader.py 中的 get_ordered_departments 函数, 使用的是 paid_df 数据库
         departments, default_dept_index = get_ordered_departments(paid_df)
         selected_dept = st.selectbox("🏷️ 选择部门", departments, index=default_dept_index, key="dept_select")
 
-        # 筛选数据
-        df_filtered = paid_df[(paid_df['月份'] == selected_month) & (paid_df['部门'] == selected_dept)]
-
-        # 计算“周开始”和“周结束”
-        df_filtered['周开始'] = df_filtered['开支票日期'] - pd.to_timedelta(df_filtered['开支票日期'].dt.weekday, unit='D')
-        df_filtered['周结束'] = df_filtered['周开始'] + timedelta(days=6)
-        df_filtered['周范围'] = df_filtered['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + df_filtered['周结束'].dt.strftime('%Y-%m-%d')
-
-        # 分组：公司 + 周范围
-        company_week_summary = df_filtered.groupby(
-            ['公司名称', '周范围', '周开始', '周结束']
-        )['实际支付金额'].sum().reset_index()
-
-        # 排序 + 重建周范围列
-        company_week_summary = company_week_summary.sort_values(by='周开始').reset_index(drop=True)
-        company_week_summary['周范围'] = (
-            company_week_summary['周开始'].dt.strftime('%Y-%m-%d') +
-            ' ~ ' +
-            company_week_summary['周结束'].dt.strftime('%Y-%m-%d')
-        )
+        # 筛选立方体格子
+        cube_filtered = cube_slice(paid_cube, {'支票月键': selected_month_key, '部门': selected_dept})
+
+        # 上卷：公司 + 支票周键
+        company_week_summary = cube_rollup(cube_filtered, ['公司名称', '支票周键'], '实际支付金额')
+
+        # 排序 + 查表添加 周开始 / 周结束 / 周范围
+        company_week_summary = company_week_summary.sort_values(by='支票周键').reset_index(drop=True)
+        company_week_summary = with_week_labels(company_week_summary, '支票周键')
 
         # 周总额（用于占比提示）
-        week_total_dict = company_week_summary.groupby('周范围')['实际支付金额'].sum().to_dict()
+        # groupby(...).transform('sum')：直接得到与每一行对齐的周总额，不需要再按“周范围”查字典，
+        # 也就不会出现某个“周范围”不在字典中导致 KeyError 的问题
+        week_total = company_week_summary.groupby('支票周键')['实际支付金额'].transform('sum')
 
         # 提示信息（用于 hover）
-        # ❌ 原始写法为什么出错？ 你用了 week_total_dict[row['周范围']]，当某个“周范围”不在字典中时，会抛出 KeyError，
-        # 导致 .apply() 执行失败，返回了异常结构，不能赋值给一列 → 报错。
-        # .get() 会在找不到键时返回一个默认值（比如 0），不会报错，这样 .apply() 就能顺利对每一行返回一个字符串，最终结果是 一列字符串数据，可以正常赋值。
-        company_week_summary['提示信息'] = company_week_summary.apply(
-            lambda row: #f"所选周总支付金额：{week_total_dict[row['周范围']]:,.0f}<br>"
-                        f"所选周总支付金额：{week_total_dict.get(row['周范围'], 0):,.0f}<br>"
-                        f"公司名称：{row['公司名称']}<br>"
-                        f"实际付款金额：{row['实际支付金额']:,.0f}<br>"
-                        f"占比：{row['实际支付金额'] / week_total_dict.get(row['周范围'], 1):.1%}",
-            axis=1
+        company_week_summary['提示信息'] = hover_text(
+            "所选周总支付金额：" + format_amount(week_total),
+            "公司名称：" + company_week_summary['公司名称'].astype(str),
+            "实际付款金额：" + format_amount(company_week_summary['实际支付金额']),
+            "占比：" + format_ratio(company_week_summary['实际支付金额'], week_total),
         )
 
         # 绘图
@@ -384,9 +306,7 @@ def analyse_des_payments():
 
     elif chart_type == '📊 公司付款时间间隔与金额分布':
         
-        paid_df['周开始'] = paid_df['开支票日期'] - pd.to_timedelta(paid_df['开支票日期'].dt.weekday, unit='D')
-        paid_df['周结束'] = paid_df['周开始'] + timedelta(days=6)
-        paid_df['周范围'] = paid_df['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + paid_df['周结束'].dt.strftime('%Y-%m-%d')
+        # 周开始 / 周范围 在分组汇总后按 支票周键 查表生成
 
 
         # 2. 交互组件
@@ -397,7 +317,8 @@ def analyse_des_payments():
         selected_dept = st.selectbox("🏷️ 选择部门", departments, index=default_dept_index, key="dept_select")
 
 
-        company_list = sorted(df[df['部门'] == selected_dept]['公司名称'].unique())
+        # 该部门出现过的公司（查公司名称索引，见 company_index.py）
+        company_list = sorted(company_names(load_company_index(), selected_dept))
         company_list = ['全部'] + company_list  # 添加“全部”选项至顶部
 
         company_mode = st.selectbox("公司选择模式", ["全部公司", "手动选择公司"])
@@ -423,10 +344,11 @@ def analyse_des_payments():
 
         # 分组聚合后用于绘图的数据
         scatter_df = (
-            filtered_df.groupby(['公司名称', '周范围', '周开始'])['实际支付金额']
+            filtered_df.groupby(['公司名称', '支票周键'], observed=True)['实际支付金额']
             .sum()
             .reset_index()
         )
+        scatter_df = with_week_labels(scatter_df, '支票周键')
 
         scatter_df['实际支付金额'] = scatter_df['实际支付金额'].round(2)
 
@@ -443,7 +365,7 @@ def analyse_des_payments():
         else:
             # 仅保留采购金额前20的公司
             companies_to_show = (
-                scatter_df.groupby('公司名称')['实际支付金额'].sum()
+                scatter_df.groupby('公司名称', observed=True)['实际支付金额'].sum()
                 .sort_values(ascending=False)
                 .head(20)
                 .index.tolist()
@@ -454,7 +376,7 @@ def analyse_des_payments():
 
         # ✅ 手动计算公司总采购金额排序
         company_order = (
-            scatter_df.groupby("公司名称")["实际支付金额"]
+            scatter_df.groupby("公司名称", observed=True)["实际支付金额"]
             .sum()
             .sort_values(ascending=True)
             .index.tolist()
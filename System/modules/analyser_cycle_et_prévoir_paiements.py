@@ -3,63 +3,27 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import plotly.express as px
-from modules.data_loader import load_supplier_data
+from modules.ledger_stages import (
+    load_forecast_backtest,
+    load_gestion_unpaid,
+    load_ledger_indexes,
+    load_outflow_forecast,
+    load_outflow_simulation,
+    load_payment_candidates,
+    load_payment_cycle_stats,
+)
+from modules.ledger_index import lookup_rows
+from modules.payment_forecast import FORECAST_WEEKS, predict_pay_dates, summarize_backtest
+from modules.payment_run import PAYMENT_RUN_WEIGHTS, build_cheque_list, plan_payment_run
+from modules.calendar_keys import with_week_labels
 
 
 def analyser_cycle_et_prévoir_paiements():
 
 
-    df = load_supplier_data()
-
-
-    # 1.1 首先排除出 直接用信用卡VISA-1826 进行支付的，信用卡支付的不是公司支票账户
-    #df = df[~df['公司名称'].isin(['SLEEMAN', 'Arc-en-ciel','Ferme vallee verte'])]
-    df = df[~df['公司名称'].isin(['SLEEMAN', 'Arc-en-ciel'])]
-
-    # 过滤掉 “发票金额”和“实际支付金额”两列的 都为0的数据行
-    # 发票金额 = 实际支付金额 = 0， 表示void 取消的的支票，不再纳入我们的统计中
-    # 因为会影响后续 付款账期计算 以及 统计该公司的 发票数量
-    df = df[~((df['发票金额'] == 0) & (df['实际支付金额'] == 0))]
-
-
-    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
-    df['开支票日期'] = pd.to_datetime(df['开支票日期'], errors='coerce')
-
-    # 2️⃣ 获取当前日期
-    current_date = pd.to_datetime(datetime.today().date())
-
-    df_gestion_unpaid = df.copy()
-
-    # 管理版中，应付未付的统计口径是看是否有 开支票日期， 如果存在 开支票日期 ， 则默认已经支付成功了
-    # 对于 【公司名*】 自动扣款的，这个 开支票日期 就需要自动设置
-
-    # 会计版，相对复杂，统计口径以 银行对账单为准
-
-    
-
-    # 3️⃣ 筛选结尾为 "*" 的公司名，且开支票日期为空的行 ==> 我们要自动处理这些自动扣款的业务
-    # 结尾为 "*" 的公司代表 这些公司使用的 自动扣款模式，因此我们要自动化处理扣款支付
-    mask_star_company = df_gestion_unpaid['公司名称'].astype(str).str.endswith("*")
-    mask_no_cheque_date = df_gestion_unpaid['开支票日期'].isna()
-    mask_star_and_pending = mask_star_company & mask_no_cheque_date
-
-    # 4️⃣ 判断发票日期+10天是否小于当前日期，并处理
-    condition_overdue = (
-        mask_star_and_pending &
-        (df_gestion_unpaid['发票日期'] + pd.Timedelta(days=10) < current_date)
-    )
-
-    # 5️⃣ 对满足条件的行进行赋值操作
-    df_gestion_unpaid.loc[condition_overdue, '开支票日期'] = df_gestion_unpaid.loc[condition_overdue, '发票日期'] + pd.Timedelta(days=10)
-    df_gestion_unpaid.loc[condition_overdue, '实际支付金额'] = df_gestion_unpaid.loc[condition_overdue, '发票金额']
-    df_gestion_unpaid.loc[condition_overdue, '付款支票总额'] = df_gestion_unpaid.loc[condition_overdue, '发票金额']
-
-    # 6️⃣ 新建列【应付未付】
-    # 实际这一步转换可以省略，因为我们在导入数据时data_loader.py 中已经进行了强制 数值转换
-    amount_cols = ['发票金额', '实际支付金额']
-    df_gestion_unpaid[amount_cols] = df_gestion_unpaid[amount_cols].apply(pd.to_numeric, errors='coerce')
-
-    df_gestion_unpaid['应付未付'] = df_gestion_unpaid['发票金额'].fillna(0) - df_gestion_unpaid['实际支付金额'].fillna(0)
+    # df_gestion_unpaid 的构建逻辑（排除信用卡供应商、作废记录，模拟自动扣款，计算应付未付）
+    # 与 付款周期分析 共用，见 ledger_stages.py；每个数据版本只计算一次，这里只读使用
+    df_gestion_unpaid = load_gestion_unpaid()
 
 
     #st.markdown("### df_gestion_unpaid")
@@ -70,29 +34,14 @@ def analyser_cycle_et_prévoir_paiements():
     st.markdown(f"### ⌛ 各公司付款周期分析 - 天数统计")
 
     # 计算付款周期的时候，使用的是之前调整的 df_gestion_unpaid 完整数据
-    df_paid_days = df_gestion_unpaid[df_gestion_unpaid['开支票日期'].notna() & df_gestion_unpaid['发票日期'].notna()]
+    df_paid_days = df_gestion_unpaid[df_gestion_unpaid['开支票日期'].notna() & df_gestion_unpaid['发票日期'].notna()].copy()
 
-    # 1. 计算每张发票的付款天数
+    # 1. 计算每张发票的付款天数（后面的付款记录查询使用）
     df_paid_days['付款天数'] = (df_paid_days['开支票日期'] - df_paid_days['发票日期']).dt.days
 
-    #st.dataframe(df_paid_days)
-
-
-    # 2. 分组统计：每个公司+部门的付款天数指标
-    result_paid_days = df_paid_days.groupby(['部门','公司名称',]).agg(
-        发票数量=('付款天数', 'count'),
-        发票金额 = ('发票金额', 'sum'),
-        付款天数中位数=('付款天数', 'median'),
-        最短付款天数=('付款天数', 'min'),
-        最长付款天数=('付款天数', 'max'),
-        平均付款天数=('付款天数', 'mean')
-    ).reset_index()
-
-    result_paid_days['发票金额'] = result_paid_days['发票金额'].round(2)
-    result_paid_days['付款天数中位数'] = result_paid_days['付款天数中位数'].round(2)
-    result_paid_days['最短付款天数'] = result_paid_days['最短付款天数'].round(2)
-    result_paid_days['最长付款天数'] = result_paid_days['最长付款天数'].round(2)
-    result_paid_days['平均付款天数'] = result_paid_days['平均付款天数'].round(2)
+    # 2. 分组统计：每个 部门 + 公司名称 的付款天数指标（发票数量、发票金额、中位数、最短、最长、平均、25/75/90 分位数，均保留两位小数）
+    # 统计逻辑见 ledger_stages.build_payment_cycle_stats；每个数据版本只计算一次，数据刷新后只重新统计有变化的公司
+    result_paid_days = load_payment_cycle_stats()
 
     #st.dataframe(result_paid_days, use_container_width=True)
 
@@ -143,7 +92,10 @@ def analyser_cycle_et_prévoir_paiements():
             '发票金额': '发票金额（$）',
             '最短付款天数': '最短付款天数',
             '最长付款天数': '最长付款天数',
-            '平均付款天数': '平均付款天数'
+            '平均付款天数': '平均付款天数',
+            '付款天数25分位': '付款天数（25% 分位）',
+            '付款天数75分位': '付款天数（75% 分位）',
+            '付款天数90分位': '付款天数（90% 分位）'
         },
         text='付款天数中位数',
         hover_data=[
@@ -151,7 +103,10 @@ def analyser_cycle_et_prévoir_paiements():
             '发票金额',
             '最短付款天数',
             '最长付款天数',
-            '平均付款天数'
+            '平均付款天数',
+            '付款天数25分位',
+            '付款天数75分位',
+            '付款天数90分位'
         ],
         height=500
     )
@@ -175,21 +130,9 @@ def analyser_cycle_et_prévoir_paiements():
     st.markdown("<br>", unsafe_allow_html=True)  # 插入1行空白
     st.markdown(f"### 💸 未付款项付款预测")
 
-    df_paid_forest = df_gestion_unpaid.copy()
-
-    # 1️⃣ 筛选应付未付不为0的数据
-    df_paid_forest = df_paid_forest[df_paid_forest['应付未付'].fillna(0) != 0].copy()
-
-    # 2️⃣ 合并历史付款中位数数据（按 部门 + 公司名称）
-    # 假设 result_paid_days 中列名一致：部门，公司名称，付款天数中位数
-    df_paid_forest = df_paid_forest.merge(
-        result_paid_days[['部门', '公司名称', '付款天数中位数']],
-        on=['部门', '公司名称'],
-        how='left'
-    )
-
-    # 3️⃣ 计算预计付款日 = 发票日期 + 中位付款天数
-    df_paid_forest['预计付款日'] = df_paid_forest['发票日期'] + pd.to_timedelta(df_paid_forest['付款天数中位数'], unit='D')
+    # 1️⃣ ~ 3️⃣ 筛选应付未付不为0的数据，合并 部门 + 公司名称 的付款天数中位数，计算 预计付款日 = 发票日期 + 中位付款天数
+    # 逻辑见 payment_forecast.predict_pay_dates（与下面的未来多周预测共用），结果为新的 DataFrame，不会修改共享的 df_gestion_unpaid
+    df_paid_forest = predict_pay_dates(df_gestion_unpaid, result_paid_days)
 
     # 4️⃣ 当前日期所在自然周的最后一天（周日）
     today = datetime.today().date()
@@ -207,8 +150,8 @@ def analyser_cycle_et_prévoir_paiements():
 
     total_due_this_week = df_due_this_week['应付未付'].sum()
 
-    by_department_pay_this_week = df_due_this_week.groupby('部门')['应付未付'].sum().reset_index().sort_values(by='应付未付', ascending=False)
-    by_department_company_pay_this_week = df_due_this_week.groupby(['部门', '公司名称'])['应付未付'].sum().reset_index().sort_values(by='应付未付', ascending=False)
+    by_department_pay_this_week = df_due_this_week.groupby('部门', observed=True)['应付未付'].sum().reset_index().sort_values(by='应付未付', ascending=False)
+    by_department_company_pay_this_week = df_due_this_week.groupby(['部门', '公司名称'], observed=True)['应付未付'].sum().reset_index().sort_values(by='应付未付', ascending=False)
     
 
     # 四舍五入保留两位小数
@@ -233,14 +176,14 @@ def analyser_cycle_et_prévoir_paiements():
 
     st.markdown("<br>", unsafe_allow_html=True)  # 插入1行空白
     
-    st.info("**应付款项预测**：使用的是未付发票 发票日期 + 付款天数中位数 = 预测付款日期。")
+    st.info("**应付款项预测**：使用的是未付发票 发票日期 + 付款天数中位数 = 预测付款日期（落在周末、魁北克法定假日时顺延到下一个营业日）。")
 
     st.markdown("<br>", unsafe_allow_html=True)  # 插入1行空白
 
     # ------------------------------
     # 🎛️ 选择展示内容
     # ------------------------------
-    forecast_view = st.radio("请选择要查看的付款预测图表：", ["按部门汇总", "查看部门下公司明细", "预测付款明细"], horizontal=True)
+    forecast_view = st.radio("请选择要查看的付款预测图表：", ["按部门汇总", "查看部门下公司明细", "预测付款明细", "未来多周预测", "预测准确度回测", "付款计划（按预算）"], horizontal=True)
 
     # ------------------------------
     # 📊 部门级预测图
@@ -261,6 +204,181 @@ def analyser_cycle_et_prévoir_paiements():
         st.plotly_chart(fig_dept, use_container_width=True)
 
 
+    # ------------------------------
+    # 📆 未来多周付款预测（周 × 部门）
+    # ------------------------------
+    if forecast_view == "未来多周预测":
+
+        # ✅ 1. 选择预测周数（每个数据版本、每个周数只计算一次，见 payment_forecast.py）
+        horizon_weeks = st.slider("📆 预测未来周数", min_value=4, max_value=26, value=FORECAST_WEEKS)
+        outflow_forecast = load_outflow_forecast(horizon_weeks)
+
+        # ✅ 2. 周 × 部门 矩阵转为长表，按周键查表生成 周范围
+        weekly_outflow = (
+            outflow_forecast['matrix']
+            .stack()
+            .rename('应付未付')
+            .reset_index()
+        )
+        weekly_outflow = with_week_labels(weekly_outflow, '预测周键')
+
+        st.info("**未来多周预测**：未付发票按 预计付款日（发票日期 + 付款天数中位数）分到各周，已逾期未付的计入本周。")
+
+        # ✅ 3. 堆叠柱状图：每周各部门预计付款金额
+        fig_weeks = px.bar(
+            weekly_outflow,
+            x='周范围',
+            y='应付未付',
+            color='部门',
+            labels={'应付未付': '预计付款金额', '周范围': '周'},
+            title=f"未来 {horizon_weeks} 周各部门预计付款金额",
+            category_orders={'周范围': list(weekly_outflow['周范围'].unique())}
+        )
+        fig_weeks.update_layout(barmode='stack', xaxis_tickangle=-30)
+        st.plotly_chart(fig_weeks, use_container_width=True)
+
+        # ✅ 4. 概率预测：按各公司历史付款天数分布做蒙特卡洛模拟，显示每周付款总额的 p10 / p50 / p90 区间
+        if st.checkbox("🎲 显示概率预测区间（按各公司历史付款天数随机模拟）"):
+            outflow_bands = load_outflow_simulation(horizon_weeks)
+            bands_long = outflow_bands.melt(
+                id_vars=['周范围'], value_vars=['p10', 'p50', 'p90'], var_name='分位', value_name='付款总额'
+            )
+            fig_bands = px.line(
+                bands_long,
+                x='周范围',
+                y='付款总额',
+                color='分位',
+                markers=True,
+                labels={'付款总额': '每周付款总额', '周范围': '周'},
+                title=f"未来 {horizon_weeks} 周付款总额预测区间（p10 / p50 / p90）",
+                category_orders={'周范围': list(outflow_bands['周范围']), '分位': ['p90', 'p50', 'p10']}
+            )
+            fig_bands.update_layout(xaxis_tickangle=-30)
+            st.plotly_chart(fig_bands, use_container_width=True)
+            st.info("💡 p50 为模拟结果的中位数；实际付款总额约有 80% 的可能落在 p10 ~ p90 之间。")
+
+        # ✅ 5. 周 × 部门 汇总表
+        matrix_display = outflow_forecast['matrix'].copy()
+        matrix_display.index = with_week_labels(matrix_display.index.to_frame(index=False), '预测周键')['周范围']
+        matrix_display['合计'] = matrix_display.sum(axis=1)
+        st.dataframe(matrix_display.style.format('{:,.2f}'), use_container_width=True)
+
+
+    # ------------------------------
+    # 🔁 预测准确度回测（回到过去每一周，只用当时已有的付款历史做预测，再与实际开支票日期比较）
+    # ------------------------------
+    if forecast_view == "预测准确度回测":
+
+        # ✅ 1. 逐周回测结果（每个数据版本只计算一次，数据刷新后只重算受影响的周，见 payment_forecast.py）
+        backtest_weekly = load_forecast_backtest()
+        if backtest_weekly.empty:
+            st.warning("⚠️ 历史数据不足，暂时无法回测。")
+        else:
+            st.info("**预测准确度回测**：回到过去每一周的周一，只用当时已开支票的记录计算付款天数中位数，"
+                    "预测当时的未付发票哪些会在这一周付款（已逾期的计入这一周），再与实际开支票日期比较。")
+
+            # ✅ 2. 各部门误差汇总
+            backtest_summary = summarize_backtest(backtest_weekly)
+            st.dataframe(
+                backtest_summary.style.format({
+                    '平均实际金额': '{:,.2f}',
+                    '平均绝对误差': '{:,.2f}',
+                    '平均偏差': '{:,.2f}',
+                    '相对误差': '{:.2%}',
+                    '命中率': '{:.2%}',
+                }),
+                use_container_width=True
+            )
+            st.info("💡 **平均绝对误差（MAE）**：每周预测金额与实际金额之差的绝对值的平均；"
+                    "**平均偏差** 为正说明预测偏高（付款比预测慢），为负说明预测偏低；"
+                    "**命中率**：实际付款金额中，当周也被预测到的比例。")
+
+            # ✅ 3. 选择部门，查看每周预测与实际付款金额
+            backtest_depts = ['全部部门'] + sorted(backtest_weekly['部门'].unique())
+            selected_backtest_dept = st.selectbox("📂 选择部门查看每周回测", backtest_depts)
+            if selected_backtest_dept == '全部部门':
+                backtest_view = backtest_weekly.groupby(['回测周键', '周范围'], sort=True)[['预测金额', '实际金额']].sum().reset_index()
+            else:
+                backtest_view = backtest_weekly[backtest_weekly['部门'] == selected_backtest_dept]
+
+            backtest_long = backtest_view.melt(
+                id_vars=['周范围'], value_vars=['预测金额', '实际金额'], var_name='类型', value_name='金额'
+            )
+            fig_backtest = px.line(
+                backtest_long,
+                x='周范围',
+                y='金额',
+                color='类型',
+                labels={'周范围': '周', '金额': '付款金额'},
+                title=f"{selected_backtest_dept} 每周预测付款金额 vs 实际付款金额",
+                category_orders={'周范围': list(backtest_view['周范围'])}
+            )
+            fig_backtest.update_layout(xaxis_tickangle=-30)
+            st.plotly_chart(fig_backtest, use_container_width=True)
+
+
+    # ------------------------------
+    # 🧾 付款计划：在本周现金预算内自动选择要付的发票，生成开支票清单
+    # ------------------------------
+    if forecast_view == "付款计划（按预算）":
+
+        # ✅ 1. 候选发票及优先分（每个数据版本、每天只计算一次，见 payment_run.py）
+        payment_candidates = load_payment_candidates()
+
+        col_budget, col_scope = st.columns(2)
+        with col_budget:
+            budget = st.number_input(
+                "💰 本周付款预算",
+                min_value=0.0,
+                value=float(max(total_due_this_week, 0)),
+                step=1000.0,
+                format="%.2f"
+            )
+        with col_scope:
+            only_due_this_week = st.checkbox("只从本周应付的发票中选择", value=True)
+
+        if only_due_this_week:
+            due_this_week = payment_candidates['预计付款日'].dt.date <= end_of_week
+            payment_candidates = payment_candidates[due_this_week.fillna(False).astype(bool)]
+
+        # ✅ 2. 贪心选择：按优先分从高到低，预算放不下的跳过
+        selected_invoices = plan_payment_run(payment_candidates, budget)
+        cheques = build_cheque_list(selected_invoices)
+        selected_total = selected_invoices['应付未付'].sum()
+
+        score_formula = " + ".join(f"{col} × {weight:.0%}" for col, weight in PAYMENT_RUN_WEIGHTS.items())
+        st.info(f"**付款计划**：优先分 = {score_formula}。"
+                "逾期得分看超过预计付款日的天数，供应商得分看账龄占该公司历史 90% 付款天数的比例，"
+                "部门得分按部门优先顺序递减；自动扣款（公司名*）的发票不在计划内。")
+        st.markdown(f"""
+            <div style='background-color:#EBF5FB; padding:20px; border-radius:10px;'>
+                <h4 style='color:#2E86C1;'>🧾 计划付款：<span style='color:#C0392B;'>${selected_total:,.2f}</span>
+                （{len(cheques)} 张支票 / {len(selected_invoices)} 张发票，剩余预算 ${budget - selected_total:,.2f}；
+                候选发票共 {len(payment_candidates)} 张，合计 ${payment_candidates['应付未付'].sum():,.2f}）</h4>
+            </div>
+        """, unsafe_allow_html=True)
+        st.markdown("<br>", unsafe_allow_html=True)  # 插入1行空白
+
+        # ✅ 3. 开支票清单（每家公司一张支票）
+        st.markdown("#### 🧾 开支票清单")
+        cheques_display = cheques.copy()
+        cheques_display['最早发票日期'] = pd.to_datetime(cheques_display['最早发票日期']).dt.strftime('%Y-%m-%d')
+        st.dataframe(cheques_display.style.format({'支票金额': '{:,.2f}'}), use_container_width=True)
+
+        timestamp_str = datetime.now().strftime('%Y%m%d%H%M%S')
+        st.download_button(
+            label="📥 下载开支票清单",
+            data=cheques_display.to_csv(index=False).encode('utf-8-sig'),
+            file_name=f"付款计划_{timestamp_str}.csv",
+            mime="text/csv"
+        )
+
+        # ✅ 4. 选中的发票明细（按优先分排序）
+        with st.expander("📄 查看选中的发票明细"):
+            invoice_cols = ['部门', '公司名称', '发票号', '发票日期', '应付未付', '预计付款日', '逾期天数', '优先分']
+            st.dataframe(selected_invoices[invoice_cols], use_container_width=True)
+
+
     # -----------------------------
     # ✅ 逻辑入口：查看部门下公司明细
     # -----------------------------
@@ -275,16 +393,12 @@ def analyser_cycle_et_prévoir_paiements():
         # ✅ 2. 准备 df_paid_days 中最近的发票日期、支票日期、支票号、支票总额
         df_invoice_date = df_paid_days.copy()
 
-        # 确保日期为 datetime 类型
-        df_invoice_date['发票日期'] = pd.to_datetime(df_invoice_date['发票日期'], errors='coerce')
-        df_invoice_date['开支票日期'] = pd.to_datetime(df_invoice_date['开支票日期'], errors='coerce')
-
         # ✅ 提取每个（部门，公司）组最近的一条记录
         latest_invoice_info = (
             df_invoice_date
             .sort_values(by=['发票日期', '开支票日期'], ascending=False)
             .dropna(subset=['发票日期', '开支票日期'])
-            .groupby(['部门', '公司名称'], as_index=False)
+            .groupby(['部门', '公司名称'], as_index=False, observed=True)
             .first()[['部门', '公司名称', '发票日期', '开支票日期', '付款支票号', '付款支票总额']]
         )
 
@@ -342,7 +456,7 @@ def analyser_cycle_et_prévoir_paiements():
         # ✅ 1. 汇总本周每家公司的应付未付金额（从 df_due_this_week）
         by_company_pay_this_week = (
             df_due_this_week
-            .groupby('公司名称')['应付未付']
+            .groupby('公司名称', observed=True)['应付未付']
             .sum()
             .reset_index()
             .sort_values(by='应付未付', ascending=False)
@@ -361,14 +475,14 @@ def analyser_cycle_et_prévoir_paiements():
             df_invoice_date
             .sort_values(by=['发票日期', '开支票日期'], ascending=False)
             .dropna(subset=['发票日期', '开支票日期'])
-            .groupby('公司名称', as_index=False)
+            .groupby('公司名称', as_index=False, observed=True)
             .first()[['公司名称', '发票日期', '开支票日期', '付款支票号', '付款支票总额']]
         )
 
         # ✅ 3. 从 df_paid_days 提取付款天数中位数
         result_paid_days_company = (
             df_paid_days
-            .groupby('公司名称')
+            .groupby('公司名称', observed=True)
             .agg(付款天数中位数=('付款天数', 'median'))
             .reset_index()
             .round(2)
@@ -436,7 +550,7 @@ def analyser_cycle_et_prévoir_paiements():
         df_this_week = df_paid_forest[df_paid_forest['是否本周应付'] == True].copy()
 
         # ✅ 2. 按“发票号”分组并汇总发票金额和实际支付金额
-        grouped_cheque = df_this_week.groupby('发票号', as_index=False)[
+        grouped_cheque = df_this_week.groupby('发票号', as_index=False, dropna=False)[
             ['发票金额', '实际支付金额']
         ].sum().round(2)
 
@@ -465,7 +579,7 @@ def analyser_cycle_et_prévoir_paiements():
         # ✅ 确保日期字段格式正确
         date_columns = ['预计付款日','发票日期']
         for col in date_columns:
-            filtered_invoice_details[col] = pd.to_datetime(filtered_invoice_details[col], errors='coerce').dt.strftime('%Y-%m-%d')   
+            filtered_invoice_details[col] = filtered_invoice_details[col].dt.strftime('%Y-%m-%d')   
         
         
         # ✅ 折叠模块
@@ -523,8 +637,7 @@ def analyser_cycle_et_prévoir_paiements():
             elif view_mode == "📑 全部应付未付":
 
                 # 数据处理
-                df_unpaid_total = df_gestion_unpaid.copy()
-                df_unpaid_total = df_unpaid_total.groupby('发票号', as_index=False).agg({
+                df_unpaid_total = df_gestion_unpaid.groupby('发票号', as_index=False, dropna=False).agg({
                     '发票金额': 'sum',
                     'TPS': 'sum',
                     'TVQ': 'sum',
@@ -576,36 +689,12 @@ def analyser_cycle_et_prévoir_paiements():
 
                     # 增加 预测付款日期 以及 付款天数中位数 两列信息，方便用户查看使用
                     
-                    # 首先使用 本节部分的数据集 display_df， 以及在开始时计算的 result_paid_days 按照 部门 + 公司名称 计算出来的付款天数中位数
-                    # 将两个数据集进行 merge 合并
-                    display_df = display_df.merge(
-                        result_paid_days[['部门', '公司名称', '付款天数中位数']],
-                        on=['部门', '公司名称'],
-                        how='left'
-                    )
-
-                    # 因为涉及到后面的日期相加，因此不必须保证是 日期格式 和 数值格式 
-                    # 发票日期必须是 datetime 类型
-                    display_df['发票日期'] = pd.to_datetime(display_df['发票日期'], errors='coerce')
-
-                    # 中位付款天数必须是数字
-                    display_df['付款天数中位数'] = pd.to_numeric(display_df['付款天数中位数'], errors='coerce')
-
-                    # 生成 timedelta 类型
-                    timedelta_days = pd.to_timedelta(display_df['付款天数中位数'], unit='D')
-
-
-                    # 构造掩码：只有在发票日期和付款天数都存在时才进行运算
-                    mask_valid = display_df['发票日期'].notna() & timedelta_days.notna()
-
-                    # 初始化结果列为 NaT
-                    display_df['预计付款日'] = pd.NaT
-
-                    # 执行有效行的加法操作
-                    display_df.loc[mask_valid, '预计付款日'] = display_df.loc[mask_valid, '发票日期'] + timedelta_days[mask_valid]
+                    # 与“预测应付未付”使用同一套计算：按 部门 + 公司名称 合并付款天数中位数，
+                    # 预计付款日 = 发票日期 + 中位数，落在周末或魁北克假日时顺延到下一个营业日（见 payment_forecast.predict_pay_dates）
+                    display_df = predict_pay_dates(display_df, result_paid_days)
 
                     # 为了显示，将日期转换为字符串
-                    display_df['发票日期'] = pd.to_datetime(display_df['发票日期'], errors='coerce').dt.strftime('%Y-%m-%d')
+                    display_df['发票日期'] = display_df['发票日期'].dt.strftime('%Y-%m-%d')
                     display_df['预计付款日'] = display_df['预计付款日'].dt.strftime('%Y-%m-%d')
                     
                     # 在 Streamlit 中直接格式化显示 不想显示为50.0000000  而只是显示为 50
@@ -616,7 +705,6 @@ def analyser_cycle_et_prévoir_paiements():
 
                     # 删除 0 的行, 因为公式计算可能出现 -0.00 的情况，为了规避这个问题，注意 0 =/= -0
                     # 我们采用 display_df[~np.isclose(display_df['应付未付'], 0, atol=1e-6)]
-                    display_df['应付未付'] = pd.to_numeric(display_df['应付未付'], errors='coerce')
                     display_df = display_df[~np.isclose(display_df['应付未付'], 0, atol=1e-6)]
 
 
@@ -624,10 +712,7 @@ def analyser_cycle_et_prévoir_paiements():
 
                     # ✅ 新增 累计未付金额 列， 统计 累计未付金额 总额 
 
-                    # ✅ 第1步：确保“应付未付”为数值型，并计算“累计未付金额”
-                    display_df['应付未付'] = pd.to_numeric(display_df['应付未付'], errors='coerce').fillna(0)
-                    # ⬆️ 把“应付未付”这一列转为数值型（如果有无法识别的内容就转成NaN），并用0填充缺失值
-
+                    # ✅ 第1步：计算“累计未付金额”（应付未付 在 df_gestion_unpaid 中已是数值型且无空值）
                     display_df['累计未付金额'] = display_df['应付未付'].cumsum().round(2)
                     # ⬆️ 新增一列“累计未付金额”，为“应付未付”的累计和，并保留两位小数
 
@@ -708,7 +793,7 @@ def analyser_cycle_et_prévoir_paiements():
                     # ⏰ 转换日期列格式
                     date_cols = ['发票日期', '开支票日期', '银行对账日期']
                     for col in date_cols:
-                        filtered_df[col] = pd.to_datetime(filtered_df[col], errors='coerce').dt.strftime('%Y-%m-%d')
+                        filtered_df[col] = filtered_df[col].dt.strftime('%Y-%m-%d')
 
                     # 📌 按发票日期从大到小排序
                     filtered_df = filtered_df.sort_values(by='发票日期', ascending=False)
@@ -763,8 +848,8 @@ def analyser_cycle_et_prévoir_paiements():
             elif view_mode == "🧾 已付支票号查询":
 
 
-                # 假设 df_paid_days 已加载
-                df_cheque = df_paid_days.copy()
+                # 支票号索引（每个数据版本只建一次，只包含已付款记录）：下拉选项和查询都直接查索引
+                cheque_index = load_ledger_indexes()['cheque']
 
                 # ✅ 设定展示字段
                 display_columns = [
@@ -774,7 +859,7 @@ def analyser_cycle_et_prévoir_paiements():
                 ]
 
                 # ✅ 支票号搜索框
-                cheque_list = sorted(df_cheque['付款支票号'].dropna().astype(str).unique().tolist())
+                cheque_list = cheque_index['keys']
                 selected_cheque = st.selectbox(
                     "🔍 请输入或选择支票号查看付款信息：",
                     options=cheque_list,
@@ -784,17 +869,16 @@ def analyser_cycle_et_prévoir_paiements():
 
                 # ✅ 若选择了支票号，显示对应信息
                 if selected_cheque:
-                    filtered_df = df_cheque[df_cheque['付款支票号'] == selected_cheque].copy()
+                    filtered_df = df_gestion_unpaid.iloc[lookup_rows(cheque_index, selected_cheque)].copy()
 
                     # ⏰ 格式化日期列
                     date_cols = ['发票日期', '开支票日期', '银行对账日期']
                     for col in date_cols:
-                        filtered_df[col] = pd.to_datetime(filtered_df[col], errors='coerce').dt.strftime('%Y-%m-%d')
+                        filtered_df[col] = filtered_df[col].dt.strftime('%Y-%m-%d')
 
                     # 💰 保留两位小数的金额列
                     amount_cols = ['发票金额', '实际支付金额', '付款支票总额']
-                    for col in amount_cols:
-                        filtered_df[col] = pd.to_numeric(filtered_df[col], errors='coerce').round(2)
+                    filtered_df[amount_cols] = filtered_df[amount_cols].round(2)
 
                     # ➕ 计算差额列 = 发票金额 - 实际支付金额
                     filtered_df['差额'] = (filtered_df['发票金额'] - filtered_df['实际支付金额']).round(2)
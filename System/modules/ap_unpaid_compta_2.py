@@ -5,19 +5,16 @@ from datetime import timedelta
 import numpy as np
 
 from ui.sidebar import get_selected_departments
-from modules.data_loader import load_supplier_data
+from modules.ledger_stages import RECONCILE_TARGET_COMPANIES, load_compta_ledger
+from modules.report_tables import build_subtotal_report, row_type_from_labels, row_type_styles
 
 
 
-def style_dataframe(df):
-    def highlight_rows(row):
-        if isinstance(row['部门'], str):
-            if row['部门'].endswith("汇总"):
-                return ['background-color: #E8F6F3'] * len(row)
-            elif row['部门'] == '总计':
-                return ['background-color: #FADBD8'] * len(row)
-        return [''] * len(row)
-    return df.style.apply(highlight_rows, axis=1).format({
+def style_dataframe(df, row_type=None):
+    # 小计行（XX 汇总）和总计行着色；row_type 为 build_subtotal_report 返回的行类型，未提供时按 部门 文字判断
+    if row_type is None:
+        row_type = row_type_from_labels(df['部门'])
+    return df.style.apply(row_type_styles, row_type=row_type, axis=None).format({
         '发票金额': "{:,.2f}",
         '实际支付金额': "{:,.2f}",
         '应付未付差额': "{:,.2f}",
@@ -59,96 +56,15 @@ def ap_unpaid_query_compta():
 
 
     # -------------------------------
-    # 1. 载入数据
+    # 1. 载入会计版台账（步骤 1 ~ 8 见 ledger_stages.build_compta_ledger）
     # -------------------------------
-    df = load_supplier_data()
-        
-    # 1.1 首先排除出 直接用信用卡VISA-1826 进行支付的
-    df = df[~df['公司名称'].isin(['SLEEMAN', 'Arc-en-ciel','Ferme vallee verte'])]
+    # - 已排除直接用信用卡VISA-1826 等支付的供应商
+    # - 目标公司 / 字母开头支票号 两类规则用预先计算的布尔掩码对整张表一次性处理，
+    #   银行对账日期（25 日及以后 → 次月 1 日）为整列日期运算，不再逐行 apply
+    # - 每个数据版本只计算一次，所有会话共用（只读，后续筛选都会生成新的 DataFrame）
+    df = load_compta_ledger()
+    target_companies = RECONCILE_TARGET_COMPANIES
 
-    # -------------------------------
-    # 2. 日期字段转换为 datetime 类型（一次性）
-    # -------------------------------
-    df['开支票日期'] = pd.to_datetime(df['开支票日期'], errors='coerce')
-    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
-    df['银行对账日期'] = pd.to_datetime(df['银行对账日期'], errors='coerce')
-
-    # -------------------------------
-    # 3. 定义银行对账日期计算函数（通用）
-    # -------------------------------
-    def calculate_reconcile_date(posting_date: pd.Timestamp) -> pd.Timestamp:
-        if pd.isna(posting_date):
-            return pd.NaT
-        if posting_date.day >= 25:
-            month = (posting_date.month % 12) + 1
-            year = posting_date.year if posting_date.month < 12 else posting_date.year + 1
-        else:
-            month = posting_date.month
-            year = posting_date.year
-        return pd.Timestamp(f"{year}-{month:02d}-01")
-
-    # -------------------------------
-    # 第一部分：处理目标公司列表
-    # -------------------------------
-    target_companies = [
-        'SERVICELAB',
-        'Wah Teng',
-        'Saputo',
-        'Monco',
-        'ALEX COULOMBE',
-        'Canada Bread',
-        'CANADAWIDE FRUIT',
-        'Beaudry & Cadrin Inc',
-        'Bimbo',
-        'IMPERIAL TOBACCO CANADA',
-        'BOULANGERIE BLOUIN',
-        'korsmet'
-    ]
-
-    mask_target = df['公司名称'].isin(target_companies)
-
-    # 银行过账日期填补（目标公司）
-    df.loc[mask_target, '银行过账日期'] = np.where(
-        df.loc[mask_target, '开支票日期'].notna(),
-        df.loc[mask_target, '开支票日期'],
-        df.loc[mask_target, '发票日期'] + pd.to_timedelta(10, unit='d')
-    )
-
-    # 银行对账日期更新（目标公司）
-    df.loc[mask_target, '银行对账日期'] = df.loc[mask_target, '银行过账日期'].apply(calculate_reconcile_date)
-
-    # -------------------------------
-   # -------------------------------
-    # 第二部分：处理“银行过账日期为空 且 支票号为字母开头”的记录（排除 NaN 和空字符串）
-    # -------------------------------
-
-    # 条件 1：银行过账日期为空
-    mask_null_posting = df['银行过账日期'].isna()
-
-    # 条件 2：付款支票号非空、非'nan'文本、非空格，并以英文字母开头
-    mask_letter_cheque = (
-        df['付款支票号'].notna() &  # 不是实际 NaN（np.nan）
-        df['付款支票号'].astype(str).str.strip().str.lower().ne('nan') &  # 排除 'nan' 字符串
-        df['付款支票号'].astype(str).str.strip().ne('') &  # 排除空字符串
-        df['付款支票号'].astype(str).str.match(r'^[A-Za-z]')  # 确保以英文字母开头
-    )
-
-    # 综合条件
-    mask_letter_cheque_null_posting = mask_null_posting & mask_letter_cheque
-
-    # 银行过账日期填补：优先使用开支票日期，否则为发票日期 + 10 天
-    df.loc[mask_letter_cheque_null_posting, '银行过账日期'] = np.where(
-        df.loc[mask_letter_cheque_null_posting, '开支票日期'].notna(),
-        df.loc[mask_letter_cheque_null_posting, '开支票日期'],
-        df.loc[mask_letter_cheque_null_posting, '发票日期'] + pd.to_timedelta(10, unit='d')
-    )
-
-    # 银行对账日期生成：根据银行过账日期，应用周期归整逻辑
-    df.loc[mask_letter_cheque_null_posting, '银行对账日期'] = (
-        df.loc[mask_letter_cheque_null_posting, '银行过账日期']
-        .apply(calculate_reconcile_date)
-    )
-    
     st.info("##### 💡 xxxx（会计版）")
     st.dataframe(style_dataframe(df), use_container_width=True)
 
@@ -231,7 +147,7 @@ def ap_unpaid_query_compta():
 
     # ✅ 部门汇总表
     summary_table = (
-        filtered.groupby('部门')[['发票金额', '实际支付金额', '应付未付差额','TPS', 'TVQ',]]
+        filtered.groupby('部门', observed=True)[['发票金额', '实际支付金额', '应付未付差额','TPS', 'TVQ',]]
         .sum()
         .reset_index()
     )
@@ -260,50 +176,22 @@ def ap_unpaid_query_compta():
 
     # ✅ 明细表
     # 步骤 1：将“发票日期”列转换为标准日期类型（datetime.date）
-    # 使用 pd.to_datetime 可自动识别多种格式；errors='coerce' 表示遇到非法值将转换为 NaT（空日期）
-    # 再用 .dt.date 去除时间信息，只保留日期部分（如 2025-05-05）
-    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce').dt.date
-
-    # 步骤 2：构建最终展示用的 DataFrame（明细 + 小计 + 总计）
-    final = pd.DataFrame()  # 初始化空表格用于后续拼接
-
-    # 遍历每个部门，分组处理
-    for dept, df_dept in filtered.groupby('部门'):
-        # 对每个部门内的公司分组
-        for company, df_comp in df_dept.groupby('公司名称'):
-            # 拼接当前公司所有明细数据，只保留指定列
-            final = pd.concat([final, df_comp[['部门', '公司名称', '发票号', '发票日期','银行对账日期', '发票金额', '付款支票号','实际支付金额', '应付未付差额','TPS','TVQ']]])
-        
-        # 部门小计：对当前部门的金额字段求和（总额、小计）
-        subtotal = df_dept[['发票金额', '实际支付金额', '应付未付差额','TPS','TVQ']].sum().to_frame().T  # 转置成一行 DataFrame
-        subtotal['部门'] = f"{dept} 汇总"   # 特殊标识该行为“XX部门 汇总”
-        subtotal['公司名称'] = ''           # 小计行无公司
-        subtotal['发票号'] = ''
-        subtotal['付款支票号'] = ''             # 小计行无发票号
-        subtotal['发票日期'] = pd.NaT       # 小计行不设日期，用 pd.NaT 保持类型一致
-        subtotal['银行对账日期'] = pd.NaT
-        final = pd.concat([final, subtotal], ignore_index=True)  # 拼接至 final 表格
-
-    # 所有部门总计：汇总所有金额字段
-    total = filtered[['发票金额', '实际支付金额', '应付未付差额','TPS','TVQ']].sum().to_frame().T
-    total['部门'] = '总计'            # 标记“总计”行
-    total['公司名称'] = ''
-    total['发票号'] = ''
-    total['付款支票号'] = ''
-    total['发票日期'] = pd.NaT        # 同样用 NaT 表示“无日期”
-    subtotal['银行对账日期'] = pd.NaT
-    final = pd.concat([final, total], ignore_index=True)
-
-    # 步骤 3：格式化“发票日期”为字符串（yyyy-mm-dd）
-    # 必须使用 pd.notnull(d) 来过滤掉 NaT，否则调用 d.strftime 会报错
-    # 这里确保：只有有效日期对象才格式化，否则返回空字符串
-    final['发票日期'] = final['发票日期'].apply(
-        lambda d: d.strftime('%Y-%m-%d') if pd.notnull(d) else ''
+    # 发票日期在加载时已是 datetime（非法值为 NaT），用 .dt.date 去除时间信息，只保留日期部分（如 2025-05-05）
+    df['发票日期'] = df['发票日期'].dt.date
+
+    # 步骤 2：选取明细列（列顺序即报表列顺序），并将“发票日期”格式化为字符串（yyyy-mm-dd），空日期显示为空字符串
+    detail = filtered[['部门', '公司名称', '发票号', '发票日期','银行对账日期', '发票金额','付款支票号', '实际支付金额', '应付未付差额','TPS','TVQ']].copy()
+    detail['发票日期'] = detail['发票日期'].dt.strftime('%Y-%m-%d').fillna('')
+
+    # 步骤 3：构建最终展示用的 DataFrame（明细 + 小计 + 总计）
+    # - 每个部门内按公司名称排列明细，部门最后一行为“XX部门 汇总”，表格最后一行为“总计”
+    # - row_type 标记每行是 明细 / 汇总 / 总计，用于着色
+    final, row_type = build_subtotal_report(
+        detail, '部门', ['发票金额', '实际支付金额', '应付未付差额','TPS','TVQ'],
+        order_by=['公司名称'],
+        fill={'银行对账日期': pd.NaT},
     )
 
-    # 步骤 4：按指定字段顺序重新排列列，确保前端显示或导出一致
-    final = final[['部门', '公司名称', '发票号', '发票日期','银行对账日期', '发票金额','付款支票号', '实际支付金额', '应付未付差额','TPS','TVQ']]
-
     final['Hors Taxes'] = final['发票金额'] - final['TPS'].fillna(0) - final['TVQ'].fillna(0)
 
 
@@ -315,6 +203,6 @@ def ap_unpaid_query_compta():
     </h4>
     """, unsafe_allow_html=True)
     #st.markdown("<h3 style='color:#1A5276;'>📋 新亚超市<span style='color:red;'>应付未付</span>账单 明细</h3>", unsafe_allow_html=True)
-    st.dataframe(style_dataframe(final), use_container_width=True)
+    st.dataframe(style_dataframe(final, row_type), use_container_width=True)
 
    
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 营业日日历（周一 ~ 周五，排除魁北克法定假日）
+# 周末和假日不开支票、银行不扣款：预计付款日、自动扣款日、会计版过账日期在加上天数之后，
+# 落在非营业日的统一顺延到下一个营业日。整列用 np.busday_offset 一次计算，不逐行处理
+# ============================================================================
+
+# 营业日：周一 ~ 周五
+BUSINESS_WEEKMASK = '1111100'
+
+
+def _easter(year):
+    """
+    复活节日期（公历，Anonymous Gregorian 算法）。
+    """
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_monday(year, month, n):
+    """
+    某月第 n 个星期一。
+    """
+    first = date(year, month, 1)
+    return first + timedelta(days=(7 - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _observed(day):
+    """
+    固定日期的假日落在星期日时，改在星期一放假。
+    """
+    return day + timedelta(days=1) if day.weekday() == 6 else day
+
+
+# 魁北克法定假日：{名称: 年份 → 日期}；不需要的假日可直接删除，新增的规则按同样格式添加
+QUEBEC_HOLIDAYS = {
+    '元旦': lambda year: _observed(date(year, 1, 1)),
+    '耶稣受难日': lambda year: _easter(year) - timedelta(days=2),
+    '爱国者日': lambda year: date(year, 5, 24) - timedelta(days=date(year, 5, 24).weekday()),  # 5 月 25 日之前的星期一
+    '魁北克国庆日': lambda year: _observed(date(year, 6, 24)),
+    '加拿大国庆日': lambda year: _observed(date(year, 7, 1)),
+    '劳动节': lambda year: _nth_monday(year, 9, 1),
+    '感恩节': lambda year: _nth_monday(year, 10, 2),
+    '圣诞节': lambda year: _observed(date(year, 12, 25)),
+}
+
+# 额外的非营业日（如公司停业日），环境变量中用逗号分隔，如 XINYA_EXTRA_HOLIDAYS=2025-12-26,2026-01-02
+EXTRA_HOLIDAYS = [
+    day.strip() for day in os.environ.get("XINYA_EXTRA_HOLIDAYS", "").split(",") if day.strip()
+]
+
+# (起始年, 结束年) -> np.busdaycalendar
+_calendar_cache = {}
+
+
+def holidays_between(first_year, last_year):
+    """
+    first_year ~ last_year（含）的所有假日（QUEBEC_HOLIDAYS + EXTRA_HOLIDAYS），datetime64[D] 数组，升序。
+    """
+    days = [rule(year) for year in range(first_year, last_year + 1) for rule in QUEBEC_HOLIDAYS.values()]
+    holidays = np.array(days, dtype='datetime64[D]')
+    if EXTRA_HOLIDAYS:
+        holidays = np.concatenate([holidays, np.array(EXTRA_HOLIDAYS, dtype='datetime64[D]')])
+    return np.unique(holidays)
+
+
+def business_calendar(first_year, last_year):
+    """
+    覆盖 first_year ~ last_year 的营业日日历（同一年份范围只建一次）。
+    """
+    key = (first_year, last_year)
+    if key not in _calendar_cache:
+        _calendar_cache[key] = np.busdaycalendar(
+            weekmask=BUSINESS_WEEKMASK, holidays=holidays_between(first_year, last_year)
+        )
+    return _calendar_cache[key]
+
+
+def _roll_forward(days):
+    """
+    datetime64[D] 数组（不含 NaT）顺延到营业日；日历覆盖数组涉及的年份及下一年（年末顺延会跨年）。
+    """
+    if days.size == 0:
+        return days
+    years = days.astype('datetime64[Y]').astype('int64') + 1970
+    calendar = business_calendar(int(years.min()), int(years.max()) + 1)
+    return np.busday_offset(days, 0, roll='forward', busdaycal=calendar)
+
+
+def roll_to_business_day(dates):
+    """
+    整列日期顺延到营业日：当天是营业日则不变，否则改为之后第一个营业日（时间部分舍去）。
+
+    参数：
+    - dates: 日期 Series
+
+    返回：
+    - 顺延后的日期 Series（datetime64[ns]，索引与输入相同，NaT 保持为 NaT）
+    """
+    dates = pd.to_datetime(dates)
+    days = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    valid = ~np.isnat(days)
+    days[valid] = _roll_forward(days[valid])
+    return pd.Series(days.astype('datetime64[ns]'), index=dates.index, name=dates.name)
+
+
+def business_day_after(dates, days):
+    """
+    日期 + days 个日历日，落在周末或假日时顺延到下一个营业日（整列计算）。
+
+    参数：
+    - dates: 日期 Series
+    - days: 天数（整数，或与 dates 对齐的 Series，可含小数和空值；小数部分舍去）
+
+    返回：
+    - 日期 Series（datetime64[ns]），任一输入为空时为 NaT
+    """
+    return roll_to_business_day(pd.to_datetime(dates) + pd.to_timedelta(days, unit='D'))
+
+
+def rolled_day_offsets(origin, first, last):
+    """
+    顺延查找表：origin + first ~ origin + last 天（含）各自顺延到营业日后，距 origin 的天数。
+    用于已经是整数天数的大块数组（如蒙特卡洛模拟的 模拟次数 × 发票数），按 table[天数 - first] 查表顺延。
+
+    参数：
+    - origin: 起点日期
+    - first / last: 查找表覆盖的天数范围（相对 origin）
+
+    返回：
+    - table: int64 数组，长度 last - first + 1
+    """
+    origin = np.datetime64(pd.Timestamp(origin).date(), 'D')
+    days = origin + np.arange(first, last + 1)
+    return (_roll_forward(days) - origin).astype('int64')
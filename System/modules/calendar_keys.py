@@ -0,0 +1,116 @@
+from datetime import datetime
+
+import pandas as pd
+
+
+# ============================================================================
+# 日历键：加载数据时为日期列一次性生成整数键，页面按整数键分组，
+# 显示用的 月份 / 周范围 文本只对少量唯一键生成（查表），不再对整张表逐行 strftime
+# ============================================================================
+
+# 日期列 → 键列前缀：发票日期 → 发票月键 / 发票周键 / 发票财年，开支票日期 → 支票月键 / 支票周键 / 支票财年
+CALENDAR_DATE_COLUMNS = {
+    '发票日期': '发票',
+    '开支票日期': '支票',
+}
+
+# 财会年度从 8 月 1 日开始，以结束年份命名：2025年度 = 2024-08-01 ~ 2025-07-31
+FISCAL_YEAR_START_MONTH = 8
+
+
+def add_calendar_keys(df, date_columns=None):
+    """
+    为日期列新增整数日历键（原地修改并返回 df）：
+    - {前缀}月键：yyyymm，如 202506
+    - {前缀}周键：所在周周一的 yyyymmdd，如 20250616（整数大小顺序即时间顺序）
+    - {前缀}财年：财会年度，如 2025
+    日期为空时对应的键也为空（<NA>）。
+
+    参数：
+    - df: 包含日期列（datetime 类型）的 DataFrame
+    - date_columns: 需要生成键的日期列（None 时为 CALENDAR_DATE_COLUMNS 中的全部列）
+    """
+    for col in date_columns or CALENDAR_DATE_COLUMNS:
+        if col not in df.columns:
+            continue
+        prefix = CALENDAR_DATE_COLUMNS[col]
+        dates = df[col]
+        week_start = dates.dt.normalize() - pd.to_timedelta(dates.dt.weekday, unit='D')
+
+        df[f'{prefix}月键'] = (dates.dt.year * 100 + dates.dt.month).astype('Int32')
+        df[f'{prefix}周键'] = (week_start.dt.year * 10000 + week_start.dt.month * 100 + week_start.dt.day).astype('Int32')
+        df[f'{prefix}财年'] = (dates.dt.year + (dates.dt.month >= FISCAL_YEAR_START_MONTH)).astype('Int16')
+
+    return df
+
+
+def month_label(month_key):
+    """
+    月键 → 显示文本，如 202506 → '2025-06'（可直接用作 st.selectbox 的 format_func）。
+    """
+    month_key = int(month_key)
+    return f"{month_key // 100:04d}-{month_key % 100:02d}"
+
+
+def current_month_key():
+    today = datetime.now()
+    return today.year * 100 + today.month
+
+
+def month_keys(series):
+    """
+    返回月键列中出现过的所有月键（升序、Python int），用于月份下拉框。
+    """
+    return sorted(int(key) for key in series.dropna().unique())
+
+
+def week_lookup(week_keys):
+    """
+    根据周键生成查找表（每个唯一周键一行）。
+
+    返回：
+    - lookup: DataFrame，索引为 周键，列为 周开始 / 周结束 / 周范围（如 '2025-06-16 ~ 2025-06-22'）
+    """
+    keys = pd.Index(sorted(int(key) for key in pd.Series(week_keys).dropna().unique()), dtype='int64')
+    week_start = pd.to_datetime(keys.astype(str), format='%Y%m%d')
+    week_end = week_start + pd.Timedelta(days=6)
+    labels = week_start.strftime('%Y-%m-%d') + ' ~ ' + week_end.strftime('%Y-%m-%d')
+
+    return pd.DataFrame(
+        {'周开始': week_start, '周结束': week_end, '周范围': labels},
+        index=keys,
+    )
+
+
+def with_week_labels(df, key_col):
+    """
+    按周键查表，为（通常已经聚合过的）DataFrame 添加 周开始 / 周结束 / 周范围 三列。
+
+    参数：
+    - df: 包含周键列的 DataFrame
+    - key_col: 周键列名，如 '发票周键'、'支票周键'
+
+    返回：
+    - df: 新增三列后的副本
+    """
+    lookup = week_lookup(df[key_col])
+    if lookup.empty:
+        # 空表（或周键全为空）：pandas 不能用空的日期查找表做 map，直接补空列
+        return df.assign(
+            周开始=pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]'),
+            周结束=pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]'),
+            周范围=pd.Series(None, index=df.index, dtype=object),
+        )
+    return df.assign(
+        周开始=df[key_col].map(lookup['周开始']),
+        周结束=df[key_col].map(lookup['周结束']),
+        周范围=df[key_col].map(lookup['周范围']),
+    )
+
+
+def with_month_label(df, key_col, label_col='月份'):
+    """
+    按月键为 DataFrame 添加月份文本列（如 '2025-06'），只对唯一月键格式化一次。
+    """
+    labels = {key: month_label(key) for key in month_keys(df[key_col])}
+    return df.assign(**{label_col: df[key_col].map(labels)})
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 支票号键：加载数据时对 付款支票号 解析一次，之后排序、筛选、计数都直接使用这些列，
+# 页面不再各自用 isnumeric / to_numeric / 正则 逐行重复解析
+# ============================================================================
+
+# 支票类型
+CHEQUE_KIND_PAPER = '纸质支票'      # 纯数字，如 1023
+CHEQUE_KIND_EFT = '电子转账'        # 字母开头等其他写法，如 ETF-Alex、VISA-ciel
+CHEQUE_KIND_AUTO_DEBIT = '自动扣款'  # 以下前缀开头，如 PPA、Debit
+CHEQUE_KINDS = [CHEQUE_KIND_PAPER, CHEQUE_KIND_EFT, CHEQUE_KIND_AUTO_DEBIT]
+
+# 自动扣款的支票号前缀（不区分大小写）
+AUTO_DEBIT_PREFIXES = ['PPA', 'DEBIT', 'PAD']
+
+# 超过 18 位的数字部分无法放入 int64，视为没有数字部分
+_MAX_DIGITS = 18
+
+
+def add_cheque_keys(df, column='付款支票号'):
+    """
+    解析支票号，新增以下列（原地修改并返回 df）：
+    - 支票数字：支票号中的全部数字组成的整数（Int64），如 1023 → 1023、CK889 → 889；没有数字时为 <NA>
+    - 支票前缀：开头的英文字母（大写，category），如 ETF-Alex → ETF；纯数字支票号为 <NA>
+    - 支票类型：纸质支票 / 电子转账 / 自动扣款（category，见 CHEQUE_KINDS）
+    - 支票有效：支票号非空（去掉首尾空格后不为空字符串）
+
+    同一个支票号通常出现在多行（一张支票付多张发票），只对唯一值解析一次再按编码展开到每一行。
+    """
+    if column not in df.columns:
+        return df
+
+    codes, uniques = pd.factorize(df[column])
+    text = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.strip()
+
+    is_paper = text.str.fullmatch(r'\d+')
+    prefix = text.str.extract(r'^([A-Za-z]+)', expand=False).str.upper()
+    digits = text.str.replace(r'\D', '', regex=True)
+    digits = digits.where((digits != '') & (digits.str.len() <= _MAX_DIGITS))
+    valid = text != ''
+
+    kind = np.select(
+        [~valid, is_paper, prefix.isin(AUTO_DEBIT_PREFIXES)],
+        [None, CHEQUE_KIND_PAPER, CHEQUE_KIND_AUTO_DEBIT],
+        default=CHEQUE_KIND_EFT,
+    )
+
+    # 末尾追加一个空值，缺失的支票号（编码为 -1）正好取到它
+    def expand(values, fill):
+        values = np.append(np.asarray(values, dtype=object), fill)
+        return values[codes]
+
+    df['支票数字'] = pd.array(expand(digits.where(digits.notna(), None), None), dtype='string').astype('Int64')
+    df['支票前缀'] = pd.Categorical(expand(prefix.where(prefix.notna(), None), None))
+    df['支票类型'] = pd.Categorical(expand(kind, None), categories=CHEQUE_KINDS)
+    df['支票有效'] = expand(valid, False).astype(bool)
+
+    return df
+
+
+def cheque_sort_value(df):
+    """
+    支票排序值：纸质支票为支票号数值，其他类型为 <NA>（配合 na_position='last' 排在纸质支票之后）。
+    """
+    return df['支票数字'].where(df['支票类型'] == CHEQUE_KIND_PAPER)
@@ -4,13 +4,13 @@ import pandas as pd
 import streamlit as st
 from datetime import datetime
 from modules.data_loader import load_supplier_data
+from modules.cheque_register import build_cheque_register, cheque_match_keys
 
 def cheque_ledger_query():
     df = load_supplier_data()
 
-    # ✅ 过滤无效支票号
-    df = df[df['付款支票号'].apply(lambda x: str(x).strip().lower() not in ['', 'nan', 'none'])]
-    df['付款支票号'] = df['付款支票号'].astype(str)
+    # ✅ 过滤无效支票号（空值、空字符串；支票有效 在加载时已解析，见 cheque_keys.py）
+    df = df[df['支票有效']].copy()
 
     st.subheader("📒 当前支票总账查询")
     st.info("##### 💡 支票信息总账的搜索时间是按照 *🧾发票日期* 进行设置的，查询某个会计日期内的支票信息")
@@ -24,9 +24,6 @@ def cheque_ledger_query():
     }
     selected_fiscal_year = st.selectbox("📅 选择财会年度（可选）", options=list(fiscal_options.keys()))
 
-    # ✅ 发票日期格式化
-    df['发票日期'] = pd.to_datetime(df['发票日期'], errors='coerce')
-
     if fiscal_options[selected_fiscal_year]:
         fiscal_start, fiscal_end = fiscal_options[selected_fiscal_year]
         df = df[
@@ -51,20 +48,10 @@ def cheque_ledger_query():
         (df['发票日期'] <= pd.to_datetime(end_date))
     ]
 
-    agg_funcs = {
-        '公司名称': 'first',
-        '部门': lambda x: ','.join(sorted(x.astype(str))),
-        '发票号': lambda x: ','.join(sorted(x.astype(str))),
-        '发票金额': lambda x: '+'.join(sorted(x.astype(str))),
-        '银行对账日期': 'first',
-        '实际支付金额': 'sum',
-        'TPS': 'sum',
-        'TVQ': 'sum',
-    }
-
-    grouped = df.groupby('付款支票号').agg(agg_funcs).reset_index()
+    # ✅ 按支票号汇总（部门 / 发票号 / 发票金额 拼接为列表），已按 数值支票号在前、文本支票号在后 排好序
+    grouped = build_cheque_register(df)
 
-    grouped['银行对账日期'] = pd.to_datetime(grouped['银行对账日期'], errors='coerce').dt.strftime('%Y-%m-%d')
+    grouped['银行对账日期'] = grouped['银行对账日期'].dt.strftime('%Y-%m-%d')
     grouped['税后金额'] = grouped['实际支付金额'] - grouped['TPS'] - grouped['TVQ']
 
     # ✅ 日期筛选 + 下载按钮并排显示
@@ -90,10 +77,7 @@ def cheque_ledger_query():
 
             # ✅ 新增辅助匹配列：支票号数字部分 + 金额
             # 提取数字部分：例如 CK889 → 889
-            export_df['辅助匹配列'] = export_df.apply(
-                lambda row: f"{''.join(filter(str.isdigit, str(row['付款支票号'])))}-{format(row['实际支付金额'], '.2f')}",
-                axis=1
-            )
+            export_df['辅助匹配列'] = cheque_match_keys(export_df['付款支票号'], export_df['实际支付金额'])
 
             # 导出 Excel
             buffer = io.BytesIO()
@@ -116,14 +100,7 @@ def cheque_ledger_query():
                 file_name=file_name,
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
-    # ✅ 数值支票号在前、文本支票号在后排序
-    def sort_key(val):
-        try:
-            return (0, int(val))
-        except:
-            return (1, str(val))
-
-    grouped = grouped.sort_values(by='付款支票号', key=lambda x: x.map(sort_key)).reset_index(drop=True)
+    grouped = grouped.reset_index(drop=True)
 
     # ✅ 添加总计行
     total_row = pd.DataFrame([{
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from modules.cheque_keys import cheque_sort_value
+from modules.hover_text import format_amount
+
+
+# ============================================================================
+# 支票总账（按 付款支票号 汇总）
+# 明细行按 支票号 排序后，每张支票对应一段连续的行（组边界），
+# 部门 / 发票号 / 发票金额 列表在组边界上一次性拼接，不再对每张支票调用 Python lambda
+# ============================================================================
+
+# 汇总后每张支票一行的列
+REGISTER_COLUMNS = ['付款支票号', '公司名称', '部门', '发票号', '发票金额', '银行对账日期', '实际支付金额', 'TPS', 'TVQ']
+
+
+def _join_groups(codes, values, n_groups, sep):
+    """
+    按组拼接字符串：先按 (组号, 值) 排序，再在每组的起始位置用 np.add.reduceat 一次拼接出所有组的结果。
+    codes 必须覆盖 0 .. n_groups-1 中的每一个组号。
+    """
+    values = np.asarray(values, dtype=object)
+    order = np.lexsort((values.astype(str), codes))
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+
+    # 每个值前面加上分隔符，拼接后去掉每组开头多出来的一个分隔符
+    pieces = np.char.add(sep, values[order].astype(str)).astype(object)
+    joined = np.add.reduceat(pieces, starts) if len(pieces) else np.array([], dtype=object)
+    return pd.Series(joined, index=np.arange(n_groups)).str[len(sep):]
+
+
+def build_cheque_register(df):
+    """
+    将供应商明细汇总为支票总账（每张支票一行）。
+
+    参数：
+    - df: 已筛选的供应商明细（付款支票号非空，含加载时生成的 支票数字 / 支票类型 列）
+
+    返回：
+    - register: 每张支票一行，列为 REGISTER_COLUMNS：
+      - 部门 / 发票号：该支票涉及的部门、发票号（排序后用 , 连接）
+      - 发票金额：该支票支付的各张发票金额（排序后用 + 连接）
+      - 公司名称 / 银行对账日期：第一条非空记录；实际支付金额 / TPS / TVQ：合计
+      行按支票号排序：纸质支票（纯数字）在前按数值，其他支票号在后按文本（见 cheque_keys.cheque_sort_value）
+    """
+    df = df[df['付款支票号'].notna()]
+
+    # 1️⃣ 支票号编码为组号（0 .. n-1，按支票号排序）
+    codes, cheques = pd.factorize(df['付款支票号'], sort=True)
+    n_groups = len(cheques)
+
+    # 2️⃣ first / sum 类聚合直接使用 groupby 的内置实现
+    register = df.groupby(codes).agg({
+        '公司名称': 'first',
+        '银行对账日期': 'first',
+        '实际支付金额': 'sum',
+        'TPS': 'sum',
+        'TVQ': 'sum',
+        '支票数字': 'first',
+        '支票类型': 'first',
+    })
+    register.insert(0, '付款支票号', pd.Series(cheques, index=register.index, dtype=object))
+
+    # 3️⃣ 部门 / 发票号 / 发票金额 列表：在组边界上一次性拼接
+    register['部门'] = _join_groups(codes, df['部门'].astype(str).to_numpy(), n_groups, ',')
+    register['发票号'] = _join_groups(codes, df['发票号'].fillna('').astype(str).to_numpy(), n_groups, ',')
+    register['发票金额'] = _join_groups(codes, df['发票金额'].astype(str).to_numpy(), n_groups, '+')
+
+    # 4️⃣ 数值支票号在前、文本支票号在后排序（直接使用加载时解析好的整数键）
+    sort_value = cheque_sort_value(register)
+    order = np.lexsort((
+        register['付款支票号'].astype(str).to_numpy(),
+        sort_value.fillna(0).to_numpy(dtype='int64'),
+        sort_value.isna().to_numpy(),
+    ))
+
+    return register.iloc[order][REGISTER_COLUMNS].reset_index(drop=True)
+
+
+def cheque_match_keys(cheques, amounts):
+    """
+    生成对账用的辅助匹配列：支票号中的数字部分 + '-' + 金额（两位小数），如 CK889、1234.5 → '889-1234.50'。
+    """
+    digits = cheques.astype(str).str.replace(r'\D', '', regex=True)
+    return digits + '-' + format_amount(amounts, decimals=2, thousands=False)
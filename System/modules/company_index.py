@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 公司名称搜索索引
+# 每个数据版本只建一次：规范化后的公司名称（不区分大小写、忽略结尾的 * 自动扣款标记）→ 明细行位置，
+# 公司查询页的模糊匹配、各页面的公司下拉选项都直接查索引，不再每次对整张表 astype(str).str.lower().str.contains
+# ============================================================================
+
+
+def normalize_company(names):
+    """
+    规范化公司名称：去掉首尾空格和结尾的 *（自动扣款标记），转为小写，如 ' Metro* ' → 'metro'。
+
+    参数：
+    - names: 单个名称（str）或名称 Series
+
+    返回：
+    - 规范化后的名称（与输入类型相同）
+    """
+    if isinstance(names, str):
+        return names.strip().rstrip('*').strip().lower()
+    return names.astype(str).str.strip().str.rstrip('*').str.strip().str.lower()
+
+
+def build_company_index(df, column='公司名称'):
+    """
+    建立公司名称索引。
+
+    参数：
+    - df: 供应商明细（行位置即索引中记录的位置，使用时须为同一数据版本、同一行顺序）
+    - column: 公司名称列
+
+    返回：
+    - index: dict
+      - names: 公司名称（排除空值、空白名称），按不区分大小写的字母顺序排列
+      - normalized: 与 names 对齐的规范化名称（numpy 字符串数组，用于包含匹配）
+      - prefix_order / sorted_normalized: 规范化名称的排序位置及排序结果（用于二分查找前缀）
+      - row_positions / offsets: 第 i 个公司的明细行位置为 row_positions[offsets[i]:offsets[i + 1]]（升序）
+      - pair_company / pair_department: 出现过的 (公司序号, 部门) 组合（用于按部门列出公司）
+    """
+    codes, uniques = pd.factorize(df[column])
+    uniques = pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+
+    # 1️⃣ 公司名称排序（空白名称不进入索引），factorize 编码 → 公司序号
+    valid = uniques.str.strip() != ''
+    names = uniques[valid].sort_values(key=lambda s: s.str.lower(), kind='stable')
+    company_of_code = np.full(len(uniques) + 1, -1)
+    company_of_code[names.index.to_numpy()] = np.arange(len(names))
+    row_company = company_of_code[codes]  # 空值的编码为 -1，正好取到末尾的 -1
+
+    # 2️⃣ 每个公司的明细行位置：按公司序号稳定排序后，各公司占一段连续区间
+    order = np.argsort(row_company, kind='stable')
+    order = order[row_company[order] >= 0]
+    offsets = np.searchsorted(row_company[order], np.arange(len(names) + 1))
+
+    normalized = normalize_company(names).to_numpy(dtype=str)
+    prefix_order = np.argsort(normalized, kind='stable')
+
+    # 3️⃣ 公司 × 部门 组合（每个组合只保留一次）
+    pairs = pd.DataFrame({'公司': row_company, '部门': df['部门'].to_numpy()})
+    pairs = pairs[(pairs['公司'] >= 0) & pairs['部门'].notna()].drop_duplicates()
+
+    return {
+        'names': names.tolist(),
+        'normalized': normalized,
+        'prefix_order': prefix_order,
+        'sorted_normalized': normalized[prefix_order],
+        'row_positions': order,
+        'offsets': offsets,
+        'pair_company': pairs['公司'].to_numpy(),
+        'pair_department': pairs['部门'].astype(object).to_numpy(),
+    }
+
+
+def find_companies(index, keyword, mode='contains'):
+    """
+    查找名称匹配关键词的公司（不区分大小写，忽略结尾的 *）。
+
+    参数：
+    - index: build_company_index 的结果
+    - keyword: 搜索关键词
+    - mode: 'contains'（名称包含关键词）或 'prefix'（名称以关键词开头）
+
+    返回：
+    - companies: 匹配的公司序号数组（升序，即按公司名称字母顺序）；关键词为空时为空数组
+    """
+    key = normalize_company(keyword or '')
+    if not key:
+        return np.array([], dtype='int64')
+
+    if mode == 'prefix':
+        # 规范化名称已排序：以 key 开头的名称是一段连续区间，二分查找区间两端
+        sorted_normalized = index['sorted_normalized']
+        start = np.searchsorted(sorted_normalized, key, side='left')
+        stop = np.searchsorted(sorted_normalized, key + '\U0010ffff', side='left')
+        return np.sort(index['prefix_order'][start:stop])
+
+    return np.flatnonzero(np.char.find(index['normalized'], key) >= 0)
+
+
+def company_rows(index, keyword, mode='contains'):
+    """
+    返回名称匹配关键词的所有公司的明细行位置（升序，可直接用于 df.iloc）。
+    """
+    offsets = index['offsets']
+    parts = [index['row_positions'][offsets[i]:offsets[i + 1]] for i in find_companies(index, keyword, mode)]
+    if not parts:
+        return np.array([], dtype='int64')
+    return np.sort(np.concatenate(parts))
+
+
+def company_names(index, department=None):
+    """
+    公司名称列表（下拉选项用，不区分大小写的字母顺序）。
+
+    参数：
+    - department: 指定时只返回在该部门出现过的公司
+    """
+    if department is None:
+        return list(index['names'])
+    companies = np.unique(index['pair_company'][index['pair_department'] == department])
+    return [index['names'][i] for i in companies]
@@ -1,113 +1,182 @@
-import pandas as pd
-import streamlit as st
-import numpy as np
-
-# 加载数据函数，设置缓存时间为 10 秒
-@st.cache_data(ttl=3600)
-
-def load_supplier_data():
-    # Google Sheet 文件的 ID（你提供的链接）
-    file_id = "1qH_odKEPlDrLTM8B8UfsMzW6Uu9ciDUW"
+import os
+from datetime import datetime
 
-    # Google Sheet 的 CSV 导出地址
-    csv_url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
+import pandas as pd
 
-    # 读取 CSV 数据（从 Google Sheets）
-    df = pd.read_csv(csv_url)
-    df = df.dropna(how='all')
+from modules.data_sources import parse_source_spec, read_source_bytes, read_source_frame, source_fingerprint
+from modules.data_store import dataset_status, get_dataset, invalidate_dataset, load_stats
+from modules.ledger_schema import (
+    SUPPLIER_COLUMNS,
+    apply_cash_schema,
+    apply_supplier_schema,
+    supplier_csv_dtypes,
+    supplier_memory_report,
+)
+from modules.snapshot_cache import load_with_fingerprint, load_with_snapshot, read_snapshot
+
+
+# 数据有效期（秒）：超过后重新检查数据源
+DATA_TTL_SECONDS = 3600
+
+# 刷新模式：
+# "background" = 数据过期后先继续使用旧数据，同时在后台线程重新加载，加载完成后自动替换
+# "blocking"   = 数据过期后，由第一个访问的用户同步等待重新加载
+REFRESH_MODE = "background"
+
+SUPPLIER_CSV_URL = "https://docs.google.com/spreadsheets/d/1qH_odKEPlDrLTM8B8UfsMzW6Uu9ciDUW/export?format=csv"
+CASH_CSV_URL = "https://docs.google.com/spreadsheets/d/1U6Xx5mhzCkjd6l4UQ7rOjFq4WQkNpQEK/export?format=csv"
+
+# 数据源配置（格式见 data_sources.py），可通过环境变量切换到本地文件，分析模块无需任何改动，例如：
+# XINYA_SUPPLIER_SOURCE="xlsx:D:/Xinya/Xinya_供应商.xlsx"
+# XINYA_CASH_SOURCE="xlsx:D:/Xinya/Cash_refund.xlsx#数据"
+SUPPLIER_SOURCE = os.environ.get("XINYA_SUPPLIER_SOURCE", f"http_csv:{SUPPLIER_CSV_URL}")
+CASH_SOURCE = os.environ.get("XINYA_CASH_SOURCE", f"http_csv:{CASH_CSV_URL}")
+
+
+def _load_source(name, source_spec, parse_func):
+    source = parse_source_spec(source_spec)
+
+    try:
+        # 本地文件：用 修改时间+大小 作为指纹，文件没变时连文件内容都不需要读取
+        fingerprint = source_fingerprint(source)
+        if fingerprint is None:
+            # HTTP 数据源：读取原始字节，按内容哈希判断是否变化
+            raw_bytes = read_source_bytes(source)
+    except OSError as e:
+        # 网络异常 / 文件被占用时，退回使用上一次成功保存的快照
+        df, meta = read_snapshot(name)
+        if df is None:
+            raise
+        print(f"[数据加载] 读取 {name} 数据源失败，使用 {meta['saved_at']} 的本地快照：{e}")
+        return df, meta
+
+    # 只有指纹变化时才重新解析（如 Excel），否则直接读取本地列式快照
+    if fingerprint is not None:
+        return load_with_fingerprint(
+            name, fingerprint, lambda: parse_func(source, read_source_bytes(source))
+        )
+    return load_with_snapshot(name, raw_bytes, lambda raw: parse_func(source, raw))
+
+
+def parse_supplier_source(source, raw_bytes):
+    """
+    解析任意数据源（CSV / Excel / parquet / SQLite）读到的供应商原始数据，并完成所有清洗和类型转换。
+    字段类型（日期、分类、可空字符串、金额）统一声明在 ledger_schema.py 中，所有数据源共用同一套清洗。
 
+    设置特殊标识符，以控制 某些列是否应该清除
+    比如，当下我记录了，但是不想显示，因此在 特殊标记清除 列 标记为 1 ， 电脑自动清除 '付款支票号', '实际支付金额', '付款支票总额', '开支票日期' 这些列的数据
+    就像没有记录一样
 
+    只读取 SUPPLIER_COLUMNS 中声明的列；Excel 优先使用 calamine 引擎（见 data_sources.excel_engine）
+    """
+    df = read_source_frame(source, raw_bytes, csv_dtype=supplier_csv_dtypes(), usecols=SUPPLIER_COLUMNS)
+    return apply_supplier_schema(df)
 
 
-    # 设置特殊标识符，以控制 某些列是否应该清除
-    #比如，当下我记录了，但是不想显示，因此在 特殊标记清除 列 标记为 1 ， 电脑自动清除 '付款支票号', '实际支付金额', '付款支票总额', '开支票日期' 这些列的数据
-    # 就像没有记录一样 
+def parse_cash_source(source, raw_bytes):
+    """
+    解析现金账原始数据并完成清洗（清洗逻辑见 ledger_schema.apply_cash_schema）。
+    """
+    return apply_cash_schema(read_source_frame(source, raw_bytes))
 
-    # 确保列是标准数值或文本类型
-    df['特殊标记清除'] = pd.to_numeric(df['特殊标记清除'], errors='coerce')
 
-    # 指定要清除的列
-    cols_to_clear = ['付款支票号', '实际支付金额', '付款支票总额', '开支票日期']
+# 联网版的数据集：名称 → (数据源配置, 解析函数)
+# 同一组中的数据集一起刷新：任意一个需要重新加载时，整组在线程池中并行下载/解析
+DATASETS = {
+    "supplier": (SUPPLIER_SOURCE, parse_supplier_source),
+    "cash": (CASH_SOURCE, parse_cash_source),
+}
 
-    # 找出需要清除的行
-    mask_clear = df['特殊标记清除'] == 1
 
-    # 将这些列设为真正的“未填写”状态（缺失值）
-    df.loc[mask_clear, cols_to_clear] = np.nan
+def get_dataset_entry(name, datasets=None):
+    """
+    返回进程内共享的数据集条目 {"df", "meta", "loaded_at"}。
 
+    参数：
+    - name: 数据集 / 快照名称（如 "supplier"、"cash"）
+    - datasets: 数据集分组（格式同 DATASETS，None 时使用 DATASETS）；单机版传入本地文件的分组
+    """
+    datasets = datasets or DATASETS
+    loaders = {
+        key: (lambda key=key, spec=spec, parse_func=parse_func: _load_source(key, spec, parse_func))
+        for key, (spec, parse_func) in datasets.items()
+    }
+    return get_dataset(
+        name,
+        loaders[name],
+        ttl=DATA_TTL_SECONDS,
+        background=(REFRESH_MODE == "background"),
+        fallback_func=lambda: read_snapshot(name),
+        companions=loaders,
+    )
 
 
+def load_supplier_data():
+    """
+    返回清洗后的供应商数据。
+    数据在进程内共享，过期后按 REFRESH_MODE 刷新；各页面会在返回的 DataFrame 上新增/修改列，因此每次返回副本。
+    """
+    return get_dataset_entry("supplier")["df"].copy()
 
 
-    # 自动转换常用日期字段为 datetime 类型（可按需扩展）
-    date_columns = ['开支票日期', '发票日期','银行对账日期']
-    for col in date_columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+def _clear_all_data():
+    for name in DATASETS:
+        invalidate_dataset(name)
 
-    # 强制转换为字符串以避免 Streamlit 警告
-    string_columns = ['付款支票号', '发票号', '公司名称']
-    for col in string_columns:
-        if col in df.columns:
-            df[col] = df[col].astype(str)
 
-    
-    # 强制转换成 数值格式，避免出现 字符串而无法进行计算
-    amount_columns = ['发票金额', 'TPS', 'TVQ', '实际支付金额', '付款支票总额']
-    for col in amount_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+# 与 st.cache_data 的 .clear() 用法保持一致，供侧边栏“手动刷新数据”按钮调用
+load_supplier_data.clear = _clear_all_data
 
-    return df
 
+def format_data_status(name):
+    """
+    将数据集状态整理为侧边栏显示所需的格式。
 
-def load_cash_data():
-    # Google Sheet 文件的 ID（你提供的链接）
-    file_id = "1U6Xx5mhzCkjd6l4UQ7rOjFq4WQkNpQEK"
+    返回：
+    - updated_at: 数据源最近一次发生变化的时间（快照保存时间），格式 yyyy-mm-dd HH:MM
+    - refreshing: 是否正在后台刷新
+    """
+    status = dataset_status(name)
+    if status is None:
+        return {"updated_at": None, "refreshing": False}
 
-    # Google Sheet 的 CSV 导出地址
-    csv_url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
+    saved_at = status["meta"].get("saved_at")
+    updated_at = datetime.fromisoformat(saved_at).strftime("%Y-%m-%d %H:%M") if saved_at else None
 
-    # 读取 CSV 数据（从 Google Sheets）
-    df_data = pd.read_csv(csv_url)
+    return {"updated_at": updated_at, "refreshing": status["refreshing"]}
 
 
-    # ✅ 步骤 1：读取 Excel 文件
-    df_data = df_data.dropna(how='all')  # 删除完全为空的行
+def get_data_status():
+    """
+    返回供应商数据的更新状态，供侧边栏显示（格式见 format_data_status）。
+    """
+    get_dataset_entry("supplier")
+    return format_data_status("supplier")
 
-    # ✅ 步骤 2：统一日期和金额格式
-    df_data['小票日期'] = pd.to_datetime(df_data['小票日期'], errors='coerce').dt.strftime('%Y-%m-%d')  # 格式化为 yyyy-mm-dd 字符串
-    df_data['开票日期'] = pd.to_datetime(df_data['开票日期'], errors='coerce')  # 保持为 datetime 类型以便后续提取年月
-    
-    # 会计核算日期 指 这些现金账 具体放在哪个月份进行处理
-    df_data['会计核算日期'] = pd.to_datetime(df_data['会计核算日期'], errors='coerce') 
 
-    # ✅ 保留“开票日期”非空的数据
-    #df_data = df_data[df_data['开票日期'].notna()]
-    df_data = df_data[df_data['会计核算日期'].notna()]
+def get_load_stats(name="supplier"):
+    """
+    返回数据集的加载计数器：实际加载次数（loads）、被合并的并发加载请求次数（coalesced）、失败次数（failures）。
+    """
+    return load_stats(name)
 
-    # ✅ 金额字段转换为浮点并保留两位小数
-    for col in ['总金额', 'TPS', 'TVQ', '支票金额']:
-        df_data[col] = pd.to_numeric(df_data[col], errors='coerce').round(2)
 
-    # ✅ 步骤 3：添加“年月”列（格式：2025-02）
-    #df_data['年月'] = df_data['开票日期'].dt.to_period('M').astype(str)
-    df_data['年月'] = df_data['会计核算日期'].dt.to_period('M').astype(str)
+def get_memory_report(name="supplier"):
+    """
+    返回供应商数据每列内存占用的对比报告（旧版布局 vs 当前布局，见 ledger_schema.supplier_memory_report）。
+    """
+    return supplier_memory_report(get_dataset_entry(name)["df"])
 
-    # ✅ 步骤 4 : 添加 净值 列
-    # 只要其中任意一个值为 NaN，该行计算出的 '净值' 也会是 NaN。 这是因为在 Pandas 中，任何数值与 NaN 参与运算，结果都将是 NaN。
-    # .fillna(0) 在这里只是返回一个临时替换了空值的新 Series，并没有写回原来的 DataFrame， 即不改变原数据库内容。
-    df_data['净值'] = df_data['总金额'] - df_data['TPS'].fillna(0) - df_data['TVQ'].fillna(0)
 
+def load_cash_data():
+    """
+    返回清洗后的现金账数据，与供应商数据共用同一套快照缓存和刷新机制。
+    """
+    return get_dataset_entry("cash")["df"].copy()
 
 
-    # 强制转换为字符串以避免 Streamlit 警告
-    string_columns = ['支票号', '公司名称']
-    for col in string_columns:
-        if col in df_data.columns:
-            df_data[col] = df_data[col].astype(str)
+load_cash_data.clear = _clear_all_data
 
-    return df_data
 
 def get_ordered_departments(df, column_name="部门", priority_order=None, default_name="杂货"):
     """
@@ -1,97 +1,76 @@
-import pandas as pd
-import streamlit as st
+from functools import partial
 from pathlib import Path
-import pandas as pd
 
-# 加载数据函数，设置缓存时间为 10 秒
-@st.cache_data(ttl=3600)
-
-def load_supplier_data():
-    # Google Sheet 文件的 ID（你提供的链接）
-    #file_id = "1qH_odKEPlDrLTM8B8UfsMzW6Uu9ciDUW"
-
-    # Google Sheet 的 CSV 导出地址
-    #csv_url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
-
-    # 获取当前脚本的绝对路径
-    current_dir = Path(__file__).resolve().parent.parent
-
-    # 拼接 Excel 文件路径
-    excel_file_path = current_dir / "Xinya_供应商.xlsx"
+from modules import ledger_stages
+# get_ordered_departments 一并导出，页面只需切换导入的模块即可
+from modules.data_loader import (
+    format_data_status,
+    get_dataset_entry,
+    get_ordered_departments,
+    parse_cash_source,
+    parse_supplier_source,
+)
+from modules.data_store import invalidate_dataset
+
+
+# 单机版：直接读取 System 目录下的本地 Excel 文件
+# 读取、清洗（包括 特殊标记清除、金额列转换）、快照缓存与联网版 data_loader.py 完全共用，
+# 只是数据源不同；如需改用 CSV / parquet / SQLite，只需修改下面两个配置（格式见 data_sources.py）
+# Excel 只读取用到的列，优先使用 calamine 引擎；文件修改时间没变时直接读取 .snapshots 中的列式快照，完全跳过 Excel 解析
+current_dir = Path(__file__).resolve().parent.parent
+
+LOCAL_SUPPLIER_SOURCE = f"xlsx:{current_dir / 'Xinya_供应商.xlsx'}"
+LOCAL_CASH_SOURCE = f"xlsx:{current_dir / 'Cash_refund.xlsx'}#数据"
+
+# 与联网版使用不同的数据集 / 快照名称，互不覆盖；两个文件刷新时并行读取
+LOCAL_DATASETS = {
+    "supplier_local": (LOCAL_SUPPLIER_SOURCE, parse_supplier_source),
+    "cash_local": (LOCAL_CASH_SOURCE, parse_cash_source),
+}
+
+# 页面上的派生数据（管理版应付表、汇总立方体、公司索引等，见 ledger_stages.py）同样基于本地供应商数据：
+# 下面的 load_* 与 ledger_stages 中的同名函数参数相同，只是固定传入本地数据集，页面只需切换导入的模块；
+# 与联网版的派生数据分别缓存，互不影响
+LOCAL_SUPPLIER_DATASET = ("supplier_local", LOCAL_DATASETS)
+
+load_gestion_unpaid = partial(ledger_stages.load_gestion_unpaid, dataset=LOCAL_SUPPLIER_DATASET)
+load_ledger_cube = partial(ledger_stages.load_ledger_cube, dataset=LOCAL_SUPPLIER_DATASET)
+load_payment_cycle_stats = partial(ledger_stages.load_payment_cycle_stats, dataset=LOCAL_SUPPLIER_DATASET)
+load_compta_ledger = partial(ledger_stages.load_compta_ledger, dataset=LOCAL_SUPPLIER_DATASET)
+load_company_index = partial(ledger_stages.load_company_index, dataset=LOCAL_SUPPLIER_DATASET)
+load_ledger_indexes = partial(ledger_stages.load_ledger_indexes, dataset=LOCAL_SUPPLIER_DATASET)
+load_outflow_forecast = partial(ledger_stages.load_outflow_forecast, dataset=LOCAL_SUPPLIER_DATASET)
+load_outflow_simulation = partial(ledger_stages.load_outflow_simulation, dataset=LOCAL_SUPPLIER_DATASET)
+load_forecast_backtest = partial(ledger_stages.load_forecast_backtest, dataset=LOCAL_SUPPLIER_DATASET)
+load_payment_candidates = partial(ledger_stages.load_payment_candidates, dataset=LOCAL_SUPPLIER_DATASET)
 
 
-    # 读取 Excel 文件
-    df = pd.read_excel(excel_file_path)
+def load_supplier_data():
+    """
+    返回清洗后的供应商数据（本地 Excel）。每次返回副本，页面可以放心修改。
+    """
+    return get_dataset_entry(*LOCAL_SUPPLIER_DATASET)["df"].copy()
 
 
+def _clear_all_data():
+    for name in LOCAL_DATASETS:
+        invalidate_dataset(name)
 
-    # 读取 CSV 数据（从 Google Sheets）
-    #df = pd.read_csv(csv_url)
-    df = df.dropna(how='all')
 
-    # 自动转换常用日期字段为 datetime 类型（可按需扩展）
-    date_columns = ['开支票日期', '发票日期','银行对账日期']
-    for col in date_columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+# 供侧边栏“手动刷新数据”按钮调用
+load_supplier_data.clear = _clear_all_data
 
-    # 强制转换为字符串以避免 Streamlit 警告
-    string_columns = ['付款支票号', '发票号', '公司名称']
-    for col in string_columns:
-        if col in df.columns:
-            df[col] = df[col].astype(str)
 
-    return df
+def get_data_status():
+    get_dataset_entry(*LOCAL_SUPPLIER_DATASET)
+    return format_data_status("supplier_local")
 
 
 def load_cash_data():
-    # Google Sheet 文件的 ID（你提供的链接）
-    #file_id = "1qH_odKEPlDrLTM8B8UfsMzW6Uu9ciDUW"
-
-    # Google Sheet 的 CSV 导出地址
-    #csv_url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=csv"
-
-    # 获取当前脚本的绝对路径
-    current_dir = Path(__file__).resolve().parent.parent
-
-    # 拼接 Excel 文件路径
-    excel_file_path = current_dir / "Cash_refund.xlsx"
-
-
-    # ✅ 步骤 1：读取 Excel 文件
-    df_data = pd.read_excel(excel_file_path,sheet_name= "数据")
-    df_data = df_data.dropna(how='all')  # 删除完全为空的行
-
-    # ✅ 步骤 2：统一日期和金额格式
-    df_data['小票日期'] = pd.to_datetime(df_data['小票日期'], errors='coerce').dt.strftime('%Y-%m-%d')  # 格式化为 yyyy-mm-dd 字符串
-    df_data['开票日期'] = pd.to_datetime(df_data['开票日期'], errors='coerce')  # 保持为 datetime 类型以便后续提取年月
-    
-    # 会计核算日期 指 这些现金账 具体放在哪个月份进行处理
-    df_data['会计核算日期'] = pd.to_datetime(df_data['会计核算日期'], errors='coerce') 
-
-    # ✅ 保留“开票日期”非空的数据
-    #df_data = df_data[df_data['开票日期'].notna()]
-    df_data = df_data[df_data['会计核算日期'].notna()]
-
-    # ✅ 金额字段转换为浮点并保留两位小数
-    for col in ['总金额', 'TPS', 'TVQ', '支票金额']:
-        df_data[col] = pd.to_numeric(df_data[col], errors='coerce').round(2)
-
-    # ✅ 步骤 3：添加“年月”列（格式：2025-02）
-    #df_data['年月'] = df_data['开票日期'].dt.to_period('M').astype(str)
-    df_data['年月'] = df_data['会计核算日期'].dt.to_period('M').astype(str)
-
-    # ✅ 步骤 4 : 添加 净值 列
-    # 只要其中任意一个值为 NaN，该行计算出的 '净值' 也会是 NaN。 这是因为在 Pandas 中，任何数值与 NaN 参与运算，结果都将是 NaN。
-    # .fillna(0) 在这里只是返回一个临时替换了空值的新 Series，并没有写回原来的 DataFrame， 即不改变原数据库内容。
-    df_data['净值'] = df_data['总金额'] - df_data['TPS'].fillna(0) - df_data['TVQ'].fillna(0)
-
-
+    """
+    返回清洗后的现金账数据（本地 Excel 的“数据”工作表）。
+    """
+    return get_dataset_entry("cash_local", LOCAL_DATASETS)["df"].copy()
 
-    # 强制转换为字符串以避免 Streamlit 警告
-    string_columns = ['支票号', '公司名称']
-    for col in string_columns:
-        if col in df_data.columns:
-            df_data[col] = df_data[col].astype(str)
 
-    return df_data
+load_cash_data.clear = _clear_all_data
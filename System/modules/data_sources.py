@@ -0,0 +1,144 @@
+import importlib.util
+import io
+import os
+import sqlite3
+import urllib.request
+from contextlib import closing
+
+import pandas as pd
+
+
+# ============================================================================
+# 数据源后端
+# 数据源用一个配置字符串描述，格式为 "类型:位置[#工作表/表名]"，例如：
+# - "http_csv:https://docs.google.com/spreadsheets/d/<id>/export?format=csv"
+# - "csv:D:/Xinya/Xinya_供应商.csv"
+# - "xlsx:D:/Xinya/Cash_refund.xlsx#数据"
+# - "parquet:D:/Xinya/Xinya_供应商.parquet"
+# - "sqlite:D:/Xinya/xinya.db#supplier"
+# 各后端只负责读取“原始数据”，清洗逻辑统一在 ledger_schema.py 中完成
+# ============================================================================
+
+SOURCE_BACKENDS = ("http_csv", "csv", "xlsx", "parquet", "sqlite")
+
+
+def excel_engine():
+    """
+    选择 Excel 读取引擎：安装了 python-calamine（且 pandas >= 2.2）时使用 calamine，
+    解析速度比 openpyxl 快数倍；否则退回 openpyxl。
+    """
+    pandas_version = tuple(int(part) for part in pd.__version__.split(".")[:2])
+    if pandas_version >= (2, 2) and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+
+def parse_source_spec(spec):
+    """
+    解析数据源配置字符串。
+
+    参数：
+    - spec: 如 "xlsx:D:/Xinya/Cash_refund.xlsx#数据"
+
+    返回：
+    - source: {"backend": 类型, "location": 地址或文件路径, "table": 工作表/表名（可为 None）}
+    """
+    backend, sep, location = spec.partition(":")
+    backend = backend.strip().lower()
+    if not sep or backend not in SOURCE_BACKENDS:
+        raise ValueError(f"无法识别的数据源配置：{spec}（支持的类型：{', '.join(SOURCE_BACKENDS)}）")
+
+    table = None
+    # URL 中可能出现 #，只有本地 Excel / SQLite 才解析 #工作表/表名
+    if backend in ("xlsx", "sqlite") and "#" in location:
+        location, table = location.rsplit("#", 1)
+
+    if backend == "sqlite" and not table:
+        raise ValueError(f"SQLite 数据源需要用 #表名 指定数据表：{spec}")
+
+    return {"backend": backend, "location": location.strip(), "table": table}
+
+
+def fetch_source_bytes(url, timeout=60):
+    """
+    下载数据源的原始字节（用于计算内容哈希，判断数据是否发生变化）。
+    """
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+def read_source_bytes(source):
+    """
+    读取数据源的原始字节：HTTP 数据源下载，本地数据源直接读取文件。
+    SQLite 数据源返回 None：解析时直接连接数据库查询，用不到整库的字节（是否变化见 source_fingerprint）。
+    """
+    if source["backend"] == "http_csv":
+        return fetch_source_bytes(source["location"])
+
+    if source["backend"] == "sqlite":
+        return None
+
+    with open(source["location"], "rb") as f:
+        return f.read()
+
+
+def source_fingerprint(source):
+    """
+    返回本地数据源的指纹（文件修改时间 + 大小），无需读取文件内容即可判断文件是否变化。
+    HTTP 数据源没有可靠的修改时间，返回 None，需下载后按内容哈希判断。
+    """
+    if source["backend"] == "http_csv":
+        return None
+
+    stat = os.stat(source["location"])
+    fingerprint = f"{source['backend']}:{source['table'] or ''}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    # SQLite 在 WAL 模式下，新写入的数据先记在 -wal 文件中，主文件不变
+    wal_path = source["location"] + "-wal"
+    if source["backend"] == "sqlite" and os.path.exists(wal_path):
+        wal_stat = os.stat(wal_path)
+        fingerprint += f":{wal_stat.st_mtime_ns}:{wal_stat.st_size}"
+    return fingerprint
+
+
+def read_source_frame(source, raw_bytes, csv_dtype=None, usecols=None):
+    """
+    将原始字节解析为 DataFrame（尚未清洗）。
+
+    参数：
+    - source: parse_source_spec() 返回的数据源配置
+    - raw_bytes: read_source_bytes() 读取到的原始字节（SQLite 数据源为 None）
+    - csv_dtype: CSV 数据源在解析时使用的 dtype 映射（见 ledger_schema.supplier_csv_dtypes）
+    - usecols: 只保留这些列（不存在的列自动忽略）；None 时读取全部列
+
+    返回：
+    - df: 原始 DataFrame
+    """
+    backend = source["backend"]
+
+    # CSV / Excel 在解析阶段就跳过不需要的列，省去这些列的解析开销
+    column_filter = None if usecols is None else (lambda col: col in usecols)
+
+    if backend in ("http_csv", "csv"):
+        return pd.read_csv(io.BytesIO(raw_bytes), dtype=csv_dtype, usecols=column_filter)
+
+    if backend == "xlsx":
+        return pd.read_excel(
+            io.BytesIO(raw_bytes),
+            sheet_name=source["table"] or 0,
+            usecols=column_filter,
+            engine=excel_engine(),
+        )
+
+    if backend == "parquet":
+        df = pd.read_parquet(io.BytesIO(raw_bytes))
+    elif backend == "sqlite":
+        table = source["table"].replace('"', '""')
+        with closing(sqlite3.connect(source["location"])) as conn:
+            df = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+    else:
+        raise ValueError(f"未知的数据源类型：{backend}")
+
+    if usecols is not None:
+        df = df[[col for col in df.columns if col in usecols]]
+    return df
@@ -0,0 +1,211 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 进程内共享的数据集缓存（同一个 Streamlit 进程中的所有会话共用）
+# name -> {"df": DataFrame, "meta": 快照元数据, "loaded_at": 加载完成的时间戳}
+_datasets = {}
+
+# 正在进行中的加载（single-flight）：同一数据集同一时间只允许一次真正的下载/解析，
+# 其他会话等待这一次的结果并共享
+# name -> {"event": threading.Event, "entry": 加载结果, "error": 异常}
+_inflight = {}
+
+# 加载计数器：loads = 实际执行的加载次数，coalesced = 被合并到进行中加载的请求次数，failures = 失败次数
+_load_stats = {}
+
+# 被手动清除的数据集：下一次访问必须同步重新加载，不能再用本地快照顶替
+_invalidated = set()
+
+_lock = threading.Lock()
+
+# 数据刷新线程池：同一组数据集（如 供应商 + 现金账）在这里并行下载/解析，
+# 总耗时取决于较慢的一个，而不是两者之和
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="data-refresh")
+
+
+def _stats_for(name):
+    # 调用方需持有 _lock
+    return _load_stats.setdefault(name, {"loads": 0, "coalesced": 0, "failures": 0})
+
+
+def _store(name, df, meta, loaded_at=None):
+    entry = {
+        "df": df,
+        "meta": meta or {},
+        "loaded_at": time.time() if loaded_at is None else loaded_at,
+    }
+    # 整体替换字典中的条目：读取方要么拿到完整的旧数据，要么拿到完整的新数据
+    with _lock:
+        _datasets[name] = entry
+        _invalidated.discard(name)
+    return entry
+
+
+def _load_once(name, load_func):
+    """
+    执行一次加载；如果同一数据集已有加载在进行中，则等待它完成并直接使用其结果。
+    """
+    with _lock:
+        call = _inflight.get(name)
+        is_leader = call is None
+        if is_leader:
+            call = {"event": threading.Event(), "entry": None, "error": None}
+            _inflight[name] = call
+        else:
+            _stats_for(name)["coalesced"] += 1
+
+    if not is_leader:
+        call["event"].wait()
+        if call["error"] is not None:
+            raise call["error"]
+        return call["entry"]
+
+    try:
+        df, meta = load_func()
+        call["entry"] = _store(name, df, meta)
+        with _lock:
+            _stats_for(name)["loads"] += 1
+    except Exception as e:
+        call["error"] = e
+        with _lock:
+            _stats_for(name)["failures"] += 1
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(name, None)
+        call["event"].set()
+
+    return call["entry"]
+
+
+def _log_background_result(name, future):
+    try:
+        entry = future.result()
+        print(f"[后台刷新] {name} 已更新（{len(entry['df'])} 行）")
+    except Exception as e:
+        # 刷新失败时继续提供上一次成功加载的数据
+        print(f"[后台刷新] {name} 重新加载失败，继续使用旧数据：{e}")
+
+
+def refresh_datasets(loaders, wait=True):
+    """
+    在线程池中并行加载多个数据集。
+
+    参数：
+    - loaders: {数据集名称: load_func}
+    - wait: True 时等待全部完成并返回结果；False 时立即返回（后台刷新），已在加载中的数据集直接合并
+
+    返回：
+    - results: {数据集名称: entry 或 加载时抛出的异常}（wait=False 时返回 None）
+    """
+    futures = {}
+    for name, load_func in loaders.items():
+        if not wait:
+            with _lock:
+                if name in _inflight:
+                    # 已有加载在进行中，本次刷新请求直接合并
+                    _stats_for(name)["coalesced"] += 1
+                    continue
+        futures[name] = _refresh_pool.submit(_load_once, name, load_func)
+
+    if not wait:
+        for name, future in futures.items():
+            future.add_done_callback(lambda f, name=name: _log_background_result(name, f))
+        return None
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = e
+    return results
+
+
+def get_dataset(name, load_func, ttl=3600, background=True, fallback_func=None, companions=None):
+    """
+    获取数据集（stale-while-revalidate）。
+
+    参数：
+    - name: 数据集名称（如 "supplier"）
+    - load_func: 加载函数，返回 (df, meta)
+    - ttl: 数据有效期（秒），超过后触发重新加载
+    - background: True 时过期数据先照常返回，同时在后台线程重新加载，加载完成后原子替换；
+                  False 时过期后同步重新加载（旧的阻塞行为）
+    - fallback_func: 冷启动时可立即返回的旧数据来源（如本地快照），返回 (df, meta) 或 (None, None)
+    - companions: 与本数据集一起刷新的其他数据集 {名称: load_func}，刷新时在线程池中并行加载
+
+    返回：
+    - entry: {"df": DataFrame, "meta": dict, "loaded_at": float}
+    """
+    loaders = {name: load_func, **(companions or {})}
+
+    with _lock:
+        entry = _datasets.get(name)
+        forced = name in _invalidated
+
+    # 冷启动：先用本地快照顶上（视为已过期），随后在后台刷新；手动清除后不使用快照
+    if entry is None and background and not forced and fallback_func is not None:
+        df, meta = fallback_func()
+        if df is not None:
+            entry = _store(name, df, meta, loaded_at=0)
+
+    # 完全没有可用数据：只能同步加载（并发的会话共享同一次加载，同组数据集并行加载）
+    if entry is None:
+        result = refresh_datasets(loaders, wait=True)[name]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    if time.time() - entry["loaded_at"] > ttl:
+        if background:
+            refresh_datasets(loaders, wait=False)
+        else:
+            result = refresh_datasets(loaders, wait=True)[name]
+            if isinstance(result, Exception):
+                raise result
+            entry = result
+
+    return entry
+
+
+def invalidate_dataset(name):
+    """
+    删除内存中的数据集，下一次 get_dataset 会同步重新加载（用于“手动刷新数据”）。
+    """
+    with _lock:
+        _datasets.pop(name, None)
+        _invalidated.add(name)
+
+
+def dataset_status(name):
+    """
+    返回数据集的状态信息，供侧边栏显示：
+    - meta: 快照元数据（saved_at 为源数据最近一次发生变化并保存快照的时间）
+    - loaded_at: 最近一次加载完成的时间戳
+    - refreshing: 是否有加载正在进行
+    """
+    with _lock:
+        entry = _datasets.get(name)
+        refreshing = name in _inflight
+    if entry is None:
+        return None
+    return {"meta": entry["meta"], "loaded_at": entry["loaded_at"], "refreshing": refreshing}
+
+
+def load_stats(name=None):
+    """
+    返回加载计数器（副本）：
+    - loads: 实际执行的下载/解析次数
+    - coalesced: 被合并到进行中加载、没有重复下载的请求次数
+    - failures: 加载失败次数
+
+    参数：
+    - name: 数据集名称；为 None 时返回所有数据集的计数器
+    """
+    with _lock:
+        if name is not None:
+            return dict(_stats_for(name))
+        return {key: dict(value) for key, value in _load_stats.items()}
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 图表 hover 提示信息（提示信息 列）
+# 用整列的数值 / 字符串运算生成提示文本，代替 DataFrame.apply(lambda row: f"...", axis=1) 的逐行拼接
+# 格式与 f-string 一致：金额 {:,.0f}、占比 {:.1%}，空值显示为 nan
+# ============================================================================
+
+
+def _format_fixed(values, decimals, thousands=True):
+    """
+    将数值列格式化为固定小数位数的文本，如 1234567.891 → '1,234,567.89'（decimals=2，带千位分隔符）。
+    """
+    values = pd.Series(values, dtype='float64')
+    rounded = values.round(decimals)
+    finite = np.isfinite(rounded)
+
+    # 先放大为整数，再分别生成整数部分（加千位分隔符）和小数部分，全部为整列运算
+    scaled = (rounded.abs() * 10 ** decimals).round().where(finite, 0).astype('int64')
+    text = (scaled // 10 ** decimals).astype(str)
+    if thousands:
+        text = text.str.replace(r'\B(?=(\d{3})+$)', ',', regex=True)
+    if decimals > 0:
+        text = text + '.' + (scaled % 10 ** decimals).astype(str).str.zfill(decimals)
+
+    text = text.where(~(values < 0), '-' + text)
+    # 空值 / 无穷大与 f-string 的显示保持一致
+    return text.where(finite, rounded.astype(str).fillna('nan'))
+
+
+def format_amount(values, decimals=0, thousands=True):
+    """
+    金额列 → 文本（千位分隔符，默认不保留小数），等同于逐行 f"{x:,.0f}"。
+
+    参数：
+    - values: 数值列（Series）
+    - decimals: 保留的小数位数
+    - thousands: 是否添加千位分隔符（False 时等同于 f"{x:.2f}" 这类写法）
+
+    返回：
+    - text: 与 values 索引相同的字符串 Series
+    """
+    return _format_fixed(values, decimals, thousands)
+
+
+def format_ratio(numerator, denominator, decimals=1):
+    """
+    占比列 → 百分比文本，等同于逐行 f"{a / b:.1%}"；分母为 0 时显示 inf / nan，不会报错。
+    """
+    ratio = pd.Series(numerator, dtype='float64') / pd.Series(denominator, dtype='float64')
+    return _format_fixed(ratio * 100, decimals, thousands=False) + '%'
+
+
+def month_title(month_labels):
+    """
+    月份文本 → 提示标题中的月份，如 '2025-06' → '2025年06月'。
+    """
+    month_labels = month_labels.astype(str)
+    return month_labels.str[:4] + '年' + month_labels.str[5:] + '月'
+
+
+def hover_text(*lines):
+    """
+    将多行文本用 <br> 连接为 hover 提示信息。
+
+    参数：
+    - lines: 每一行为字符串 Series（与 DataFrame 索引相同）或普通字符串（所有行相同，"" 表示空行）；
+      部门、公司名称等分类列会自动转为文本
+
+    返回：
+    - text: 字符串 Series，可直接赋值给 提示信息 列
+
+    示例：
+    df['提示信息'] = hover_text(
+        "部门：" + df['部门'].astype(str),
+        "付款金额：" + format_amount(df['实际支付金额']),
+    )
+    """
+    result = None
+    for line in lines:
+        if isinstance(line, pd.Series):
+            line = line.astype(str).fillna('nan')
+        result = line if result is None else result + '<br>' + line
+    return result
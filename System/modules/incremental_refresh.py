@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 增量刷新：对比前后两个数据版本的明细行
+# 供应商表格平时基本只在末尾追加新行，另外修改少量近期记录（补填付款信息），
+# 找出变化的行后，汇总立方体、公司付款周期统计等派生数据只需更新受影响的部分，不必全量重算
+# ============================================================================
+
+# 行身份：发票号 + 公司名称 + 部门（同一身份出现多次时，按出现顺序区分第 1、2 … 条）
+ROW_IDENTITY = ['发票号', '公司名称', '部门']
+
+# 变化的行超过新数据的这一比例时，增量更新已不比全量重算快，直接全量重算
+MAX_CHANGED_RATIO = 0.2
+
+
+def _identity_keys(df):
+    """
+    行身份列（转为普通对象列，前后两个版本的分类类别可能不同）+ 同一身份内的出现序号。
+    """
+    keys = df[ROW_IDENTITY].astype(object)
+    keys = keys.where(keys.notna(), None)
+    keys['_序号'] = df.groupby(ROW_IDENTITY, observed=True, dropna=False, sort=False).cumcount().to_numpy()
+    return keys.reset_index(drop=True)
+
+
+def _same_values(old_values, new_values):
+    """
+    逐行比较两列取值是否相同（两边都为空视为相同）。
+    """
+    if isinstance(old_values.dtype, pd.CategoricalDtype) or isinstance(new_values.dtype, pd.CategoricalDtype):
+        old_values = old_values.astype(object)
+        new_values = new_values.astype(object)
+    same = old_values.eq(new_values).fillna(False).to_numpy(dtype=bool)
+    return same | (old_values.isna().to_numpy() & new_values.isna().to_numpy())
+
+
+def diff_rows(old_df, new_df, max_changed_ratio=MAX_CHANGED_RATIO):
+    """
+    按行身份（ROW_IDENTITY）对比前后两个版本的明细数据。
+
+    参数：
+    - old_df: 上一个版本的明细（派生数据就是由它计算的）
+    - new_df: 当前版本的明细
+    - max_changed_ratio: 变化行占比上限，超过时返回 None
+
+    返回：
+    - diff: {'old_positions': 旧数据中需要减去的行位置（被修改的行），
+             'new_positions': 新数据中需要加上的行位置（被修改的行 + 新增的行）}
+      历史发生变化时返回 None，调用方应全量重算：
+      - 列结构不同
+      - 旧数据中的行在新数据中找不到（被删除，或身份列被修改）
+      - 变化的行过多（超过 max_changed_ratio）
+    """
+    if list(old_df.columns) != list(new_df.columns):
+        return None
+
+    old_keys = _identity_keys(old_df).assign(_旧行=np.arange(len(old_df)))
+    new_keys = _identity_keys(new_df).assign(_新行=np.arange(len(new_df)))
+    matched = old_keys.merge(new_keys, on=ROW_IDENTITY + ['_序号'], how='left')
+
+    # 旧行被删除：历史发生变化
+    if matched['_新行'].isna().any():
+        return None
+
+    old_pos = matched['_旧行'].to_numpy(dtype='int64')
+    new_pos = matched['_新行'].to_numpy(dtype='int64')
+
+    # 同一身份的行：任意一列取值不同即视为被修改
+    same = np.ones(len(old_pos), dtype=bool)
+    for col in new_df.columns:
+        same &= _same_values(
+            old_df[col].iloc[old_pos].reset_index(drop=True),
+            new_df[col].iloc[new_pos].reset_index(drop=True),
+        )
+
+    added = np.setdiff1d(np.arange(len(new_df)), new_pos)
+    changed_old = old_pos[~same]
+    changed_new = new_pos[~same]
+
+    if len(changed_new) + len(added) > max_changed_ratio * max(len(new_df), 1):
+        return None
+
+    return {
+        'old_positions': np.sort(changed_old),
+        'new_positions': np.sort(np.concatenate([changed_new, added])),
+    }
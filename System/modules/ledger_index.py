@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 支票号 / 发票号 查找索引
+# 每个数据版本只建一次：按键排序后，每个支票号（发票号）的明细行占一段连续区间，
+# 用字典记录每个键的区间，查询一个键只需一次字典查找 + 一次切片，不再对整张表做 == 比较
+# ============================================================================
+
+
+def build_key_index(keys, mask=None):
+    """
+    建立 键 → 明细行位置 的索引。
+
+    参数：
+    - keys: 键列（如 付款支票号、发票号），按文本比较；空值不进入索引
+    - mask: 可选的布尔条件（与 keys 对齐），只为满足条件的行建索引
+
+    返回：
+    - index: dict
+      - keys: 所有键（文本，升序），可直接作为下拉选项
+      - ranges: {键: (start, stop)}，该键的明细行位置为 order[start:stop]（升序）
+      - order: 按键排序后的明细行位置
+    """
+    valid = keys.notna().to_numpy()
+    if mask is not None:
+        valid = valid & np.asarray(mask, dtype=bool)
+    positions = np.flatnonzero(valid)
+
+    codes, uniques = pd.factorize(keys.iloc[positions].astype(str), sort=True)
+    order = positions[np.argsort(codes, kind='stable')]
+    stops = np.cumsum(np.bincount(codes, minlength=len(uniques)))
+    starts = stops - np.bincount(codes, minlength=len(uniques))
+
+    uniques = list(uniques)
+    return {
+        'keys': uniques,
+        'ranges': dict(zip(uniques, zip(starts.tolist(), stops.tolist()))),
+        'order': order,
+    }
+
+
+def lookup_rows(index, key):
+    """
+    查找一个键的明细行位置（升序，可直接用于 df.iloc）；键不存在时为空数组。
+    """
+    start, stop = index['ranges'].get(str(key), (0, 0))
+    return index['order'][start:stop]
@@ -0,0 +1,211 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+from modules.calendar_keys import add_calendar_keys
+from modules.cheque_keys import add_cheque_keys
+
+
+# ============================================================================
+# 供应商账本（Xinya_供应商）字段声明
+# 所有模块拿到的 DataFrame 都已经按这里的类型转换完毕，不需要再次 to_datetime / to_numeric
+# ============================================================================
+
+# 系统实际使用的列：读取 Excel / CSV 时只解析这些列，其余列（备注等）直接跳过
+SUPPLIER_COLUMNS = [
+    '部门', '公司名称', '发票号', '发票日期', '发票金额', 'TPS', 'TVQ',
+    '付款支票号', '实际支付金额', '付款支票总额', '开支票日期', '银行对账日期', '银行过账日期',
+    '特殊标记清除',
+]
+
+# 日期列及其声明格式（Google Sheets 导出为 yyyy-mm-dd）
+SUPPLIER_DATE_COLUMNS = {
+    '发票日期': '%Y-%m-%d',
+    '开支票日期': '%Y-%m-%d',
+    '银行对账日期': '%Y-%m-%d',
+}
+
+# 分类列：取值重复度很高，用 category 存储
+SUPPLIER_CATEGORY_COLUMNS = ['部门', '公司名称']
+
+# 可空字符串列：缺失值保持为 <NA>，不再变成字符串 'nan'；安装了 pyarrow 时用 Arrow 存储（见 identifier_string_dtype）
+SUPPLIER_STRING_COLUMNS = ['付款支票号', '发票号']
+
+# 金额列：统一为 float64，并保留到分（两位小数）。
+# 没有改存 int64 分：这些列可为空，可空的 Int64 每个值要 9 字节（float64 为 8 字节），各页面也都按浮点计算金额；
+# 单笔金额四舍五入到分后，在 1e9 以内的合计误差远小于 0.005，显示时 round(2) 即可还原到分。
+# 需要与预算精确比较的地方（付款计划）先换算成整数分再比较
+SUPPLIER_AMOUNT_COLUMNS = ['发票金额', 'TPS', 'TVQ', '实际支付金额', '付款支票总额']
+
+# 特殊标记清除 = 1 时，清空以下付款信息（就像没有记录一样）
+SPECIAL_CLEAR_FLAG = '特殊标记清除'
+SPECIAL_CLEAR_COLUMNS = ['付款支票号', '实际支付金额', '付款支票总额', '开支票日期']
+
+
+def identifier_string_dtype():
+    """
+    支票号 / 发票号 使用的字符串类型：安装了 pyarrow 时使用 Arrow 存储（连续内存，不再每行一个 Python 字符串对象），
+    否则退回 pandas 默认的 string 类型。
+    """
+    if importlib.util.find_spec("pyarrow") is not None:
+        return pd.StringDtype("pyarrow")
+    return pd.StringDtype()
+
+
+def supplier_csv_dtypes():
+    """
+    返回 read_csv 使用的 dtype 映射，让分类列和字符串列在解析时一次到位。
+    日期列先按字符串读入，再按声明格式统一转换。
+    """
+    dtypes = {col: 'category' for col in SUPPLIER_CATEGORY_COLUMNS}
+    dtypes.update({col: identifier_string_dtype() for col in SUPPLIER_STRING_COLUMNS})
+    dtypes.update({col: 'string' for col in SUPPLIER_DATE_COLUMNS})
+    return dtypes
+
+
+def _parse_date_column(series, fmt):
+    # 已经是 datetime（例如来自 Excel / parquet）时不再转换
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    # 先按声明格式快速解析，少数不符合格式的值（如 2025/4/17）再自动识别补救一次
+    parsed = pd.to_datetime(series, format=fmt, errors='coerce')
+    leftover = parsed.isna() & series.notna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(series[leftover], errors='coerce')
+    return parsed
+
+
+def apply_supplier_schema(df):
+    """
+    对任意来源读入的供应商数据执行统一清洗：
+    1. 删除完全为空的行
+    2. 处理 特殊标记清除
+    3. 按声明转换日期、分类、字符串、金额列（已经是目标类型的列直接跳过）
+    4. 为 发票日期 / 开支票日期 生成整数日历键（月键、周键、财年，见 calendar_keys.py）
+    5. 解析 付款支票号，生成 支票数字 / 支票前缀 / 支票类型 / 支票有效（见 cheque_keys.py）
+
+    参数：
+    - df: 原始 DataFrame（CSV / Excel 等读入）
+
+    返回：
+    - df: 字段类型可直接信任的 DataFrame
+    """
+    df = df.dropna(how='all')
+
+    # 确保列是标准数值或文本类型
+    if SPECIAL_CLEAR_FLAG in df.columns:
+        df[SPECIAL_CLEAR_FLAG] = pd.to_numeric(df[SPECIAL_CLEAR_FLAG], errors='coerce')
+
+        # 找出需要清除的行，将这些列设为真正的“未填写”状态（缺失值）
+        mask_clear = df[SPECIAL_CLEAR_FLAG] == 1
+        cols_to_clear = [col for col in SPECIAL_CLEAR_COLUMNS if col in df.columns]
+        df.loc[mask_clear, cols_to_clear] = np.nan
+
+    for col, fmt in SUPPLIER_DATE_COLUMNS.items():
+        if col in df.columns:
+            df[col] = _parse_date_column(df[col], fmt)
+
+    for col in SUPPLIER_CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    string_dtype = identifier_string_dtype()
+    for col in SUPPLIER_STRING_COLUMNS:
+        if col in df.columns and df[col].dtype != string_dtype:
+            # Excel 中纯数字的支票号会被读成 1023.0，这里还原为 "1023"
+            values = df[col]
+            if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+                values = values.astype('Int64')
+            df[col] = values.astype(string_dtype)
+
+    for col in SUPPLIER_AMOUNT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64').round(2)
+
+    df = add_calendar_keys(df)
+    return add_cheque_keys(df)
+
+
+def legacy_supplier_layout(df):
+    """
+    还原旧版加载器的内存布局（仅用于对比）：部门为 object，公司名称 / 付款支票号 / 发票号 为 Python str，
+    缺失值变成字符串 'nan'。
+    """
+    legacy = df.copy()
+    for col in SUPPLIER_CATEGORY_COLUMNS + SUPPLIER_STRING_COLUMNS:
+        if col in legacy.columns:
+            values = legacy[col].astype(object).fillna('nan').map(str).tolist()
+            legacy[col] = pd.Series(values, index=legacy.index, dtype=object)
+    return legacy
+
+
+def supplier_memory_report(df):
+    """
+    对比旧版布局与当前布局下每一列占用的内存（memory_usage(deep=True)，单位：字节）。
+
+    参数：
+    - df: apply_supplier_schema() 清洗后的 DataFrame
+
+    返回：
+    - report: DataFrame，列为 列名 / 旧版字节 / 当前字节 / 节省比例，最后一行为 合计
+    """
+    before = legacy_supplier_layout(df).memory_usage(deep=True, index=False)
+    after = df.memory_usage(deep=True, index=False)
+
+    report = pd.DataFrame({'旧版字节': before, '当前字节': after})
+    report.loc['合计'] = report.sum()
+    report['节省比例'] = (1 - report['当前字节'] / report['旧版字节']).round(3)
+    return report.rename_axis('列名').reset_index()
+
+
+# ============================================================================
+# 现金账（Cash_refund）字段声明
+# ============================================================================
+
+CASH_AMOUNT_COLUMNS = ['总金额', 'TPS', 'TVQ', '支票金额']
+CASH_STRING_COLUMNS = ['支票号', '公司名称']
+
+
+def apply_cash_schema(df_data):
+    """
+    对任意来源读入的现金账数据执行统一清洗（Google Sheets CSV 与本地 Excel 共用）。
+
+    参数：
+    - df_data: 原始 DataFrame
+
+    返回：
+    - df_data: 清洗后的 DataFrame（新增 年月、净值 列）
+    """
+    # ✅ 步骤 1：删除完全为空的行
+    df_data = df_data.dropna(how='all')
+
+    # ✅ 步骤 2：统一日期和金额格式
+    df_data['小票日期'] = pd.to_datetime(df_data['小票日期'], errors='coerce').dt.strftime('%Y-%m-%d')  # 格式化为 yyyy-mm-dd 字符串
+    df_data['开票日期'] = pd.to_datetime(df_data['开票日期'], errors='coerce')  # 保持为 datetime 类型以便后续提取年月
+
+    # 会计核算日期 指 这些现金账 具体放在哪个月份进行处理
+    df_data['会计核算日期'] = pd.to_datetime(df_data['会计核算日期'], errors='coerce')
+
+    # ✅ 保留“会计核算日期”非空的数据
+    df_data = df_data[df_data['会计核算日期'].notna()].copy()
+
+    # ✅ 金额字段转换为浮点并保留两位小数
+    for col in CASH_AMOUNT_COLUMNS:
+        df_data[col] = pd.to_numeric(df_data[col], errors='coerce').round(2)
+
+    # ✅ 步骤 3：添加“年月”列（格式：2025-02）
+    df_data['年月'] = df_data['会计核算日期'].dt.to_period('M').astype(str)
+
+    # ✅ 步骤 4 : 添加 净值 列
+    # 只要其中任意一个值为 NaN，该行计算出的 '净值' 也会是 NaN。 这是因为在 Pandas 中，任何数值与 NaN 参与运算，结果都将是 NaN。
+    # .fillna(0) 在这里只是返回一个临时替换了空值的新 Series，并没有写回原来的 DataFrame， 即不改变原数据库内容。
+    df_data['净值'] = df_data['总金额'] - df_data['TPS'].fillna(0) - df_data['TVQ'].fillna(0)
+
+    # 强制转换为字符串以避免 Streamlit 警告
+    for col in CASH_STRING_COLUMNS:
+        if col in df_data.columns:
+            df_data[col] = df_data[col].astype(str)
+
+    return df_data
@@ -0,0 +1,601 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from modules.aggregate_cube import apply_cube_delta, build_cube
+from modules.business_calendar import business_day_after
+from modules.calendar_keys import add_calendar_keys, with_week_labels
+from modules.company_index import build_company_index
+from modules.data_loader import get_dataset_entry, get_ordered_departments
+from modules.incremental_refresh import diff_rows
+from modules.ledger_index import build_key_index
+from modules.payment_forecast import (
+    FORECAST_WEEKS,
+    SIMULATION_DRAWS,
+    backtest_weeks,
+    build_outflow_forecast,
+    predict_pay_dates,
+    run_backtest,
+    simulate_outflow,
+)
+from modules.payment_run import build_payment_candidates
+from modules.snapshot_cache import SNAPSHOT_VERSION
+
+
+# ============================================================================
+# 派生数据（stage）缓存
+# 由供应商数据推导出的中间表，每个数据版本（源数据内容哈希）只计算一次，所有页面、所有会话共用
+# 返回的 DataFrame 为共享对象，页面只能读取；需要新增/修改列时先筛选或 .copy()
+# ============================================================================
+
+# (stage 名称, 参数) -> (数据版本, 结果, 所依据的明细)；数据版本变化后旧结果自动被替换（能增量更新的先增量更新）
+_stage_cache = {}
+_stage_lock = threading.Lock()
+
+# 派生数据默认依据的供应商数据集：(数据集名称, 数据集分组)，参数同 data_loader.get_dataset_entry；
+# 所有 load_* 函数的 dataset 参数都使用这个格式，单机版传入本地数据集（见 data_loader_单机版.LOCAL_SUPPLIER_DATASET）
+SUPPLIER_DATASET = ("supplier", None)
+
+# 直接用信用卡 VISA-1826 支付的供应商，信用卡支付的不是公司支票账户
+CREDIT_CARD_SUPPLIERS = ['SLEEMAN', 'Arc-en-ciel']
+
+# 自动扣款（公司名称以 * 结尾）的供应商，默认在发票开出后 10 天视为已付款（落在周末、假日时顺延到下一个营业日）
+AUTO_DEBIT_DAYS = 10
+
+# 会计版：不经过公司支票账户的供应商（信用卡支付等），不参与银行对账
+COMPTA_EXCLUDED_SUPPLIERS = ['SLEEMAN', 'Arc-en-ciel', 'Ferme vallee verte']
+
+# 会计版：这些公司的银行过账日期不看原始记录，统一按 开支票日期（没有时为 发票日期 + 10 天，顺延到营业日）计算
+RECONCILE_TARGET_COMPANIES = [
+    'SERVICELAB',
+    'Wah Teng',
+    'Saputo',
+    'Monco',
+    'ALEX COULOMBE',
+    'Canada Bread',
+    'CANADAWIDE FRUIT',
+    'Beaudry & Cadrin Inc',
+    'Bimbo',
+    'IMPERIAL TOBACCO CANADA',
+    'BOULANGERIE BLOUIN',
+    'korsmet'
+]
+
+# 银行对账周期：每月 25 日 ~ 次月 24 日过账的，对账日期统一为次月 1 日
+RECONCILE_CUTOFF_DAY = 25
+
+
+def data_version(dataset=SUPPLIER_DATASET):
+    """
+    返回数据集当前的版本标识（源数据内容哈希 + 快照版本）及对应的数据条目。
+    快照版本不同时，即使源数据没变，清洗后的列布局也可能不同，派生数据同样需要重新计算。
+
+    参数：
+    - dataset: (数据集名称, 数据集分组)，见 SUPPLIER_DATASET
+    """
+    name, datasets = dataset
+    entry = get_dataset_entry(name, datasets)
+    version = (entry["meta"].get("hash") or id(entry["df"]), entry["meta"].get("version", SNAPSHOT_VERSION))
+    return version, entry
+
+
+def cached_stage(stage_key, version, build_func, update_func=None, source=None):
+    """
+    按数据版本缓存派生数据。
+
+    参数：
+    - stage_key: stage 名称及参数组成的元组，如 ("gestion_unpaid", "supplier", True, True)
+    - version: 数据版本（见 data_version）
+    - build_func: 无参数的构建函数，版本变化或首次访问时调用
+    - update_func: 可选的增量更新函数 update_func(previous_source, previous_result)：
+      数据版本变化时先尝试由上一个版本的结果增量更新，返回 None 时退回 build_func 全量重算
+    - source: 本次结果所依据的明细数据，与结果一起保存，供下一个数据版本增量更新时对比
+
+    返回：
+    - result: 构建结果（共享对象，只读）
+    """
+    with _stage_lock:
+        cached = _stage_cache.get(stage_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # 不同会话同时首次访问时可能重复计算一次，结果相同，后写入的覆盖先写入的
+    result = None
+    if update_func is not None and cached is not None and cached[2] is not None:
+        result = update_func(cached[2], cached[1])
+    if result is None:
+        result = build_func()
+    with _stage_lock:
+        _stage_cache[stage_key] = (version, result, source)
+    return result
+
+
+def clear_stages():
+    """
+    清空所有派生数据缓存（一般不需要调用，数据版本变化时会自动重新计算）。
+    """
+    with _stage_lock:
+        _stage_cache.clear()
+
+
+def build_gestion_unpaid(df, current_date, exclude_card_suppliers=True, drop_void=True):
+    """
+    构建管理版应付账款表 df_gestion_unpaid。
+
+    管理版中，应付未付的统计口径是看是否有 开支票日期， 如果存在 开支票日期 ， 则默认已经支付成功了
+    对于 【公司名*】 自动扣款的，这个 开支票日期 就需要自动设置
+    会计版，相对复杂，统计口径以 银行对账单为准
+
+    参数：
+    - df: 清洗后的供应商数据（不会被修改）
+    - current_date: 当前日期（用于判断自动扣款是否已经到期）
+    - exclude_card_suppliers: 是否排除信用卡支付的供应商（CREDIT_CARD_SUPPLIERS）
+    - drop_void: 是否排除 发票金额 = 实际支付金额 = 0 的作废记录
+
+    返回：
+    - df_gestion_unpaid: 新增 应付未付 列的 DataFrame
+    """
+    # 1️⃣ 首先排除出 直接用信用卡VISA-1826 进行支付的，信用卡支付的不是公司支票账户
+    if exclude_card_suppliers:
+        df = df[~df['公司名称'].isin(CREDIT_CARD_SUPPLIERS)]
+
+    # 2️⃣ 过滤掉 “发票金额”和“实际支付金额”两列的 都为0的数据行
+    # 发票金额 = 实际支付金额 = 0， 表示void 取消的的支票，不再纳入我们的统计中
+    # 因为会影响后续 付款账期计算 以及 统计该公司的 发票数量
+    if drop_void:
+        df = df[~((df['发票金额'] == 0) & (df['实际支付金额'] == 0))]
+
+    df_gestion_unpaid = df.copy()
+
+    # 3️⃣ 筛选结尾为 "*" 的公司名，且开支票日期为空的行 ==> 我们要自动处理这些自动扣款的业务
+    # 公司名称为分类列，只需在类别（而不是每一行）上判断是否以 * 结尾
+    companies = df_gestion_unpaid['公司名称']
+    star_companies = companies.cat.categories[companies.cat.categories.astype(str).str.endswith("*")]
+    mask_star_and_pending = companies.isin(star_companies) & df_gestion_unpaid['开支票日期'].isna()
+
+    # 4️⃣ 判断发票日期+10天（顺延到营业日，见 business_calendar.py）是否小于当前日期
+    auto_debit_date = business_day_after(df_gestion_unpaid['发票日期'], AUTO_DEBIT_DAYS)
+    condition_overdue = mask_star_and_pending & (auto_debit_date < current_date)
+
+    # 5️⃣ 对满足条件的行模拟“自动付款”
+    df_gestion_unpaid.loc[condition_overdue, '开支票日期'] = auto_debit_date[condition_overdue]
+    df_gestion_unpaid.loc[condition_overdue, '实际支付金额'] = df_gestion_unpaid.loc[condition_overdue, '发票金额']
+    df_gestion_unpaid.loc[condition_overdue, '付款支票总额'] = df_gestion_unpaid.loc[condition_overdue, '发票金额']
+
+    # 开支票日期有变化时，同步更新 支票月键 / 支票周键 / 支票财年
+    if condition_overdue.any():
+        add_calendar_keys(df_gestion_unpaid, ['开支票日期'])
+
+    # 6️⃣ 新建列【应付未付】
+    df_gestion_unpaid['应付未付'] = df_gestion_unpaid['发票金额'].fillna(0) - df_gestion_unpaid['实际支付金额'].fillna(0)
+
+    return df_gestion_unpaid
+
+
+def load_gestion_unpaid(exclude_card_suppliers=True, drop_void=True, dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的 df_gestion_unpaid（每个数据版本、每天只计算一次，只读）。
+
+    参数：
+    - exclude_card_suppliers / drop_void: 见 build_gestion_unpaid
+      （未付款分析、付款周期使用默认值；公司付款分析两者均为 False）
+    """
+    version, entry = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+
+    return cached_stage(
+        ("gestion_unpaid", dataset[0], exclude_card_suppliers, drop_void),
+        # 自动扣款是否到期取决于当天日期，日期变化后同样重新计算
+        (version, current_date),
+        lambda: build_gestion_unpaid(entry["df"], current_date, exclude_card_suppliers, drop_void),
+    )
+
+
+def load_ledger_cube(axis, exclude_card_suppliers=True, drop_void=True, dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的汇总立方体（部门 × 公司名称 × 月键 × 周键，见 aggregate_cube.py），与 df_gestion_unpaid 同步更新。
+
+    参数：
+    - axis: '发票'（采购分析、未付款分析）或 '支票'（付款分析）
+    - exclude_card_suppliers / drop_void: 见 build_gestion_unpaid，与页面使用的 df_gestion_unpaid 保持一致
+      （发票金额 不受自动扣款模拟影响，采购分析可直接使用两者均为 False 的立方体）
+
+    数据刷新后，只对变化的明细行（见 incremental_refresh.diff_rows）重新汇总并更新受影响的格子；
+    历史数据有变化（删除行等）时全量重算。
+    """
+    version, _ = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+    df_gestion_unpaid = load_gestion_unpaid(exclude_card_suppliers, drop_void, dataset)
+
+    def update(previous_df, previous_cube):
+        diff = diff_rows(previous_df, df_gestion_unpaid)
+        if diff is None:
+            return None
+        return apply_cube_delta(
+            previous_cube,
+            build_cube(previous_df.iloc[diff['old_positions']], axis),
+            build_cube(df_gestion_unpaid.iloc[diff['new_positions']], axis),
+        )
+
+    return cached_stage(
+        ("ledger_cube", dataset[0], axis, exclude_card_suppliers, drop_void),
+        (version, current_date),
+        lambda: build_cube(df_gestion_unpaid, axis),
+        update_func=update,
+        source=df_gestion_unpaid,
+    )
+
+
+# 付款周期统计的分组
+PAYMENT_CYCLE_KEYS = ['部门', '公司名称']
+
+# 付款周期统计中额外给出的分位数：{列名: 分位点}
+PAYMENT_CYCLE_QUANTILES = {'付款天数25分位': 0.25, '付款天数75分位': 0.75, '付款天数90分位': 0.90}
+
+
+def _sorted_group_quantile(sorted_values, starts, counts, q):
+    """
+    在按组排好序的数值上计算每组的分位数（线性插值，与 pandas 的 quantile / median 相同）。
+    第 i 组的数值为 sorted_values[starts[i]:starts[i] + counts[i]]（已升序）。
+    """
+    position = (counts - 1) * q
+    lower = np.floor(position).astype('int64')
+    upper = np.ceil(position).astype('int64')
+    low_values = sorted_values[starts + lower]
+    high_values = sorted_values[starts + upper]
+    return low_values + (high_values - low_values) * (position - lower)
+
+
+def paid_days_by_group(df_gestion_unpaid):
+    """
+    按 部门 + 公司名称 整理历史付款天数（付款天数 = 开支票日期 - 发票日期）：
+    明细按 (组号, 付款天数) 排序后，每组占一段连续区间。付款周期统计和概率预测的抽样都使用它。
+
+    参数：
+    - df_gestion_unpaid: 见 build_gestion_unpaid（只使用 开支票日期、发票日期 都不为空的行）
+
+    返回：
+    - samples: dict
+      - groups: 每组一行的 部门、公司名称（按 groupby 的分组顺序，第 i 行即组号 i）
+      - sorted_days: 排序后的付款天数（int64）
+      - starts / counts: 第 i 组的付款天数为 sorted_days[starts[i]:starts[i] + counts[i]]（升序）
+      - codes / amounts: 每条付款记录的组号和发票金额（空值按 0），与排序前的顺序对应
+    """
+    df_paid_days = df_gestion_unpaid[df_gestion_unpaid['开支票日期'].notna() & df_gestion_unpaid['发票日期'].notna()]
+    paid_days = (df_paid_days['开支票日期'] - df_paid_days['发票日期']).dt.days.to_numpy(dtype='int64')
+
+    # 1️⃣ 组号（按 部门 + 公司名称 的分组顺序），分组列为空的行不参与统计
+    grouped = df_paid_days.groupby(PAYMENT_CYCLE_KEYS, observed=True)
+    groups = grouped.size().index.to_frame(index=False)
+    # 分组列为空的行 ngroup 为 NaN（pandas 3 起结果为 float），先统一为 -1 再筛掉
+    codes = grouped.ngroup().fillna(-1).astype('int64').to_numpy()
+    valid = codes >= 0
+    codes, paid_days = codes[valid], paid_days[valid]
+    amounts = df_paid_days['发票金额'].fillna(0).to_numpy(dtype='float64')[valid]
+
+    # 2️⃣ 按 (组号, 付款天数) 排序，每组占一段连续区间
+    order = np.lexsort((paid_days, codes))
+    counts = np.bincount(codes, minlength=len(groups))
+
+    return {
+        'groups': groups,
+        'sorted_days': paid_days[order],
+        'starts': np.cumsum(counts) - counts,
+        'counts': counts,
+        'codes': codes,
+        'amounts': amounts,
+    }
+
+
+def build_payment_cycle_stats(df_gestion_unpaid):
+    """
+    按 部门 + 公司名称 统计付款周期（付款天数 = 开支票日期 - 发票日期）。
+
+    所有组的全部指标在一次排序后整列计算（见 paid_days_by_group）：每组的付款天数占一段连续区间，
+    最短 / 最长 / 中位数 / 分位数直接按位置取值，合计与平均用 np.add.reduceat / np.bincount 计算。
+
+    参数：
+    - df_gestion_unpaid: 见 build_gestion_unpaid（只统计 开支票日期、发票日期 都不为空的行）
+
+    返回：
+    - result_paid_days: 每个 部门 + 公司名称 一行，列为 发票数量、发票金额、付款天数中位数、
+      最短付款天数、最长付款天数、平均付款天数，以及 PAYMENT_CYCLE_QUANTILES 中的分位数列（均保留两位小数）
+    """
+    samples = paid_days_by_group(df_gestion_unpaid)
+    sorted_days, starts, counts = samples['sorted_days'], samples['starts'], samples['counts']
+    n_groups = len(counts)
+
+    result_paid_days = samples['groups']
+    result_paid_days['发票数量'] = counts
+    result_paid_days['发票金额'] = np.bincount(samples['codes'], weights=samples['amounts'], minlength=n_groups)
+    result_paid_days['付款天数中位数'] = _sorted_group_quantile(sorted_days, starts, counts, 0.5)
+    result_paid_days['最短付款天数'] = sorted_days[starts]
+    result_paid_days['最长付款天数'] = sorted_days[starts + counts - 1]
+    result_paid_days['平均付款天数'] = (
+        np.add.reduceat(sorted_days.astype('float64'), starts) / counts if n_groups else np.array([])
+    )
+    for col, q in PAYMENT_CYCLE_QUANTILES.items():
+        result_paid_days[col] = _sorted_group_quantile(sorted_days, starts, counts, q)
+
+    value_cols = ['发票金额', '付款天数中位数', '最短付款天数', '最长付款天数', '平均付款天数'] + list(PAYMENT_CYCLE_QUANTILES)
+    return result_paid_days.round({col: 2 for col in value_cols})
+
+
+def update_payment_cycle_stats(previous_stats, previous_df, df_gestion_unpaid):
+    """
+    增量更新付款周期统计：只重新统计有明细行变化的 部门 + 公司名称，其余公司沿用上一个版本的结果。
+    中位数等指标不能由变化量直接推出，因此受影响的公司用其全部当前明细重新统计。
+
+    返回：
+    - result_paid_days: 与 build_payment_cycle_stats 相同；历史数据有变化时返回 None（需全量重算）
+    """
+    diff = diff_rows(previous_df, df_gestion_unpaid)
+    if diff is None:
+        return None
+
+    changed = pd.concat([
+        previous_df.iloc[diff['old_positions']][PAYMENT_CYCLE_KEYS].astype(object),
+        df_gestion_unpaid.iloc[diff['new_positions']][PAYMENT_CYCLE_KEYS].astype(object),
+    ]).drop_duplicates()
+    if changed.empty:
+        return previous_stats
+
+    affected = pd.MultiIndex.from_frame(changed)
+    rows_affected = pd.MultiIndex.from_frame(df_gestion_unpaid[PAYMENT_CYCLE_KEYS].astype(object)).isin(affected)
+    stats_affected = pd.MultiIndex.from_frame(previous_stats[PAYMENT_CYCLE_KEYS].astype(object)).isin(affected)
+
+    result_paid_days = pd.concat([
+        previous_stats[~stats_affected].astype({col: object for col in PAYMENT_CYCLE_KEYS}),
+        build_payment_cycle_stats(df_gestion_unpaid[rows_affected]).astype({col: object for col in PAYMENT_CYCLE_KEYS}),
+    ], ignore_index=True)
+
+    # 恢复为当前数据的分类列，并按 groupby 的分组顺序排列，与全量计算的结果一致
+    for col in PAYMENT_CYCLE_KEYS:
+        result_paid_days[col] = pd.Categorical(
+            result_paid_days[col], categories=df_gestion_unpaid[col].cat.categories
+        )
+    return result_paid_days.sort_values(PAYMENT_CYCLE_KEYS, kind='stable').reset_index(drop=True)
+
+
+def load_payment_cycle_stats(dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的付款周期统计（每个数据版本只计算一次，只读；见 build_payment_cycle_stats）。
+    数据刷新后只重新统计有变化的公司（见 update_payment_cycle_stats）。
+    """
+    version, _ = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+    df_gestion_unpaid = load_gestion_unpaid(dataset=dataset)
+
+    return cached_stage(
+        ("payment_cycle_stats", dataset[0]),
+        (version, current_date),
+        lambda: build_payment_cycle_stats(df_gestion_unpaid),
+        update_func=lambda previous_df, previous_stats: update_payment_cycle_stats(
+            previous_stats, previous_df, df_gestion_unpaid
+        ),
+        source=df_gestion_unpaid,
+    )
+
+
+def bank_reconcile_date(posting_dates):
+    """
+    根据银行过账日期计算银行对账日期（整列计算）：
+    - 过账日期在当月 1 ~ 24 日 → 当月 1 日
+    - 过账日期在当月 25 日及以后 → 次月 1 日（如：2024-08-25 ~ 09-24 → 2024-09-01）
+    过账日期为空时结果为 NaT。
+    """
+    posting_dates = pd.to_datetime(posting_dates)
+    # 转为“月”精度的 datetime64 后直接加月数，NaT 保持为 NaT
+    months = posting_dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+    roll = (posting_dates.dt.day >= RECONCILE_CUTOFF_DAY).to_numpy()
+    return pd.Series((months + roll.astype('int64')).astype('datetime64[ns]'), index=posting_dates.index)
+
+
+def build_compta_ledger(df):
+    """
+    构建会计版台账：补全 银行过账日期，并生成规范的 银行对账日期。
+
+    1️⃣ 目标公司（RECONCILE_TARGET_COMPANIES）：银行过账日期 = 开支票日期，没有时 = 发票日期 + 10 天（顺延到营业日）
+    2️⃣ 其余记录中，银行过账日期为空 且 付款支票号以英文字母开头（如 ETF-Alex、VISA-ciel）的：同样规则补全
+    3️⃣ 以上两类记录的银行对账日期按 bank_reconcile_date 归整，其余记录保留原始银行对账日期
+
+    参数：
+    - df: 清洗后的供应商数据（不会被修改）
+
+    返回：
+    - df_compta: 排除 COMPTA_EXCLUDED_SUPPLIERS 后的会计版台账（银行过账日期 为 datetime）
+    """
+    df_compta = df[~df['公司名称'].isin(COMPTA_EXCLUDED_SUPPLIERS)].copy()
+
+    # 银行过账日期可能不在数据源中，或者按文本读入
+    if '银行过账日期' in df_compta.columns:
+        posting = pd.to_datetime(df_compta['银行过账日期'], errors='coerce')
+    else:
+        posting = pd.Series(pd.NaT, index=df_compta.index, dtype='datetime64[ns]')
+
+    # 预先计算规则掩码：目标公司只在分类类别上判断；字母开头的支票号即 支票前缀 非空（加载时已解析，见 cheque_keys.py）
+    mask_target = df_compta['公司名称'].isin(RECONCILE_TARGET_COMPANIES).to_numpy()
+    mask_letter_cheque = df_compta['支票前缀'].notna().to_numpy()
+    mask_letter_cheque_null_posting = ~mask_target & posting.isna().to_numpy() & mask_letter_cheque
+    mask_rule = mask_target | mask_letter_cheque_null_posting
+
+    # 规则内的记录：优先使用开支票日期，否则为发票日期 + 10 天（顺延到营业日）
+    rule_posting = df_compta['开支票日期'].fillna(business_day_after(df_compta['发票日期'], AUTO_DEBIT_DAYS))
+    posting = posting.where(~mask_rule, rule_posting)
+
+    df_compta['银行过账日期'] = posting
+    df_compta['银行对账日期'] = df_compta['银行对账日期'].where(~mask_rule, bank_reconcile_date(posting))
+
+    return df_compta
+
+
+def load_compta_ledger(dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的会计版台账（每个数据版本只计算一次，只读；见 build_compta_ledger）。
+    """
+    version, entry = data_version(dataset)
+    return cached_stage(("compta_ledger", dataset[0]), version, lambda: build_compta_ledger(entry["df"]))
+
+
+def load_company_index(dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的公司名称搜索索引（每个数据版本只建一次，只读；见 company_index.py）。
+    索引中的行位置对应 load_supplier_data() 返回的明细行顺序。
+    """
+    version, entry = data_version(dataset)
+    return cached_stage(("company_index", dataset[0]), version, lambda: build_company_index(entry["df"]))
+
+
+def build_ledger_indexes(df_gestion_unpaid):
+    """
+    为 df_gestion_unpaid 建立支票号、发票号查找索引（见 ledger_index.py）。
+
+    返回：
+    - indexes: {'cheque': 已付款记录（开支票日期、发票日期 都不为空）的 付款支票号 索引,
+                'invoice': 全部记录的 发票号 索引}
+      索引中的行位置对应 df_gestion_unpaid 的行顺序（df_gestion_unpaid.iloc[...]）
+    """
+    paid = df_gestion_unpaid['开支票日期'].notna() & df_gestion_unpaid['发票日期'].notna()
+    return {
+        'cheque': build_key_index(df_gestion_unpaid['付款支票号'], paid),
+        'invoice': build_key_index(df_gestion_unpaid['发票号']),
+    }
+
+
+def load_ledger_indexes(dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的支票号、发票号查找索引（与 load_gestion_unpaid() 同步更新，只读；见 build_ledger_indexes）。
+    """
+    version, _ = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+    df_gestion_unpaid = load_gestion_unpaid(dataset=dataset)
+
+    return cached_stage(
+        ("ledger_indexes", dataset[0]),
+        (version, current_date),
+        lambda: build_ledger_indexes(df_gestion_unpaid),
+    )
+
+
+def load_outflow_forecast(horizon_weeks=FORECAST_WEEKS, dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本、指定预测周数的未来多周付款预测（每个数据版本、每天、每个周数只计算一次，只读；
+    见 payment_forecast.build_outflow_forecast）。
+    """
+    version, _ = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+    df_gestion_unpaid = load_gestion_unpaid(dataset=dataset)
+    result_paid_days = load_payment_cycle_stats(dataset)
+
+    return cached_stage(
+        ("outflow_forecast", dataset[0], horizon_weeks),
+        (version, current_date),
+        lambda: build_outflow_forecast(
+            predict_pay_dates(df_gestion_unpaid, result_paid_days), current_date, horizon_weeks
+        ),
+    )
+
+
+def load_outflow_simulation(horizon_weeks=FORECAST_WEEKS, n_draws=SIMULATION_DRAWS, dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的蒙特卡洛付款预测区间（每个数据版本、每天、每组参数只模拟一次，只读；
+    见 payment_forecast.simulate_outflow）。
+    """
+    version, _ = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+    df_gestion_unpaid = load_gestion_unpaid(dataset=dataset)
+    result_paid_days = load_payment_cycle_stats(dataset)
+
+    return cached_stage(
+        ("outflow_simulation", dataset[0], horizon_weeks, n_draws),
+        (version, current_date),
+        lambda: simulate_outflow(
+            predict_pay_dates(df_gestion_unpaid, result_paid_days),
+            paid_days_by_group(df_gestion_unpaid),
+            current_date,
+            horizon_weeks,
+            n_draws,
+        ),
+    )
+
+
+def update_forecast_backtest(previous_weekly, previous_df, df_gestion_unpaid, weeks):
+    """
+    增量更新预测回测：周一 W 的回测只用到发票日期在 W 之前的明细，
+    因此不晚于所有变化明细（新旧两版）最早发票日期的周沿用上一个版本的结果，只重新回测之后的周。
+
+    返回：
+    - weekly: 与 payment_forecast.run_backtest 相同；历史数据有变化时返回 None（需全量重算）
+    """
+    diff = diff_rows(previous_df, df_gestion_unpaid)
+    if diff is None:
+        return None
+
+    changed_dates = pd.concat([
+        previous_df['发票日期'].iloc[diff['old_positions']],
+        df_gestion_unpaid['发票日期'].iloc[diff['new_positions']],
+    ])
+    earliest = changed_dates.min()
+    week_keys = (weeks.year * 10000 + weeks.month * 100 + weeks.day).to_numpy(dtype='int64')
+
+    # 1️⃣ 可以沿用的周：仍在回测范围内，且周一不晚于最早变化的发票日期
+    reusable = week_keys if pd.isna(earliest) else week_keys[weeks <= earliest]
+    kept = previous_weekly[previous_weekly['回测周键'].isin(reusable)]
+    missing_weeks = weeks[~np.isin(week_keys, kept['回测周键'].unique())]
+
+    # 2️⃣ 只回测其余的周，合并后补齐新出现部门在旧周中的行（金额为 0），与全量计算的结果一致
+    parts = [kept]
+    if len(missing_weeks):
+        parts.append(run_backtest(df_gestion_unpaid, missing_weeks))
+    weekly = pd.concat(parts, ignore_index=True)
+    dated = df_gestion_unpaid[df_gestion_unpaid['发票日期'].notna()]
+    departments = sorted(set(dated['部门'].dropna().astype(object)))
+    full_index = pd.MultiIndex.from_product([week_keys, departments], names=['回测周键', '部门'])
+    value_cols = ['预测金额', '实际金额', '命中金额', '误差']
+    weekly = weekly.set_index(['回测周键', '部门'])[value_cols].reindex(full_index, fill_value=0.0)
+    return with_week_labels(weekly.reset_index(), '回测周键')
+
+
+def load_forecast_backtest(dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的付款预测回测结果（每个数据版本、每天只计算一次，只读；见 payment_forecast.run_backtest）。
+    数据刷新或进入新的一周时，只重新回测受影响的周（见 update_forecast_backtest）。
+    """
+    version, _ = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+    df_gestion_unpaid = load_gestion_unpaid(dataset=dataset)
+    weeks = backtest_weeks(df_gestion_unpaid, current_date)
+
+    return cached_stage(
+        ("forecast_backtest", dataset[0]),
+        (version, current_date),
+        lambda: run_backtest(df_gestion_unpaid, weeks),
+        update_func=lambda previous_df, previous_weekly: update_forecast_backtest(
+            previous_weekly, previous_df, df_gestion_unpaid, weeks
+        ),
+        source=df_gestion_unpaid,
+    )
+
+
+def load_payment_candidates(dataset=SUPPLIER_DATASET):
+    """
+    返回当前数据版本的付款计划候选发票及优先分（每个数据版本、每天只计算一次，只读；
+    见 payment_run.build_payment_candidates）。页面调整预算时只需在此结果上重新选择。
+    """
+    version, _ = data_version(dataset)
+    current_date = pd.to_datetime(datetime.today().date())
+    df_gestion_unpaid = load_gestion_unpaid(dataset=dataset)
+    result_paid_days = load_payment_cycle_stats(dataset)
+
+    return cached_stage(
+        ("payment_candidates", dataset[0]),
+        (version, current_date),
+        lambda: build_payment_candidates(
+            predict_pay_dates(df_gestion_unpaid, result_paid_days),
+            result_paid_days,
+            current_date,
+            get_ordered_departments(df_gestion_unpaid)[0],
+        ),
+    )
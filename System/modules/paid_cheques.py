@@ -3,6 +3,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from io import BytesIO
 from modules.data_loader import load_supplier_data
+from modules.calendar_keys import month_keys, month_label, with_month_label, with_week_labels
+from modules.hover_text import format_amount, format_ratio, hover_text, month_title
+from modules.report_tables import build_subtotal_report, row_type_styles
+from modules.cheque_keys import cheque_sort_value
 
 # ✅ 加载中文字体以防止图表中出现乱码
 from fonts.fonts import load_chinese_font
@@ -37,7 +41,7 @@ def paid_cheques_query():
 
     # --- 构建“各部门付款汇总”表格 ---
     summary_table = (
-        filtered.groupby('部门')[['实际支付金额', 'TPS', 'TVQ']]
+        filtered.groupby('部门', observed=True)[['实际支付金额', 'TPS', 'TVQ']]
         .sum()
         .reset_index()
     )
@@ -74,55 +78,34 @@ def paid_cheques_query():
     )
 
     # --- 构建“付款支票信息”详情表格 ---
+    # 纸质支票（纯数字）按支票号数值在前，其他支票号在后（支票数字 / 支票类型 在加载时已解析，见 cheque_keys.py）
     def sort_cheques(df_sub):
-        df_sub = df_sub.copy()
-        df_sub['支票分类'] = df_sub['付款支票号'].apply(lambda x: 0 if x.isnumeric() else 1)
-        df_sub['支票排序值'] = df_sub['付款支票号'].apply(lambda x: int(x) if x.isnumeric() else float('inf'))
-        return df_sub.sort_values(by=['支票分类', '支票排序值'])
+        return (
+            df_sub.assign(支票排序值=cheque_sort_value(df_sub))
+            .sort_values(by='支票排序值', kind='stable', na_position='last')
+        )
 
     summary_raw = (
-        filtered.groupby(['部门', '付款支票号', '公司名称'])
+        filtered.groupby(['部门', '付款支票号', '公司名称'], observed=True)
         .agg({
             '发票号': lambda x: ",".join(x.dropna().unique()),
             '开支票日期': 'first',
             '实际支付金额': 'sum',
             'TPS': 'sum',
-            'TVQ': 'sum'
+            'TVQ': 'sum',
+            '支票数字': 'first',
+            '支票类型': 'first',
         })
         .reset_index()
     )
 
     summary = sort_cheques(summary_raw)
 
-    final = pd.DataFrame()
-    for dept, df_dept in summary.groupby('部门'):
-        final = pd.concat([final, df_dept])
-        subtotal = df_dept[['实际支付金额', 'TPS', 'TVQ']].sum().to_frame().T
-        subtotal['部门'] = f"{dept} 汇总"
-        subtotal['付款支票号'] = ''
-        subtotal['公司名称'] = ''
-        subtotal['发票号'] = ''
-        subtotal['开支票日期'] = ''
-        final = pd.concat([final, subtotal], ignore_index=True)
-
-    total = summary[['实际支付金额', 'TPS', 'TVQ']].sum().to_frame().T
-    total['部门'] = '总计'
-    total['付款支票号'] = ''
-    total['公司名称'] = ''
-    total['发票号'] = ''
-    total['开支票日期'] = ''
-    final = pd.concat([final, total], ignore_index=True)
-
-    final = final[['部门', '付款支票号', '公司名称', '发票号','开支票日期', '实际支付金额', 'TPS', 'TVQ']]
-
-    # 着色：小计和总计行
-    def highlight_summary(row):
-        if isinstance(row['部门'], str):
-            if row['部门'].endswith("汇总"):
-                return ['background-color: #E8F6F3'] * len(row)
-            elif row['部门'] == '总计':
-                return ['background-color: #FADBD8'] * len(row)
-        return [''] * len(row)
+    # 明细 + 部门小计 + 总计（部门内保持上面的支票排序）；小计 / 总计行的文字列为空
+    final, row_type = build_subtotal_report(
+        summary[['部门', '付款支票号', '公司名称', '发票号','开支票日期', '实际支付金额', 'TPS', 'TVQ']],
+        '部门', ['实际支付金额', 'TPS', 'TVQ'],
+    )
 
     # --- 展示“付款支票信息”详细表格 ---
     st.markdown("### 📝 XINYA超市 *付款支票* 信息明细")
@@ -134,7 +117,7 @@ def paid_cheques_query():
     
     st.dataframe(
         final.style
-        .apply(highlight_summary, axis=1)
+        .apply(row_type_styles, row_type=row_type, axis=None)  # 着色：小计和总计行
         .format({
             '实际支付金额': "{:,.2f}",
             'TPS': "{:,.2f}",
@@ -155,21 +138,19 @@ def paid_cheques_query():
     # 1. 读取数据
     df_paid_cheques = load_supplier_data()
 
-    # 2. 数据清理
-    df_paid_cheques['实际支付金额'] = pd.to_numeric(df_paid_cheques['实际支付金额'], errors='coerce')
-    df_paid_cheques['开支票日期'] = pd.to_datetime(df_paid_cheques['开支票日期'], errors='coerce')
+    # 2. 数据清理（实际支付金额、开支票日期在加载时已完成类型转换）
     df_paid_cheques = df_paid_cheques.dropna(subset=['开支票日期', '实际支付金额'])
 
     # 3. 去重
     #df_paid_cheques = df_paid_cheques.drop_duplicates(subset=['付款支票号', '实际支付金额', '开支票日期'])
 
     # 4. 过滤有效数据
-    paid_df = df_paid_cheques[df_paid_cheques['实际支付金额'].notna()]
+    paid_df = df_paid_cheques[df_paid_cheques['实际支付金额'].notna()].copy()
 
-    # 5. 按开支票日期的月份汇总
-    paid_df['月份'] = pd.to_datetime(paid_df['开支票日期']).dt.to_period('M').astype(str)
-    paid_summary = paid_df.groupby(['部门', '月份'])['实际支付金额'].sum().reset_index()
-    monthly_totals = paid_df.groupby('月份')['实际支付金额'].sum().reset_index()
+    # 5. 按开支票日期的月份汇总（支票月键在加载时已生成，月份文本只在汇总结果上查表生成）
+    paid_summary = paid_df.groupby(['部门', '支票月键'], observed=True)['实际支付金额'].sum().reset_index()
+    paid_summary = with_month_label(paid_summary, '支票月键')
+    monthly_totals = with_month_label(paid_df.groupby('支票月键')['实际支付金额'].sum().reset_index(), '支票月键')
     monthly_totals_dict = monthly_totals.set_index('月份')['实际支付金额'].to_dict()
 
     # 7. 生成部门颜色映射
@@ -179,16 +160,13 @@ def paid_cheques_query():
 
     # 8. 添加提示信息
     paid_summary['总支付金额'] = paid_summary['月份'].map(monthly_totals_dict)
-    paid_summary['提示信息'] = paid_summary.apply(
-        lambda row: f"🔹 {row['月份'][:4]}年{row['月份'][5:]}月 <br>" 
-                    f"支付总金额：{monthly_totals_dict[row['月份']]:,.0f}<br>"
-
-                    f"<br>"
-
-                    f"部门：{row['部门']}<br>"
-                    f"付款金额：{row['实际支付金额']:,.0f}<br>"
-                    f"占比：{row['实际支付金额'] / monthly_totals_dict.get(row['月份'], 1):.1%}",
-        axis=1
+    paid_summary['提示信息'] = hover_text(
+        "🔹 " + month_title(paid_summary['月份']) + " ",
+        "支付总金额：" + format_amount(paid_summary['总支付金额']),
+        "",
+        "部门：" + paid_summary['部门'].astype(str),
+        "付款金额：" + format_amount(paid_summary['实际支付金额']),
+        "占比：" + format_ratio(paid_summary['实际支付金额'], paid_summary['总支付金额']),
     )
     
 
@@ -221,46 +199,30 @@ def paid_cheques_query():
 
     # 11. 周度分析（可选）
     # 1. 提供月份选择，确保用户可以选择要分析的月份
-    valid_months = sorted(paid_df['月份'].unique())  # 获取所有可用的月份并排序
-    selected_month = st.selectbox("🔎选择查看具体周数据的月份", valid_months, index=len(valid_months) - 1)
-
-    # 2. 计算每个交易日期对应的周范围
-    # - '周开始': 当前日期所在周的星期一
-    # - '周结束': 当前日期所在周的星期日
-    paid_df['周开始'] = paid_df['开支票日期'] - pd.to_timedelta(paid_df['开支票日期'].dt.weekday, unit='D')
-    paid_df['周结束'] = paid_df['周开始'] + timedelta(days=6)
-
-    # 3. 生成 '周范围' 列，格式为 "YYYY-MM-DD ~ YYYY-MM-DD"
-    paid_df['周范围'] = paid_df['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + paid_df['周结束'].dt.strftime('%Y-%m-%d')
-
-    # 4. 过滤出所选月份的数据
-    # - 根据 '月份' 筛选数据，确保只显示用户选择的月份
-    weekly_summary_filtered = paid_df[paid_df['月份'] == selected_month].groupby(
-        ['部门', '周范围', '周开始', '周结束']
-    )['实际支付金额'].sum().reset_index()
+    valid_months = month_keys(paid_df['支票月键'])  # 获取所有可用的月份并排序
+    selected_month_key = st.selectbox("🔎选择查看具体周数据的月份", valid_months, index=len(valid_months) - 1, format_func=month_label)
+    selected_month = month_label(selected_month_key)
 
-    # 5. 确保 '周开始' 是 datetime 类型，并进行排序
-    # - 确保数据按时间顺序显示，而不是字符串顺序
-    weekly_summary_filtered['周开始'] = pd.to_datetime(weekly_summary_filtered['周开始'])
-    weekly_summary_filtered = weekly_summary_filtered.sort_values(by='周开始').reset_index(drop=True)
+    # 2. 过滤出所选月份的数据，按 部门 + 支票周键（所在周周一的 yyyymmdd 整数）汇总
+    weekly_summary_filtered = paid_df[paid_df['支票月键'] == selected_month_key].groupby(
+        ['部门', '支票周键'], observed=True
+    )['实际支付金额'].sum().reset_index()
 
-    # 6. 重新生成 '周范围' 确保顺序正确
-    # - 在 '周开始' 排序后重新生成 '周范围'，避免时间错乱
-    weekly_summary_filtered['周范围'] = weekly_summary_filtered['周开始'].dt.strftime('%Y-%m-%d') + ' ~ ' + weekly_summary_filtered['周结束'].dt.strftime('%Y-%m-%d')
+    # 3. 周键的大小顺序即时间顺序，排序后查表生成 '周开始' / '周结束' / '周范围'（"YYYY-MM-DD ~ YYYY-MM-DD"）
+    weekly_summary_filtered = weekly_summary_filtered.sort_values(by='支票周键').reset_index(drop=True)
+    weekly_summary_filtered = with_week_labels(weekly_summary_filtered, '支票周键')
 
     # 7. 计算每个周的总支付金额
     # - 用于在 hover 提示信息中显示每个周的总金额
-    weekly_totals = weekly_summary_filtered.groupby('周范围')['实际支付金额'].sum().reset_index()
-    weekly_totals_dict = weekly_totals.set_index('周范围')['实际支付金额'].to_dict()
+    weekly_totals = weekly_summary_filtered.groupby('支票周键')['实际支付金额'].transform('sum')
 
     # 8. 添加提示信息
-    # - 为每一行添加提示信息，包括部门名称和实际支付金额
-    weekly_summary_filtered['提示信息'] = weekly_summary_filtered.apply(
-        lambda row: f"所选周总支付金额：{weekly_totals_dict[row['周范围']]:,.0f}<br>"
-                    f"部门：{row['部门']}<br>"
-                    f"实际付款金额：{row['实际支付金额']:,.0f}<br>"
-                    f"占比：{row['实际支付金额'] / weekly_totals_dict.get(row['周范围'], 1):.1%}",
-        axis=1
+    # - 为每一行添加提示信息，包括部门名称和实际支付金额（整列生成，见 hover_text.py）
+    weekly_summary_filtered['提示信息'] = hover_text(
+        "所选周总支付金额：" + format_amount(weekly_totals),
+        "部门：" + weekly_summary_filtered['部门'].astype(str),
+        "实际付款金额：" + format_amount(weekly_summary_filtered['实际支付金额']),
+        "占比：" + format_ratio(weekly_summary_filtered['实际支付金额'], weekly_totals),
     )
 
     # 9. 绘制折线图
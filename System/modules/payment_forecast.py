@@ -0,0 +1,425 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.business_calendar import business_day_after, rolled_day_offsets
+from modules.calendar_keys import with_week_labels
+
+
+# ============================================================================
+# 付款预测（未来多周现金流出）
+# 预计付款日 = 发票日期 + 该 部门 + 公司 的付款天数中位数，落在周末、假日时顺延到下一个营业日（见 business_calendar.py）；
+# 所有未付发票一次性按预计付款日分到未来 N 周（逾期未付的计入本周），得到 周 × 部门 的付款矩阵
+# ============================================================================
+
+# 默认预测周数
+FORECAST_WEEKS = 12
+
+
+def predict_pay_dates(df_gestion_unpaid, result_paid_days):
+    """
+    为所有未付发票计算预计付款日。
+
+    参数：
+    - df_gestion_unpaid: 见 ledger_stages.build_gestion_unpaid（不会被修改）
+    - result_paid_days: 付款周期统计（见 ledger_stages.build_payment_cycle_stats）
+
+    返回：
+    - df_forecast: 应付未付不为 0 的行，新增 付款天数中位数、预计付款日 两列
+      （预计付款日为营业日，不含时间；没有付款历史的公司，预计付款日为 NaT）
+    """
+    # 1️⃣ 筛选应付未付不为0的数据（筛选结果为新的 DataFrame，不会修改共享的 df_gestion_unpaid）
+    df_forecast = df_gestion_unpaid[df_gestion_unpaid['应付未付'].fillna(0) != 0]
+
+    # 2️⃣ 合并历史付款中位数数据（按 部门 + 公司名称）
+    df_forecast = df_forecast.merge(
+        result_paid_days[['部门', '公司名称', '付款天数中位数']],
+        on=['部门', '公司名称'],
+        how='left'
+    )
+
+    # 3️⃣ 计算预计付款日 = 发票日期 + 中位付款天数，周末、假日不开支票，顺延到下一个营业日
+    df_forecast['预计付款日'] = business_day_after(df_forecast['发票日期'], df_forecast['付款天数中位数'])
+    return df_forecast
+
+
+def week_start_of(today):
+    """
+    today 所在自然周的周一（Timestamp，不含时间）。
+    """
+    today = pd.Timestamp(today).normalize()
+    return today - pd.Timedelta(days=today.weekday())
+
+
+def forecast_week_offsets(pay_dates, today):
+    """
+    预计付款日 → 距本周的周序号（整列计算）：0 = 本周（含已逾期的），1 = 下周 …；预计付款日为空时为 -1。
+    """
+    days = (pd.to_datetime(pay_dates) - week_start_of(today)).dt.days
+    offsets = np.floor_divide(days.to_numpy(dtype='float64', na_value=np.nan), 7)
+    offsets = np.where(np.isnan(offsets), -1, np.maximum(offsets, 0))
+    return offsets.astype('int64')
+
+
+def week_keys_from_offsets(today, horizon_weeks):
+    """
+    未来 horizon_weeks 周的周键（周一 yyyymmdd 整数，与 calendar_keys 的周键相同）。
+    """
+    starts = week_start_of(today) + pd.to_timedelta(np.arange(horizon_weeks) * 7, unit='D')
+    return (starts.year * 10000 + starts.month * 100 + starts.day).to_numpy(dtype='int64')
+
+
+def build_outflow_forecast(df_forecast, today, horizon_weeks=FORECAST_WEEKS):
+    """
+    将未付发票按预计付款日分到未来 horizon_weeks 周，汇总应付未付金额。
+
+    参数：
+    - df_forecast: predict_pay_dates 的结果
+    - today: 当前日期（本周 = today 所在的周一 ~ 周日）
+    - horizon_weeks: 预测周数
+
+    返回：
+    - forecast: dict
+      - matrix: 周 × 部门 的付款矩阵（索引为 预测周键，列为部门，没有付款的为 0）
+      - detail: 每周每个 部门 + 公司名称 一行（预测周键、部门、公司名称、应付未付，及 周开始 / 周结束 / 周范围）
+    """
+    offsets = forecast_week_offsets(df_forecast['预计付款日'], today)
+    in_horizon = (offsets >= 0) & (offsets < horizon_weeks)
+    week_keys = week_keys_from_offsets(today, horizon_weeks)
+
+    rows = df_forecast[in_horizon]
+    week_offsets = offsets[in_horizon]
+    amounts = rows['应付未付'].fillna(0).to_numpy(dtype='float64')
+
+    # 1️⃣ 周 × 部门 矩阵：组合编码后一次 bincount
+    dept_codes, departments = pd.factorize(rows['部门'], sort=True)
+    has_dept = dept_codes >= 0
+    n_depts = len(departments)
+    cells = np.bincount(
+        week_offsets[has_dept] * n_depts + dept_codes[has_dept],
+        weights=amounts[has_dept],
+        minlength=horizon_weeks * n_depts,
+    )
+    matrix = pd.DataFrame(
+        cells.reshape(horizon_weeks, n_depts),
+        index=pd.Index(week_keys, name='预测周键'),
+        columns=pd.Index(np.asarray(departments, dtype=object), name='部门'),
+    )
+
+    # 2️⃣ 每周 部门 + 公司 明细
+    detail = (
+        rows.assign(预测周键=week_keys[week_offsets])
+        .groupby(['预测周键', '部门', '公司名称'], observed=True)['应付未付']
+        .sum()
+        .reset_index()
+    )
+    detail = with_week_labels(detail, '预测周键')
+
+    return {'matrix': matrix, 'detail': detail}
+
+
+# ============================================================================
+# 概率预测（蒙特卡洛）
+# 每张未付发票的付款天数从该 部门 + 公司 的历史付款天数中有放回地随机抽取，
+# 所有发票 × 多次模拟一次性用 NumPy 整块计算，得到每周付款总额的 p10 / p50 / p90 区间
+# ============================================================================
+
+# 默认模拟次数
+SIMULATION_DRAWS = 2000
+
+# 每块模拟的元素上限（模拟次数 × 发票数），控制单块内存；分块方式只取决于发票数，与是否使用进程池无关
+SIMULATION_BLOCK_SIZE = 2_000_000
+
+# 模拟使用的进程数：None = 在当前进程计算（Streamlit 服务器上默认如此）；需要更快时可设为 CPU 核数
+SIMULATION_WORKERS = None
+
+# 输出的分位数：{列名: 百分位}
+SIMULATION_BANDS = {'p10': 10, 'p50': 50, 'p90': 90}
+
+
+def _simulate_block(seed, n_draws, base_days, amounts, starts, counts, sorted_days, horizon_weeks,
+                    roll_table, roll_first):
+    """
+    模拟一块（n_draws 次）：返回 n_draws × horizon_weeks 的每周付款总额。
+    付款日按 roll_table 查表顺延到营业日（见 business_calendar.rolled_day_offsets）。
+    放在模块顶层，便于进程池调用。
+    """
+    rng = np.random.default_rng(seed)
+    n_invoices = len(base_days)
+
+    # 每张发票在其所属组的付款天数区间内随机取一个位置（有放回抽样）
+    picks = starts + np.floor(rng.random((n_draws, n_invoices)) * counts).astype('int64')
+    pay_days = roll_table[base_days + sorted_days[picks] - roll_first]
+
+    # 距本周周一的天数 → 周序号（逾期的计入本周），超出预测范围的不计
+    offsets = np.maximum(np.floor_divide(pay_days, 7), 0)
+    in_horizon = offsets < horizon_weeks
+    draw_index = np.broadcast_to(np.arange(n_draws)[:, None], offsets.shape)
+
+    totals = np.bincount(
+        (draw_index * horizon_weeks + offsets)[in_horizon],
+        weights=np.broadcast_to(amounts, offsets.shape)[in_horizon],
+        minlength=n_draws * horizon_weeks,
+    )
+    return totals.reshape(n_draws, horizon_weeks)
+
+
+def simulate_outflow(df_forecast, samples, today, horizon_weeks=FORECAST_WEEKS,
+                     n_draws=SIMULATION_DRAWS, seed=0, workers=SIMULATION_WORKERS):
+    """
+    蒙特卡洛付款预测：按各 部门 + 公司 的历史付款天数分布模拟未付发票的付款日期。
+
+    参数：
+    - df_forecast: predict_pay_dates 的结果（使用 发票日期、部门、公司名称、应付未付）
+    - samples: 历史付款天数（见 ledger_stages.paid_days_by_group）
+    - today: 当前日期（本周 = today 所在的周一 ~ 周日）
+    - horizon_weeks: 预测周数
+    - n_draws: 模拟次数
+    - seed: 随机种子（相同的数据和种子结果相同，与 workers 无关）
+    - workers: 进程数；None 或 1 时在当前进程计算，大于 1 时各块分配到进程池并行计算
+
+    返回：
+    - bands: 每周一行，列为 预测周键、p10 / p50 / p90（每周付款总额的分位数）、平均，
+      以及 周开始 / 周结束 / 周范围；没有付款历史的公司的发票不参与模拟
+    """
+    # 1️⃣ 发票 → 所属组（没有付款历史或没有发票日期的发票不参与模拟）
+    groups = samples['groups'].assign(_组号=np.arange(len(samples['groups'])))
+    invoices = df_forecast.merge(groups, on=['部门', '公司名称'], how='inner')
+    invoices = invoices[invoices['发票日期'].notna()]
+
+    group_codes = invoices['_组号'].to_numpy(dtype='int64')
+    base_days = (invoices['发票日期'] - week_start_of(today)).dt.days.to_numpy(dtype='int64')
+    amounts = invoices['应付未付'].fillna(0).to_numpy(dtype='float64')
+    starts = samples['starts'][group_codes]
+    counts = samples['counts'][group_codes]
+
+    # 模拟出的付款日（距本周周一的天数）顺延到营业日：按可能的天数范围预先建查找表
+    sorted_days = samples['sorted_days']
+    roll_first = int(base_days.min() + sorted_days.min()) if len(base_days) else 0
+    roll_last = int(base_days.max() + sorted_days.max()) if len(base_days) else 0
+    roll_table = rolled_day_offsets(week_start_of(today), roll_first, roll_last)
+
+    # 2️⃣ 分块：每块的模拟次数由发票数决定，每块使用独立的随机种子
+    block_draws = max(1, SIMULATION_BLOCK_SIZE // max(len(group_codes), 1))
+    block_sizes = [min(block_draws, n_draws - start) for start in range(0, n_draws, block_draws)]
+    block_seeds = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    block_args = [
+        (block_seed, size, base_days, amounts, starts, counts, sorted_days, horizon_weeks, roll_table, roll_first)
+        for block_seed, size in zip(block_seeds, block_sizes)
+    ]
+
+    if workers and workers > 1 and len(block_args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            blocks = list(pool.map(_simulate_block, *zip(*block_args)))
+    else:
+        blocks = [_simulate_block(*args) for args in block_args]
+    totals = np.vstack(blocks) if blocks else np.zeros((0, horizon_weeks))
+
+    # 3️⃣ 每周付款总额的分位数区间
+    bands = pd.DataFrame({'预测周键': week_keys_from_offsets(today, horizon_weeks)})
+    for col, percentile in SIMULATION_BANDS.items():
+        bands[col] = np.percentile(totals, percentile, axis=0) if len(totals) else 0.0
+    bands['平均'] = totals.mean(axis=0) if len(totals) else 0.0
+    return with_week_labels(bands, '预测周键')
+
+
+# ============================================================================
+# 预测回测
+# 回到过去每一周的周一 W：只用 W 之前已开支票的记录统计各 部门 + 公司 的付款天数中位数，
+# 预测当时所有未付发票中哪些会在 W 这一周付款（已逾期的计入本周，与 build_outflow_forecast 相同），
+# 再与实际 开支票日期 落在 [W, W + 7) 的发票比较，得到每周每个部门的预测误差
+# ============================================================================
+
+# 回测从最早发票所在周之后第几周开始（太早的周没有足够的付款历史）
+BACKTEST_WARMUP_WEEKS = 8
+
+# 每块连续回测的周数：块内逐周增量更新中位数，各块之间相互独立，可以并行
+BACKTEST_CHUNK_WEEKS = 26
+
+# 回测使用的进程数：None = 在当前进程计算；需要更快时可设为 CPU 核数
+BACKTEST_WORKERS = None
+
+# 没有开支票日期的记录，付款日按“永远未付”处理
+_NEVER_PAID = np.iinfo('int64').max
+
+
+def backtest_weeks(df_gestion_unpaid, today):
+    """
+    可回测的周（每周的周一）：从最早发票日期所在周之后 BACKTEST_WARMUP_WEEKS 周开始，
+    到 today 的上一周为止（只回测已经完整结束的周）。
+    """
+    first_invoice = df_gestion_unpaid['发票日期'].min()
+    if pd.isna(first_invoice):
+        return pd.DatetimeIndex([])
+    start = week_start_of(first_invoice) + pd.Timedelta(weeks=BACKTEST_WARMUP_WEEKS)
+    end = week_start_of(today) - pd.Timedelta(weeks=1)
+    return pd.date_range(start, end, freq='7D')
+
+
+def _to_day_numbers(dates, missing):
+    """
+    日期列 → 距 1970-01-01 的天数（int64），空值为 missing。
+    """
+    numbers = (pd.to_datetime(dates).dt.floor('D') - pd.Timestamp('1970-01-01')).dt.days
+    return np.where(numbers.isna().to_numpy(), missing, numbers.fillna(0).to_numpy(dtype='int64'))
+
+
+def _backtest_chunk(week_days, invoice_days, pay_days, group_codes, dept_codes, amounts, n_groups, n_depts,
+                    roll_table, roll_first):
+    """
+    连续回测一块周（week_days 为各周周一的天数，升序）。
+    预计付款日与 predict_pay_dates 相同，按 roll_table 查表顺延到营业日。
+    放在模块顶层，便于进程池调用。
+
+    返回：
+    - (predicted, actual, hit): 三个 周数 × 部门数 的金额矩阵
+      （预测在该周付款的金额、实际在该周付款的金额、预测且实际在该周付款的金额）
+    """
+    n_weeks = len(week_days)
+    predicted = np.zeros((n_weeks, n_depts))
+    actual = np.zeros((n_weeks, n_depts))
+    hit = np.zeros((n_weeks, n_depts))
+
+    # 1️⃣ 已付记录按 (组号, 开支票日期) 排序：任意一周 W，每组在 W 之前的付款记录正好是该组区间的前缀
+    paid = np.flatnonzero((pay_days != _NEVER_PAID) & (group_codes >= 0))
+    by_group = paid[np.lexsort((pay_days[paid], group_codes[paid]))]
+    group_sorted = group_codes[by_group]
+    pay_sorted = pay_days[by_group]
+    delay_sorted = (pay_days - invoice_days)[by_group]
+    group_starts = np.searchsorted(group_sorted, np.arange(n_groups), side='left')
+    group_stops = np.searchsorted(group_sorted, np.arange(n_groups), side='right')
+
+    # 按开支票日期排序，用于找出两周之间有新付款记录的组
+    by_pay = paid[np.argsort(pay_days[paid], kind='stable')]
+    by_pay_days = pay_days[by_pay]
+
+    # 各组当前的付款天数中位数（末尾多一个 NaN，组号为 -1 的发票取到它）
+    medians = np.full(n_groups + 1, np.nan)
+    has_dept = dept_codes >= 0
+    known_until = 0
+
+    for i, week in enumerate(week_days):
+        # 2️⃣ 增量更新：只重新计算上一周以来有新付款记录的组
+        new_until = np.searchsorted(by_pay_days, week, side='left')
+        for group in np.unique(group_codes[by_pay[known_until:new_until]]):
+            start = group_starts[group]
+            stop = start + np.searchsorted(pay_sorted[start:group_stops[group]], week, side='left')
+            medians[group] = np.median(delay_sorted[start:stop])
+        known_until = new_until
+
+        # 3️⃣ W 时点的未付发票：发票日期在 W 之前，且当时还没有开支票
+        open_now = (invoice_days < week) & (pay_days >= week) & has_dept
+        expected = np.floor(invoice_days + medians[group_codes])
+        known = ~np.isnan(expected)
+        expected[known] = roll_table[expected[known].astype('int64') - roll_first]
+        will_pay = open_now & (expected < week + 7)
+        did_pay = open_now & (pay_days < week + 7)
+
+        predicted[i] = np.bincount(dept_codes[will_pay], weights=amounts[will_pay], minlength=n_depts)
+        actual[i] = np.bincount(dept_codes[did_pay], weights=amounts[did_pay], minlength=n_depts)
+        both = will_pay & did_pay
+        hit[i] = np.bincount(dept_codes[both], weights=amounts[both], minlength=n_depts)
+
+    return predicted, actual, hit
+
+
+def run_backtest(df_gestion_unpaid, weeks, workers=BACKTEST_WORKERS):
+    """
+    逐周回测付款预测。
+
+    参数：
+    - df_gestion_unpaid: 见 ledger_stages.build_gestion_unpaid（不会被修改）
+    - weeks: 要回测的周（各周周一，见 backtest_weeks）
+    - workers: 进程数；None 或 1 时在当前进程计算，大于 1 时各块周分配到进程池并行计算（结果相同）
+
+    返回：
+    - weekly: 每周每个部门一行，列为 回测周键、部门、预测金额、实际金额、命中金额（预测且实际在该周付款）、
+      误差（预测金额 - 实际金额），以及 周开始 / 周结束 / 周范围。
+      发票金额按整张发票计；没有付款历史的公司无法预测，实际付款时全部计入低估
+    """
+    columns = ['回测周键', '部门', '预测金额', '实际金额', '命中金额', '误差']
+    weeks = pd.DatetimeIndex(weeks)
+    if len(weeks) == 0:
+        return with_week_labels(pd.DataFrame(columns=columns).astype({'回测周键': 'int64'}), '回测周键')
+
+    # 1️⃣ 明细 → NumPy 数组：发票日期 / 开支票日期（天数）、组号（部门 + 公司名称）、部门编号、发票金额
+    rows = df_gestion_unpaid[df_gestion_unpaid['发票日期'].notna()]
+    invoice_days = _to_day_numbers(rows['发票日期'], 0)
+    pay_days = _to_day_numbers(rows['开支票日期'], _NEVER_PAID)
+    grouped = rows.groupby(['部门', '公司名称'], observed=True)
+    # 部门 / 公司名称 为空的行 ngroup 为 NaN，统一为 -1（这些发票没有中位数，只计入实际付款）
+    group_codes = grouped.ngroup().fillna(-1).astype('int64').to_numpy()
+    n_groups = grouped.ngroups
+    dept_codes, departments = pd.factorize(rows['部门'].astype(object), sort=True)
+    amounts = rows['发票金额'].fillna(0).to_numpy(dtype='float64')
+
+    # 预计付款日（天数）顺延到营业日的查找表，覆盖 发票日期 + 任意历史付款天数 的范围
+    paid = pay_days != _NEVER_PAID
+    delays = pay_days[paid] - invoice_days[paid]
+    roll_first = int(invoice_days.min() + min(delays.min(), 0)) if paid.any() else int(invoice_days.min())
+    roll_last = int(invoice_days.max() + max(delays.max(), 0)) + 1 if paid.any() else int(invoice_days.max())
+    roll_table = rolled_day_offsets(pd.Timestamp('1970-01-01'), roll_first, roll_last)
+
+    # 2️⃣ 按连续的周分块，每块内逐周增量计算
+    week_days = _to_day_numbers(pd.Series(weeks), 0)
+    chunk_args = [
+        (week_days[start:start + BACKTEST_CHUNK_WEEKS], invoice_days, pay_days, group_codes,
+         dept_codes, amounts, n_groups, len(departments), roll_table, roll_first)
+        for start in range(0, len(week_days), BACKTEST_CHUNK_WEEKS)
+    ]
+    if workers and workers > 1 and len(chunk_args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_backtest_chunk, *zip(*chunk_args)))
+    else:
+        chunks = [_backtest_chunk(*args) for args in chunk_args]
+    predicted, actual, hit = (np.vstack(parts) for parts in zip(*chunks))
+
+    # 3️⃣ 周 × 部门 矩阵展开为长表
+    n_depts = len(departments)
+    weekly = pd.DataFrame({
+        '回测周键': np.repeat((weeks.year * 10000 + weeks.month * 100 + weeks.day).to_numpy(dtype='int64'), n_depts),
+        '部门': np.tile(np.asarray(departments, dtype=object), len(weeks)),
+        '预测金额': predicted.ravel(),
+        '实际金额': actual.ravel(),
+        '命中金额': hit.ravel(),
+    })
+    weekly['误差'] = weekly['预测金额'] - weekly['实际金额']
+    return with_week_labels(weekly, '回测周键')
+
+
+def summarize_backtest(weekly):
+    """
+    按部门汇总回测误差。
+
+    参数：
+    - weekly: run_backtest 的结果（或其中部分周）
+
+    返回：
+    - summary: 每个部门一行，列为 回测周数、平均实际金额、平均绝对误差（MAE）、平均偏差
+      （正数 = 预测偏高，负数 = 预测偏低）、相对误差（MAE / 平均实际金额）、
+      命中率（命中金额合计 / 实际金额合计）；最后一行为全部门合计（每周各部门相加后再统计）
+    """
+    def _summary(frame, by):
+        grouped = frame.assign(绝对误差=frame['误差'].abs()).groupby(by)
+        return pd.DataFrame({
+            '回测周数': grouped.size(),
+            '平均实际金额': grouped['实际金额'].mean(),
+            '平均绝对误差': grouped['绝对误差'].mean(),
+            '平均偏差': grouped['误差'].mean(),
+            '实际金额合计': grouped['实际金额'].sum(),
+            '命中金额合计': grouped['命中金额'].sum(),
+        })
+
+    by_department = _summary(weekly, '部门')
+    total = _summary(
+        weekly.groupby('回测周键')[['预测金额', '实际金额', '命中金额', '误差']].sum().assign(部门='合计'),
+        '部门',
+    )
+    summary = pd.concat([by_department, total])
+    summary['相对误差'] = summary['平均绝对误差'] / summary['平均实际金额'].replace(0, np.nan)
+    summary['命中率'] = summary['命中金额合计'] / summary['实际金额合计'].replace(0, np.nan)
+    summary = summary.drop(columns=['实际金额合计', '命中金额合计'])
+    return summary.reset_index().round({
+        '平均实际金额': 2, '平均绝对误差': 2, '平均偏差': 2, '相对误差': 4, '命中率': 4
+    })
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from modules.business_calendar import business_day_after
+
+
+# ============================================================================
+# 付款计划（按每周现金预算选择要付的发票）
+# 每张未付发票按 逾期程度、供应商历史付款速度、部门优先顺序 打一个优先分，
+# 在预算内按优先分从高到低选择（贪心背包：放不下的跳过，继续尝试后面金额较小的发票），
+# 选中的发票按公司合并，生成开支票清单
+# ============================================================================
+
+# 各项得分的权重（合计为 1）
+PAYMENT_RUN_WEIGHTS = {'逾期得分': 0.5, '供应商得分': 0.3, '部门得分': 0.2}
+
+# 逾期天数达到该值时，逾期得分为满分
+PAYMENT_RUN_OVERDUE_CAP_DAYS = 60
+
+# 没有付款历史的公司，按发票日期 + 该天数（顺延到营业日）作为预计付款日
+PAYMENT_RUN_DEFAULT_TERMS_DAYS = 30
+
+
+def build_payment_candidates(df_forecast, result_paid_days, today, department_order):
+    """
+    为所有可以开支票支付的未付发票计算优先分（与预算无关，每个数据版本、每天只需计算一次）。
+
+    参数：
+    - df_forecast: payment_forecast.predict_pay_dates 的结果
+    - result_paid_days: 付款周期统计（见 ledger_stages.build_payment_cycle_stats，使用 付款天数90分位）
+    - today: 当前日期
+    - department_order: 部门优先顺序（data_loader.get_ordered_departments 的结果，越靠前越优先）
+
+    返回：
+    - candidates: 应付未付 > 0 的发票（排除自动扣款的 公司名* ，它们不开支票），
+      新增 逾期天数、发票账龄、逾期得分、供应商得分、部门得分、优先分 列，按优先分从高到低排序
+    """
+    today = pd.Timestamp(today).normalize()
+
+    # 1️⃣ 只保留需要开支票的发票：应付未付为正，且不是自动扣款的公司
+    companies = df_forecast['公司名称'].astype(str)
+    candidates = df_forecast[(df_forecast['应付未付'] > 0) & ~companies.str.endswith('*')].copy()
+    candidates = candidates.merge(
+        result_paid_days[['部门', '公司名称', '付款天数90分位']], on=['部门', '公司名称'], how='left'
+    )
+
+    # 2️⃣ 逾期得分：超过预计付款日的天数（没有付款历史的按默认账期），超过上限按满分
+    expected_date = candidates['预计付款日'].fillna(
+        business_day_after(candidates['发票日期'], PAYMENT_RUN_DEFAULT_TERMS_DAYS)
+    )
+    candidates['逾期天数'] = (today - expected_date).dt.days
+    candidates['发票账龄'] = (today - candidates['发票日期']).dt.days
+    candidates['逾期得分'] = (candidates['逾期天数'].fillna(0).clip(lower=0) / PAYMENT_RUN_OVERDUE_CAP_DAYS).clip(upper=1)
+
+    # 3️⃣ 供应商得分：账龄占该公司历史 90% 付款天数的比例（平时付得越快的公司，同样账龄越紧急）
+    usual_limit = candidates['付款天数90分位'].fillna(PAYMENT_RUN_DEFAULT_TERMS_DAYS).clip(lower=1)
+    candidates['供应商得分'] = (candidates['发票账龄'].fillna(0).clip(lower=0) / usual_limit).clip(upper=1)
+
+    # 4️⃣ 部门得分：按部门优先顺序线性递减，第一个部门为 1，不在列表中的部门为 0
+    rank = {dept: i for i, dept in enumerate(department_order)}
+    dept_rank = candidates['部门'].astype(object).map(rank)
+    candidates['部门得分'] = (1 - dept_rank / max(len(department_order), 1)).fillna(0).astype('float64')
+
+    # 5️⃣ 加权得到优先分；同分时先付账龄较长的发票
+    candidates['优先分'] = sum(candidates[col] * weight for col, weight in PAYMENT_RUN_WEIGHTS.items()).round(4)
+    candidates = candidates.sort_values(['优先分', '发票账龄'], ascending=False, kind='stable')
+    return candidates.reset_index(drop=True)
+
+
+def plan_payment_run(candidates, budget):
+    """
+    在预算内选择要付的发票（贪心背包）。
+
+    按优先分从高到低依次尝试：放得下就选，放不下就跳过，继续尝试后面的发票（金额较小的仍可能放得下）。
+    每张发票的价值为 优先分 × 金额，优先分就是单位金额的价值，因此按优先分排序即按价值密度排序。
+    前面连续放得下的部分用 cumsum 一次确定，只对剩余的发票逐张判断。
+    金额和预算先换算为整数分再比较，累加不会产生浮点误差，合计恰好等于预算的发票也能选中。
+
+    参数：
+    - candidates: build_payment_candidates 的结果（已按优先分排序）
+    - budget: 本次付款的现金预算
+
+    返回：
+    - selected: 选中的发票（保持优先分顺序）
+    """
+    amounts = np.rint(candidates['应付未付'].to_numpy(dtype='float64') * 100).astype('int64')
+    budget = int(round(budget * 100))
+    if budget <= 0 or len(amounts) == 0:
+        return candidates.iloc[:0]
+
+    # 1️⃣ 前缀：累计金额不超过预算的连续部分全部选中
+    prefix = int(np.searchsorted(np.cumsum(amounts), budget, side='right'))
+    chosen = np.zeros(len(amounts), dtype=bool)
+    chosen[:prefix] = True
+    remaining = budget - amounts[:prefix].sum()
+
+    # 2️⃣ 其余发票逐张尝试（只看金额不超过剩余预算的）
+    for i in np.flatnonzero(amounts[prefix:] <= remaining) + prefix:
+        if amounts[i] <= remaining:
+            chosen[i] = True
+            remaining -= amounts[i]
+
+    return candidates[chosen]
+
+
+def build_cheque_list(selected):
+    """
+    将选中的发票按公司合并为开支票清单（每家公司一张支票）。
+
+    返回：
+    - cheques: 每家公司一行，列为 公司名称、部门、发票张数、支票金额、发票号（逗号分隔）、
+      最早发票日期、最大逾期天数，按支票金额从大到小排序
+    """
+    columns = ['公司名称', '部门', '发票张数', '支票金额', '发票号', '最早发票日期', '最大逾期天数']
+    if selected.empty:
+        return pd.DataFrame(columns=columns)
+
+    rows = selected.assign(
+        公司名称=selected['公司名称'].astype(object),
+        部门=selected['部门'].astype(object),
+        发票号=selected['发票号'].astype(str),
+    )
+    cheques = rows.groupby('公司名称', sort=False).agg(
+        部门=('部门', lambda depts: '、'.join(sorted(depts.dropna().unique()))),
+        发票张数=('发票号', 'size'),
+        支票金额=('应付未付', 'sum'),
+        发票号=('发票号', ', '.join),
+        最早发票日期=('发票日期', 'min'),
+        最大逾期天数=('逾期天数', 'max'),
+    )
+    cheques['支票金额'] = cheques['支票金额'].round(2)
+    return cheques.reset_index().sort_values('支票金额', ascending=False, kind='stable')[columns].reset_index(drop=True)
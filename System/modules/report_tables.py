@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# 明细 + 小计（XX 汇总）+ 总计 报表
+# 一次分组求和得到全部小计行，与明细行一起拼接后只排序一次，
+# 代替逐个分组 pd.concat 到不断变大的表格（分组越多越慢）的写法
+# ============================================================================
+
+# 行类型：与报表逐行对齐，用于着色（代替逐行判断 部门 是否以“汇总”结尾）
+ROW_DETAIL = '明细'
+ROW_SUBTOTAL = '汇总'
+ROW_TOTAL = '总计'
+
+SUBTOTAL_COLOR = '#E8F6F3'
+TOTAL_COLOR = '#FADBD8'
+
+
+def build_subtotal_report(df, group_col, value_cols, order_by=None, fill=None, total_label='总计'):
+    """
+    生成“明细 + 各组小计 + 总计”报表。
+
+    参数：
+    - df: 明细数据，列顺序即报表的列顺序（须包含 group_col 和 value_cols）
+    - group_col: 小计分组列（如 '部门'），小计行显示为 “XX 汇总”，分组顺序与 groupby 相同
+    - value_cols: 需要求和的金额列
+    - order_by: 组内明细的排序列（如 ['公司名称']）；None 时保持 df 原有顺序
+    - fill: 小计 / 总计行中其他列的取值，如 {'公司名称': keyword, '银行对账日期': pd.NaT}；未指定的列为 ''
+    - total_label: 总计行在 group_col 中显示的文字
+
+    返回：
+    - report: 报表 DataFrame（索引为 0..n-1）
+    - row_type: 与 report 对齐的行类型 Series（ROW_DETAIL / ROW_SUBTOTAL / ROW_TOTAL）
+    """
+    fill = fill or {}
+    columns = list(df.columns)
+    other_cols = [col for col in columns if col != group_col and col not in value_cols]
+
+    # 1️⃣ 明细行：组号按 groupby 的分组顺序（分类列按类别顺序），组内按 order_by 稳定排序
+    # 与 groupby 一样，分组列为空的明细行不显示，但仍计入总计
+    group_codes, group_keys = pd.factorize(df[group_col], sort=True)
+    detail = df.assign(_组序=group_codes, _行序=0)[group_codes >= 0]
+    detail = detail.sort_values(['_组序'] + list(order_by or []), kind='stable')
+
+    # 2️⃣ 小计行：一次 groupby 求和得到所有组的小计
+    subtotals = df.groupby(group_col, observed=True, sort=True)[value_cols].sum()
+    subtotals = subtotals.reindex(group_keys).reset_index(drop=True)
+    subtotals[group_col] = [f"{key} 汇总" for key in group_keys]
+    subtotals['_组序'] = np.arange(len(group_keys))
+    subtotals['_行序'] = 1
+
+    # 3️⃣ 总计行：排在所有分组之后
+    total = df[value_cols].sum().to_frame().T
+    total[group_col] = total_label
+    total['_组序'] = len(group_keys)
+    total['_行序'] = 2
+
+    summary_rows = pd.concat([subtotals, total], ignore_index=True)
+    for col in other_cols:
+        summary_rows[col] = fill.get(col, '')
+
+    # 4️⃣ 明细 + 小计 + 总计 一次拼接、一次排序（稳定排序，组内明细顺序不变）
+    if detail.empty:
+        report = summary_rows
+    else:
+        if isinstance(detail[group_col].dtype, pd.CategoricalDtype):
+            detail[group_col] = detail[group_col].astype(object)
+        report = pd.concat([detail, summary_rows], ignore_index=True)
+    report = report.sort_values(['_组序', '_行序'], kind='stable').reset_index(drop=True)
+
+    row_type = report['_行序'].map({0: ROW_DETAIL, 1: ROW_SUBTOTAL, 2: ROW_TOTAL})
+    return report[columns], row_type
+
+
+def row_type_from_labels(labels, total_label='总计'):
+    """
+    根据分组列的文字（“XX 汇总” / “总计”）推断行类型，用于没有 row_type 的汇总表。
+    """
+    labels = labels.astype(str)
+    row_type = pd.Series(ROW_DETAIL, index=labels.index)
+    row_type[labels.str.endswith('汇总')] = ROW_SUBTOTAL
+    row_type[labels == total_label] = ROW_TOTAL
+    return row_type
+
+
+def row_type_styles(report, row_type, subtotal_color=SUBTOTAL_COLOR, total_color=TOTAL_COLOR):
+    """
+    按行类型生成整张表的背景色，供 report.style.apply(row_type_styles, row_type=row_type, axis=None) 使用。
+
+    返回：
+    - styles: 与 report 形状相同的 CSS 字符串 DataFrame
+    """
+    colors = row_type.map({
+        ROW_SUBTOTAL: f'background-color: {subtotal_color}',
+        ROW_TOTAL: f'background-color: {total_color}',
+    }).fillna('').to_numpy(dtype=object)
+
+    return pd.DataFrame(
+        np.repeat(colors[:, None], report.shape[1], axis=1),
+        index=report.index,
+        columns=report.columns,
+    )
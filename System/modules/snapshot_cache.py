@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+
+# 本地快照目录：System/.snapshots
+# 每个数据源保存两份文件：清洗后的列式数据（parquet）+ 元数据（json，记录源内容哈希）
+SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / ".snapshots"
+
+# 快照版本：清洗逻辑或字段类型发生变化时 +1，源数据没变的旧快照也会重新生成
+SNAPSHOT_VERSION = 4
+
+
+def content_hash(raw_bytes):
+    """
+    计算源数据（原始字节）的内容哈希，用于判断数据是否真的发生了变化。
+    """
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+def _snapshot_paths(name):
+    return {
+        "parquet": SNAPSHOT_DIR / f"{name}.parquet",
+        "pickle": SNAPSHOT_DIR / f"{name}.pkl",
+        "meta": SNAPSHOT_DIR / f"{name}.json",
+    }
+
+
+def read_snapshot_meta(name):
+    """
+    读取快照元数据，不存在或损坏时返回 None。
+    """
+    meta_path = _snapshot_paths(name)["meta"]
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_snapshot(name):
+    """
+    读取本地快照。
+
+    返回：
+    - (df, meta)：快照存在时返回清洗后的 DataFrame 及其元数据
+    - (None, None)：快照不存在、无法读取，或由旧版清洗逻辑生成（SNAPSHOT_VERSION 不同，列布局可能不同）
+    """
+    meta = read_snapshot_meta(name)
+    if meta is None or meta.get("version") != SNAPSHOT_VERSION:
+        return None, None
+
+    path = _snapshot_paths(name)[meta.get("format", "parquet")]
+    try:
+        if meta.get("format") == "pickle":
+            df = pd.read_pickle(path)
+        else:
+            df = pd.read_parquet(path)
+            # 较早版本的 pandas 读回 string 列时使用 Python 对象存储，这里恢复为 Arrow 存储（能读 parquet 说明已安装 pyarrow）
+            for col in df.columns:
+                dtype = df[col].dtype
+                if isinstance(dtype, pd.StringDtype) and dtype.na_value is pd.NA and dtype.storage != "pyarrow":
+                    df[col] = df[col].astype(pd.StringDtype("pyarrow"))
+    except Exception as e:
+        print(f"[快照] 读取 {path.name} 失败：{e}")
+        return None, None
+
+    return df, meta
+
+
+def write_snapshot(name, df, source_hash):
+    """
+    将清洗后的 DataFrame 写入本地快照（优先 parquet，缺少 pyarrow 或列类型不支持时退回 pickle）。
+    先写临时文件再替换，避免其他会话读到写了一半的文件。
+    """
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    paths = _snapshot_paths(name)
+
+    fmt = "parquet"
+    tmp_path = paths["parquet"].with_suffix(".parquet.tmp")
+    try:
+        df.to_parquet(tmp_path, index=False)
+    except (ImportError, ValueError, TypeError) as e:
+        # 没有安装 pyarrow，或存在 parquet 无法表示的混合类型列
+        print(f"[快照] parquet 写入失败，改用 pickle：{e}")
+        fmt = "pickle"
+        tmp_path = paths["pickle"].with_suffix(".pkl.tmp")
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, paths[fmt])
+
+    meta = {
+        "hash": source_hash,
+        "version": SNAPSHOT_VERSION,
+        "format": fmt,
+        "rows": int(len(df)),
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    tmp_meta = paths["meta"].with_suffix(".json.tmp")
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_meta, paths["meta"])
+
+    return meta
+
+
+def load_with_fingerprint(name, fingerprint, parse_func):
+    """
+    根据数据源指纹，决定直接读取本地快照还是重新解析源数据。
+
+    参数：
+    - name: 快照名称（如 "supplier"）
+    - fingerprint: 数据源指纹（内容哈希，或本地文件的 修改时间+大小）
+    - parse_func: 解析函数（无参数），返回清洗后的 DataFrame
+
+    返回：
+    - df: 清洗后的 DataFrame
+    - meta: 快照元数据（hash / format / rows / saved_at）
+    """
+    # 1. 指纹没有变化 → 直接读取列式快照，跳过 read_csv / read_excel 和所有类型转换
+    meta = read_snapshot_meta(name)
+    if meta is not None and meta.get("hash") == fingerprint and meta.get("version") == SNAPSHOT_VERSION:
+        df, meta = read_snapshot(name)
+        if df is not None:
+            return df, meta
+
+    # 2. 指纹发生变化（或首次运行）→ 重新解析并刷新快照
+    df = parse_func()
+    try:
+        meta = write_snapshot(name, df, fingerprint)
+    except OSError as e:
+        # 只读磁盘等情况下，快照写入失败不影响本次数据加载
+        print(f"[快照] 写入失败：{e}")
+        meta = {"hash": fingerprint, "version": SNAPSHOT_VERSION, "format": None, "rows": int(len(df)),
+                "saved_at": datetime.now().isoformat(timespec="seconds")}
+
+    return df, meta
+
+
+def load_with_snapshot(name, raw_bytes, parse_func):
+    """
+    根据源数据内容哈希，决定直接读取本地快照还是重新解析源数据。
+
+    参数：
+    - name: 快照名称（如 "supplier"）
+    - raw_bytes: 刚下载/读取的源数据原始字节
+    - parse_func: 解析函数，接收原始字节，返回清洗后的 DataFrame
+
+    返回：
+    - df: 清洗后的 DataFrame
+    - meta: 快照元数据（hash / format / rows / saved_at）
+    """
+    return load_with_fingerprint(name, content_hash(raw_bytes), lambda: parse_func(raw_bytes))
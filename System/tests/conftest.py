@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 与 app.py 相同，以 System 目录为根导入 modules.*
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from modules.aggregate_cube import build_cube, cube_rollup, cube_slice, cube_top_n
+from modules.calendar_keys import add_calendar_keys
+
+
+def _ledger(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    invoice_dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 200, n), unit='D')
+    df = pd.DataFrame({
+        '部门': pd.Categorical(rng.choice(['杂货', '菜部', '肉部'], n)),
+        '公司名称': pd.Categorical(rng.choice(['Metro', 'Sysco', 'Hydro', 'Avril'], n)),
+        '发票日期': invoice_dates.where(rng.random(n) > 0.05),
+        '发票金额': rng.integers(1, 100000, n) / 100,
+        '实际支付金额': np.where(rng.random(n) > 0.3, rng.integers(1, 100000, n) / 100, np.nan),
+    })
+    df['应付未付'] = df['发票金额'] - df['实际支付金额'].fillna(0)
+    return add_calendar_keys(df, ['发票日期'])
+
+
+def test_rollup_matches_detail_groupby():
+    df = _ledger()
+    cube = build_cube(df, '发票')
+    assert len(cube) < len(df)
+
+    for by in [['部门'], ['部门', '发票周键'], ['公司名称', '发票月键']]:
+        for measure in ['发票金额', '实际支付金额']:
+            expected = df.dropna(subset=[measure]).groupby(by, observed=True)[measure].sum().reset_index()
+            result = cube_rollup(cube, by, measure)
+            pd.testing.assert_frame_equal(result, expected, check_exact=False, check_dtype=False)
+
+    # 没有日期的明细也保留在立方体中，合计与明细一致
+    assert np.isclose(cube['发票金额'].sum(), df['发票金额'].sum())
+
+
+def test_slice_and_top_n():
+    df = _ledger()
+    cube = build_cube(df, '发票')
+    month = int(df['发票月键'].dropna().iloc[0])
+
+    sliced = cube_slice(cube, {'发票月键': month, '部门': ['杂货', '菜部']})
+    expected = df[(df['发票月键'] == month) & df['部门'].isin(['杂货', '菜部'])]['发票金额'].sum()
+    assert np.isclose(sliced['发票金额'].sum(), expected)
+
+    totals = df.groupby('公司名称', observed=True)['发票金额'].sum().sort_values(ascending=False)
+    assert cube_top_n(cube, '公司名称', '发票金额', 2) == totals.index[:2].tolist()
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from modules.business_calendar import business_day_after, holidays_between, roll_to_business_day, rolled_day_offsets
+
+
+def test_quebec_holidays_2025():
+    holidays = pd.to_datetime(holidays_between(2025, 2025)).strftime('%Y-%m-%d').tolist()
+    assert holidays == [
+        '2025-01-01', '2025-04-18', '2025-05-19', '2025-06-24',
+        '2025-07-01', '2025-09-01', '2025-10-13', '2025-12-25',
+    ]
+
+
+def test_roll_to_business_day():
+    dates = pd.Series(pd.to_datetime(['2025-06-02 15:30', '2025-06-21', '2025-06-24', '2025-12-27', None], format='ISO8601'))
+    rolled = roll_to_business_day(dates)
+
+    # 营业日不变（时间部分舍去）；周六顺延到周一；魁北克国庆日顺延到次日；年末周末顺延跨年
+    assert rolled.dt.strftime('%Y-%m-%d').tolist()[:4] == ['2025-06-02', '2025-06-23', '2025-06-25', '2025-12-29']
+    assert pd.isna(rolled.iloc[4])
+
+
+def test_business_day_after_with_missing_days():
+    dates = pd.Series(pd.to_datetime(['2025-06-16', '2025-06-16', '2025-06-16']))
+    result = business_day_after(dates, pd.Series([5, 9.5, np.nan]))
+
+    assert result.iloc[0] == pd.Timestamp('2025-06-23')
+    assert result.iloc[1] == pd.Timestamp('2025-06-25')
+    assert pd.isna(result.iloc[2])
+
+
+def test_rolled_day_offsets_match_roll_to_business_day():
+    origin = pd.Timestamp('2025-06-16')
+    table = rolled_day_offsets(origin, -3, 40)
+
+    dates = pd.Series(origin + pd.to_timedelta(np.arange(-3, 41), unit='D'))
+    expected = (roll_to_business_day(dates) - origin).dt.days.to_numpy()
+    assert table.tolist() == expected.tolist()
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from modules.calendar_keys import add_calendar_keys, with_week_labels
+
+
+def test_calendar_keys():
+    df = add_calendar_keys(pd.DataFrame({'发票日期': pd.to_datetime(['2025-06-22', '2025-08-01', None])}))
+    assert df['发票月键'].tolist()[:2] == [202506, 202508]
+    # 2025-06-22 是星期日，属于 6 月 16 日开始的那一周
+    assert df['发票周键'].tolist()[:2] == [20250616, 20250728]
+    # 财会年度从 8 月 1 日开始，以结束年份命名
+    assert df['发票财年'].tolist()[:2] == [2025, 2026]
+    assert df.loc[2, ['发票月键', '发票周键', '发票财年']].isna().all()
+
+
+def test_week_labels():
+    df = pd.DataFrame({'支票周键': pd.array([20250616, None], dtype='Int32')})
+    labeled = with_week_labels(df, '支票周键')
+    assert labeled.loc[0, '周范围'] == '2025-06-16 ~ 2025-06-22'
+    assert labeled.loc[0, '周结束'] == pd.Timestamp('2025-06-22')
+    assert pd.isna(labeled.loc[1, '周开始'])
+
+
+def test_week_labels_on_empty_frame():
+    for keys in [pd.array([], dtype='Int32'), pd.array([None], dtype='Int32')]:
+        labeled = with_week_labels(pd.DataFrame({'支票周键': keys}), '支票周键')
+        assert list(labeled.columns) == ['支票周键', '周开始', '周结束', '周范围']
+        assert labeled['周开始'].isna().all()
+        assert labeled['周范围'].isna().all()
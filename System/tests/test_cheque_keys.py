@@ -0,0 +1,19 @@
+import pandas as pd
+
+from modules.cheque_keys import add_cheque_keys, cheque_sort_value
+
+
+def test_cheque_keys():
+    df = add_cheque_keys(pd.DataFrame({'付款支票号': ['1023', 'CK889', 'ETF-Alex', 'ppa 12', ' ', None, '1023']}))
+
+    assert df['支票数字'].tolist()[:4] == [1023, 889, pd.NA, 12]
+    assert df['支票前缀'].isna().iloc[0]
+    assert df['支票前缀'].tolist()[1:4] == ['CK', 'ETF', 'PPA']
+    assert df['支票类型'].tolist()[:4] == ['纸质支票', '电子转账', '电子转账', '自动扣款']
+    assert df['支票有效'].tolist() == [True, True, True, True, False, False, True]
+    assert df['支票类型'].isna().iloc[4:6].all()
+
+    # 只有纸质支票按数值排序，其他类型排在后面
+    sort_value = cheque_sort_value(df)
+    assert sort_value.iloc[0] == 1023
+    assert sort_value.iloc[1:6].isna().all()
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from modules.cheque_keys import add_cheque_keys
+from modules.cheque_register import build_cheque_register, cheque_match_keys
+
+
+def _ledger():
+    return add_cheque_keys(pd.DataFrame({
+        '付款支票号': pd.array(['10', '2', 'ETF-1', '2', None], dtype='string'),
+        '公司名称': pd.Categorical(['Metro', 'Sysco', 'Hydro', 'Sysco', 'Metro']),
+        '部门': pd.Categorical(['杂货', '菜部', '杂货', '杂货', '杂货']),
+        '发票号': pd.array(['F3', 'F2', 'F4', 'F1', 'F5'], dtype='string'),
+        '发票金额': [30.0, 20.5, 40.0, 10.0, 50.0],
+        '银行对账日期': pd.to_datetime([None, '2025-06-02', '2025-06-05', None, None]),
+        '实际支付金额': [30.0, 20.5, 40.0, 10.0, np.nan],
+        'TPS': [1.0, 0.5, 0.0, 0.25, 0.0],
+        'TVQ': [2.0, 1.0, 0.0, 0.5, 0.0],
+    }))
+
+
+def test_cheque_register_groups_and_orders_cheques():
+    register = build_cheque_register(_ledger())
+
+    # 数字支票号按数值排序在前（2 < 10），文本支票号在后；没有支票号的行不计入
+    assert register['付款支票号'].tolist() == ['2', '10', 'ETF-1']
+    cheque_2 = register.iloc[0]
+    assert cheque_2['公司名称'] == 'Sysco'
+    assert cheque_2['部门'] == '杂货,菜部'
+    assert cheque_2['发票号'] == 'F1,F2'
+    assert cheque_2['发票金额'] == '10.0+20.5'
+    assert cheque_2['实际支付金额'] == 30.5
+    assert cheque_2['TVQ'] == 1.5
+    assert cheque_2['银行对账日期'] == pd.Timestamp('2025-06-02')
+    assert pd.isna(register.iloc[1]['银行对账日期'])
+
+
+def test_cheque_register_matches_groupby_reference():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        '付款支票号': pd.array(rng.choice([str(i) for i in range(60)] + ['VISA-1826', 'ETF-7'], n), dtype='string'),
+        '公司名称': pd.Categorical(rng.choice(['Metro', 'Sysco', 'Hydro'], n)),
+        '部门': pd.Categorical(rng.choice(['杂货', '菜部', '肉部'], n)),
+        '发票号': pd.array([f'F{i}' for i in range(n)], dtype='string'),
+        '发票金额': rng.integers(1, 10000, n) / 100,
+        '银行对账日期': pd.NaT,
+        '实际支付金额': rng.integers(1, 10000, n) / 100,
+        'TPS': 0.0,
+        'TVQ': 0.0,
+    })
+    add_cheque_keys(df)
+    register = build_cheque_register(df).set_index('付款支票号')
+
+    reference = df.groupby('付款支票号').agg(
+        部门=('部门', lambda s: ','.join(sorted(s.astype(str)))),
+        发票号=('发票号', lambda s: ','.join(sorted(s))),
+        实际支付金额=('实际支付金额', 'sum'),
+    )
+    assert (register.loc[reference.index, '部门'] == reference['部门']).all()
+    assert (register.loc[reference.index, '发票号'] == reference['发票号']).all()
+    assert np.allclose(register.loc[reference.index, '实际支付金额'], reference['实际支付金额'])
+
+
+def test_cheque_match_keys():
+    keys = cheque_match_keys(pd.Series(['CK889', '1234']), pd.Series([1234.5, 20.0]))
+    assert keys.tolist() == ['889-1234.50', '1234-20.00']
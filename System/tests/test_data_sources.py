@@ -0,0 +1,28 @@
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from modules.data_sources import parse_source_spec, read_source_bytes, read_source_frame, source_fingerprint
+
+
+def test_sqlite_source_is_fingerprinted_without_reading_the_file(tmp_path):
+    db_path = tmp_path / 'xinya.db'
+    with closing(sqlite3.connect(db_path)) as conn:
+        pd.DataFrame({'发票号': ['F1', 'F2'], '发票金额': [10.0, 20.0]}).to_sql('supplier', conn, index=False)
+
+    source = parse_source_spec(f'sqlite:{db_path}#supplier')
+    fingerprint = source_fingerprint(source)
+    assert fingerprint.startswith('sqlite:supplier:')
+
+    # 解析时直接查询数据库，不需要整库的字节
+    raw_bytes = read_source_bytes(source)
+    assert raw_bytes is None
+    df = read_source_frame(source, raw_bytes, usecols=['发票号'])
+    assert df.columns.tolist() == ['发票号']
+    assert df['发票号'].tolist() == ['F1', 'F2']
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("INSERT INTO supplier VALUES ('F3', 30.0)")
+        conn.commit()
+    assert source_fingerprint(source) != fingerprint
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from modules.ledger_stages import update_forecast_backtest
+from modules.payment_forecast import run_backtest, summarize_backtest
+
+
+def _ledger():
+    """
+    两家公司，每周一张发票，14 天后开支票；最后一张发票没有部门，且尚未付款。
+    """
+    invoice_dates = pd.date_range('2025-01-06', periods=20, freq='7D')
+    departments = ['杂货', '菜部'] * 10
+    departments[-1] = np.nan
+    pay_dates = pd.Series(invoice_dates + pd.Timedelta(days=14))
+    pay_dates.iloc[-1] = pd.NaT
+    return pd.DataFrame({
+        '部门': pd.Categorical(departments),
+        '公司名称': pd.Categorical(['Metro', 'Sysco'] * 10),
+        '发票号': [f'F{i}' for i in range(20)],
+        '发票日期': invoice_dates,
+        '开支票日期': pay_dates,
+        '发票金额': np.full(20, 100.0),
+    })
+
+
+WEEKS = pd.date_range('2025-02-03', '2025-05-12', freq='7D')
+
+
+def test_backtest_steady_payer_is_predicted_exactly():
+    weekly = run_backtest(_ledger(), WEEKS)
+
+    # 每张发票都在 14 天后付款：中位数预测与实际完全一致
+    assert (weekly['预测金额'] == weekly['实际金额']).all()
+    assert weekly['实际金额'].sum() == 100.0 * len(WEEKS)
+    summary = summarize_backtest(weekly).set_index('部门')
+    assert summary.loc['合计', '平均绝对误差'] == 0
+    assert summary.loc['合计', '命中率'] == 1
+
+
+def test_backtest_with_empty_department():
+    weekly = run_backtest(_ledger(), WEEKS)
+    assert len(weekly) == len(WEEKS) * 2
+    assert set(weekly['部门']) == {'杂货', '菜部'}
+
+
+def test_backtest_refresh_with_only_current_week_rows():
+    df = _ledger()
+    previous = run_backtest(df, WEEKS)
+
+    # 只新增晚于所有回测周的发票：所有周都可以沿用
+    added = df.iloc[:3].assign(
+        发票号=['N1', 'N2', 'N3'], 发票日期=pd.Timestamp('2025-06-02'), 开支票日期=pd.NaT
+    )
+    df_new = pd.concat([df, added], ignore_index=True)
+
+    weekly = update_forecast_backtest(previous, df, df_new, WEEKS)
+    expected = run_backtest(df_new, WEEKS)
+    pd.testing.assert_frame_equal(weekly, expected, check_dtype=False)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from modules.aggregate_cube import apply_cube_delta, build_cube
+from modules.calendar_keys import add_calendar_keys
+from modules.incremental_refresh import diff_rows
+from modules.ledger_stages import build_payment_cycle_stats, update_payment_cycle_stats
+
+
+def _ledger(n, seed=0):
+    rng = np.random.default_rng(seed)
+    invoice_dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 150, n), unit='D')
+    paid = rng.random(n) > 0.3
+    df = pd.DataFrame({
+        '部门': rng.choice(['杂货', '菜部', '肉部'], n).astype(object),
+        '公司名称': rng.choice(['Metro', 'Sysco', 'Hydro', 'Avril'], n).astype(object),
+        '发票号': [f'F{i}' for i in range(n)],
+        '发票日期': invoice_dates,
+        '开支票日期': (invoice_dates + pd.to_timedelta(rng.integers(5, 60, n), unit='D')).where(paid),
+        '发票金额': rng.integers(1, 100000, n) / 100,
+    })
+    df['实际支付金额'] = df['发票金额'].where(paid)
+    # 一行没有部门：维度为空的格子也要能增量更新
+    df.loc[3, '部门'] = None
+    return df
+
+
+def _prepare(df):
+    df = df.copy()
+    df['应付未付'] = df['发票金额'] - df['实际支付金额'].fillna(0)
+    df['部门'] = df['部门'].astype('category')
+    df['公司名称'] = df['公司名称'].astype('category')
+    return add_calendar_keys(df)
+
+
+def _refresh(old_raw):
+    """
+    模拟一次刷新：末尾追加新发票，并给两张旧发票补填付款信息。
+    """
+    new_raw = pd.concat([old_raw, _ledger(30, seed=1).assign(发票号=lambda d: 'N' + d['发票号'])], ignore_index=True)
+    new_raw.loc[[5, 8], '开支票日期'] = pd.Timestamp('2025-07-01')
+    new_raw.loc[[5, 8], '实际支付金额'] = new_raw.loc[[5, 8], '发票金额']
+    return new_raw
+
+
+def _sorted_cells(cube):
+    keys = [col for col in cube.columns if col.endswith('键') or col in ('部门', '公司名称')]
+    cells = cube.astype({col: object for col in ('部门', '公司名称')}).fillna({'部门': '', '公司名称': ''})
+    return cells.sort_values(keys).reset_index(drop=True)[sorted(cube.columns)]
+
+
+def test_diff_rows_finds_appended_and_modified_rows():
+    old_df = _prepare(_ledger(300))
+    new_df = _prepare(_refresh(_ledger(300)))
+
+    diff = diff_rows(old_df, new_df)
+    assert diff['old_positions'].tolist() == [5, 8]
+    assert diff['new_positions'].tolist() == [5, 8] + list(range(300, 330))
+
+
+def test_diff_rows_requires_full_rebuild_when_history_changes():
+    old_df = _prepare(_ledger(300))
+
+    assert diff_rows(old_df, old_df.drop(index=10)) is None
+    assert diff_rows(old_df, old_df.drop(columns='应付未付')) is None
+    assert diff_rows(old_df, old_df.assign(发票金额=old_df['发票金额'] + 1)) is None
+    assert diff_rows(old_df, old_df)['new_positions'].size == 0
+
+
+def test_apply_cube_delta_matches_full_rebuild():
+    old_df = _prepare(_ledger(300))
+    new_df = _prepare(_refresh(_ledger(300)))
+    diff = diff_rows(old_df, new_df)
+
+    for axis in ['发票', '支票']:
+        updated = apply_cube_delta(
+            build_cube(old_df, axis),
+            build_cube(old_df.iloc[diff['old_positions']], axis),
+            build_cube(new_df.iloc[diff['new_positions']], axis),
+        )
+        pd.testing.assert_frame_equal(
+            _sorted_cells(updated), _sorted_cells(build_cube(new_df, axis)), check_dtype=False, check_categorical=False
+        )
+
+
+def test_update_payment_cycle_stats_matches_full_rebuild():
+    old_df = _prepare(_ledger(300))
+    new_df = _prepare(_refresh(_ledger(300)))
+
+    updated = update_payment_cycle_stats(build_payment_cycle_stats(old_df), old_df, new_df)
+    pd.testing.assert_frame_equal(updated, build_payment_cycle_stats(new_df), check_dtype=False)
+
+    # 历史数据有变化时返回 None，由调用方全量重算
+    assert update_payment_cycle_stats(build_payment_cycle_stats(old_df), old_df, new_df.drop(index=0)) is None
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from modules.ledger_schema import apply_supplier_schema, identifier_string_dtype, supplier_memory_report
+
+
+def test_supplier_schema_identifiers_and_amounts():
+    raw = pd.DataFrame({
+        '部门': ['杂货', '菜部'],
+        '公司名称': ['Metro', 'Sysco'],
+        '付款支票号': [1023.0, np.nan],
+        '发票号': ['F1', None],
+        '发票金额': ['10.004', '20.1'],
+    })
+    df = apply_supplier_schema(raw)
+
+    # Excel 读成 1023.0 的支票号还原为 "1023"，缺失值保持 <NA>
+    assert df['付款支票号'].dtype == identifier_string_dtype()
+    assert df['付款支票号'].iloc[0] == '1023'
+    assert df['付款支票号'].isna().iloc[1]
+    assert df['发票金额'].dtype == 'float64'
+    assert df['发票金额'].tolist() == [10.0, 20.1]
+
+
+def test_memory_report_totals():
+    df = apply_supplier_schema(pd.DataFrame({'部门': ['杂货'] * 100, '发票号': [f'F{i}' for i in range(100)]}))
+    report = supplier_memory_report(df)
+
+    assert report['列名'].iloc[-1] == '合计'
+    assert report['当前字节'].iloc[-1] == report['当前字节'].iloc[:-1].sum()
+    assert report['当前字节'].iloc[-1] < report['旧版字节'].iloc[-1]
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from modules import ledger_stages
+
+
+def test_cached_stage_rebuilds_only_when_version_changes():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return len(calls)
+
+    key = ('test_stage',)
+    assert ledger_stages.cached_stage(key, 'v1', build) == 1
+    assert ledger_stages.cached_stage(key, 'v1', build) == 1
+    assert ledger_stages.cached_stage(key, 'v2', build) == 2
+    assert len(calls) == 2
+
+
+def test_data_version_includes_snapshot_version(monkeypatch):
+    entries = {'df': pd.DataFrame(), 'meta': {'hash': 'h', 'version': 1}}
+    monkeypatch.setattr(ledger_stages, 'get_dataset_entry', lambda name, datasets=None: entries)
+    old_version, _ = ledger_stages.data_version()
+
+    # 源数据没变、清洗逻辑升级后重新生成的数据：派生数据同样要重新计算
+    entries['meta'] = {'hash': 'h', 'version': 2}
+    new_version, _ = ledger_stages.data_version()
+    assert old_version != new_version
+
+
+def test_standalone_loader_passes_its_own_dataset(monkeypatch):
+    requested = []
+
+    def fake_entry(name, datasets=None):
+        requested.append((name, datasets))
+        return {'df': pd.DataFrame({'部门': pd.Categorical(['杂货']), '公司名称': pd.Categorical(['Metro'])}), 'meta': {'hash': name}}
+
+    monkeypatch.setattr(ledger_stages, 'get_dataset_entry', fake_entry)
+    monkeypatch.setattr(ledger_stages, '_stage_cache', {})
+    import modules.data_loader_单机版 as standalone
+
+    # 导入单机版不会改变联网版页面使用的数据集
+    ledger_stages.load_company_index()
+    assert requested[-1] == ('supplier', None)
+
+    standalone.load_company_index()
+    assert requested[-1] == ('supplier_local', standalone.LOCAL_DATASETS)
+
+    # 两个数据集的派生数据分别缓存
+    assert ('company_index', 'supplier') in ledger_stages._stage_cache
+    assert ('company_index', 'supplier_local') in ledger_stages._stage_cache
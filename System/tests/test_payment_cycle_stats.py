@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from modules.ledger_stages import PAYMENT_CYCLE_QUANTILES, build_payment_cycle_stats, paid_days_by_group
+
+
+def _ledger(departments):
+    """
+    最小的管理版明细：每行一张已付发票，付款天数依次为 10、20、30 …
+    """
+    n = len(departments)
+    invoice_dates = pd.to_datetime(['2025-01-01'] * n)
+    return pd.DataFrame({
+        '部门': pd.Categorical(departments),
+        '公司名称': pd.Categorical(['Metro'] * n),
+        '发票日期': invoice_dates,
+        '开支票日期': invoice_dates + pd.to_timedelta(np.arange(1, n + 1) * 10, unit='D'),
+        '发票金额': np.full(n, 100.0),
+    })
+
+
+def test_paid_row_without_department_is_skipped():
+    df = _ledger(['杂货', '杂货', np.nan, '杂货'])
+
+    samples = paid_days_by_group(df)
+    assert samples['codes'].dtype == np.int64
+    assert samples['sorted_days'].tolist() == [10, 20, 40]
+
+    stats = build_payment_cycle_stats(df)
+
+    assert len(stats) == 1
+    assert stats.loc[0, '发票数量'] == 3
+    assert stats.loc[0, '发票金额'] == 300
+    assert stats.loc[0, '付款天数中位数'] == 20
+    assert stats.loc[0, '最长付款天数'] == 40
+
+
+def test_stats_match_groupby_reference():
+    rng = np.random.default_rng(0)
+    n = 600
+    invoice_dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 100, n), unit='D')
+    df = pd.DataFrame({
+        '部门': pd.Categorical(rng.choice(['杂货', '菜部', '肉部'], n)),
+        '公司名称': pd.Categorical(rng.choice(['Metro', 'Sysco', 'Hydro', 'Avril', 'Lallemand'], n)),
+        '发票日期': invoice_dates,
+        '开支票日期': (invoice_dates + pd.to_timedelta(rng.integers(0, 90, n), unit='D')).where(rng.random(n) > 0.2),
+        '发票金额': rng.integers(1, 100000, n) / 100,
+    })
+    stats = build_payment_cycle_stats(df)
+
+    paid = df[df['开支票日期'].notna()].assign(付款天数=lambda d: (d['开支票日期'] - d['发票日期']).dt.days)
+    grouped = paid.groupby(['部门', '公司名称'], observed=True)['付款天数']
+    expected = pd.DataFrame({
+        '发票数量': grouped.count(),
+        '付款天数中位数': grouped.median(),
+        '最短付款天数': grouped.min(),
+        '最长付款天数': grouped.max(),
+        '平均付款天数': grouped.mean().round(2),
+        **{col: grouped.quantile(q).round(2) for col, q in PAYMENT_CYCLE_QUANTILES.items()},
+    }).reset_index()
+    pd.testing.assert_frame_equal(stats[expected.columns], expected, check_dtype=False, check_categorical=False)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from modules.payment_run import build_cheque_list, build_payment_candidates, plan_payment_run
+
+
+def _candidates(amounts):
+    return pd.DataFrame({
+        '公司名称': [f'C{i % 3}' for i in range(len(amounts))],
+        '部门': '杂货',
+        '发票号': [f'F{i}' for i in range(len(amounts))],
+        '应付未付': amounts,
+        '发票日期': pd.Timestamp('2025-05-01'),
+        '逾期天数': np.arange(len(amounts)),
+    })
+
+
+def _reference_plan(amounts, budget):
+    """
+    逐张尝试的贪心选择（与 plan_payment_run 应完全一致），金额按分计算。
+    """
+    remaining = round(budget * 100)
+    chosen = []
+    for amount in amounts:
+        cents = round(amount * 100)
+        chosen.append(cents <= remaining)
+        if cents <= remaining:
+            remaining -= cents
+    return np.array(chosen)
+
+
+def test_plan_matches_greedy_reference():
+    rng = np.random.default_rng(0)
+    for budget in [0.01, 500.0, 2500.55, 10000.0, 1e6]:
+        amounts = rng.integers(1, 200000, 300) / 100
+        selected = plan_payment_run(_candidates(amounts), budget)
+
+        expected = _reference_plan(amounts, budget)
+        assert selected.index.tolist() == np.flatnonzero(expected).tolist()
+        assert selected['应付未付'].sum() <= budget + 1e-9
+
+
+def test_plan_fits_budget_to_the_cent():
+    # 0.1 + 0.2 按浮点累加大于 0.3，按分比较时两张都能放下
+    selected = plan_payment_run(_candidates([0.1, 0.2, 5.0]), 0.3)
+    assert selected['发票号'].tolist() == ['F0', 'F1']
+
+    assert plan_payment_run(_candidates([10.0]), 0).empty
+    assert plan_payment_run(_candidates([]), 100).empty
+
+
+def test_candidates_skip_auto_debit_and_settled_invoices():
+    df_forecast = pd.DataFrame({
+        '部门': ['杂货', '菜部', '杂货', '杂货'],
+        '公司名称': ['Metro', 'Sysco', 'Hydro*', 'Metro'],
+        '发票号': ['F1', 'F2', 'F3', 'F4'],
+        '发票日期': pd.to_datetime(['2025-03-03', '2025-05-01', '2025-03-03', '2025-03-03']),
+        '预计付款日': pd.to_datetime(['2025-04-02', '2025-05-31', None, None]),
+        '应付未付': [100.0, 50.0, 80.0, 0.0],
+    })
+    result_paid_days = pd.DataFrame({'部门': ['杂货'], '公司名称': ['Metro'], '付款天数90分位': [30.0]})
+
+    candidates = build_payment_candidates(df_forecast, result_paid_days, '2025-06-02', ['杂货', '菜部'])
+
+    # 自动扣款（公司名*）和已付清的发票不开支票；逾期最久的发票排在最前
+    assert candidates['发票号'].tolist() == ['F1', 'F2']
+    assert candidates.loc[0, '逾期天数'] == 61
+    assert candidates.loc[0, '逾期得分'] == 1
+    assert candidates['优先分'].is_monotonic_decreasing
+
+
+def test_cheque_list_groups_by_company():
+    selected = _candidates([100.0, 20.0, 30.0, 5.5])
+    cheques = build_cheque_list(selected)
+
+    assert cheques['公司名称'].tolist() == ['C0', 'C2', 'C1']
+    assert cheques.loc[0, '支票金额'] == 105.5
+    assert cheques.loc[0, '发票号'] == 'F0, F3'
+    assert cheques.loc[0, '最大逾期天数'] == 3
+    assert build_cheque_list(selected.iloc[:0]).empty
@@ -0,0 +1,20 @@
+import json
+
+import pandas as pd
+
+from modules import snapshot_cache
+
+
+def test_read_snapshot_skips_other_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_cache, 'SNAPSHOT_DIR', tmp_path)
+    snapshot_cache.write_snapshot('supplier', pd.DataFrame({'发票号': ['F1']}), 'hash')
+
+    df, meta = snapshot_cache.read_snapshot('supplier')
+    assert meta['version'] == snapshot_cache.SNAPSHOT_VERSION
+    assert df['发票号'].tolist() == ['F1']
+
+    # 旧版清洗逻辑保存的快照：列布局可能不同，不能作为冷启动 / 下载失败时的备用数据
+    meta_path = tmp_path / 'supplier.json'
+    meta['version'] = snapshot_cache.SNAPSHOT_VERSION - 1
+    meta_path.write_text(json.dumps(meta), encoding='utf-8')
+    assert snapshot_cache.read_snapshot('supplier') == (None, None)
@@ -1,13 +1,16 @@
 import streamlit as st
 
 
-def render_sidebar():
+def render_sidebar(data_status=None):
     # st.sidebar：Streamlit 提供的侧边栏组件，可以在页面的左侧创建一个固定的菜单区域
     # markdown()：用于显示Markdown 或 HTML 格式的文本
     st.sidebar.markdown("<h3 style='color:red;'>新亚超市管理系统</h3>", unsafe_allow_html=True)
-    
+
+    # data_status：来自 data_loader.get_data_status()，显示真实的数据快照时间
+    updated_at = data_status["updated_at"] if data_status and data_status.get("updated_at") else "未知"
+
     # st.sidebar.radio()：在侧边栏添加一个单选按钮组
-    menu = st.sidebar.radio("🚀数据更新截止至：2026-04-17 18:12", 
+    menu = st.sidebar.radio(f"🚀数据更新截止至：{updated_at}", 
         # 每个选项代表一个功能模块，可以根据选择执行不同的业务逻辑
         [
         "超市采购分析",
@@ -16,6 +19,11 @@ def render_sidebar():
         "公司付款分析",
         # "进货明细统计",
     ])
+
+    # 后台线程正在重新加载数据时给出提示，刷新完成后的下一次操作即使用新数据
+    if data_status and data_status.get("refreshing"):
+        st.sidebar.caption("🔄 后台正在更新数据，当前显示的是上一次的数据")
+
     # # 返回用户选择的菜单项
     return menu
 